@@ -17,6 +17,18 @@ class ChatService:
         self.room_repo = room_repo
         self.member_room = member_room
         
+    def ensure_can_post(self,room_id: uuid.UUID,user_id: uuid.UUID) -> None:
+        """
+        Проверяет, что комната существует и пользователь состоит в ней.
+        WebSocket-чат вызывает проверку один раз при подключении, а не на каждое сообщение.
+        """
+        room = self.room_repo.get_room_by_id(room_id)
+        if not room:
+            raise RoomNotFoundError()
+
+        if not self.member_room.get_association_by_ids(user_id,room_id):
+            raise UserNotInRoomError()
+
     def create_message(self,room_id: uuid.UUID,user_id: uuid.UUID,message: MessageCreate) -> MessageResponse | list:
         """
         Создает новое сообщение в комнате.
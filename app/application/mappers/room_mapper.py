@@ -8,24 +8,17 @@ class RoomMapper:
         self._user_mapper = user_mapper
         self._track_mapper = track_mapper
 
-    def to_response(self, room: RoomEntity) -> RoomResponse:
+    def to_response(self, room: RoomEntity, queue: list[TrackInQueueResponse] | None = None) -> RoomResponse:
+        """
+        Очередь в ответ не встраивается: её отдают постранично эндпоинты очереди.
+        Передайте queue, если она уже получена и нужна в ответе.
+        """
         owner_response = self._user_mapper.to_response(room.owner) if room.owner_id else None
         members_response = [
             self._user_mapper.to_response(assoc.user)
             for assoc in room.member_room
             if assoc.user
         ]
-        queue_response = [
-            TrackInQueueResponse(
-                track=self._track_mapper.to_response(assoc.track),
-                order_in_queue=assoc.order_in_queue,
-                id=assoc.id,
-                added_at=assoc.added_at
-            )
-            for assoc in sorted(room.room_track, key=lambda x: x.order_in_queue)
-            if assoc.track
-        ]
-        
         return RoomResponse(
             id=room.id,
             name=room.name,
@@ -39,5 +32,5 @@ class RoomMapper:
             is_playing=room.is_playing,
             owner=owner_response,
             members=members_response,
-            queue=queue_response
+            queue=queue
         )
\ No newline at end of file
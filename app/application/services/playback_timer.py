@@ -0,0 +1,150 @@
+import asyncio
+import heapq
+import itertools
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from app.config.log_config import logger
+from app.config.settings import settings
+
+
+class PlaybackTimer:
+    """
+    Таймеры комнат на одной min-куче: «в момент T комнате нужно внимание».
+
+    Задача-исполнитель спит до ближайшего срока и просыпается только тогда, когда
+    какой-то комнате действительно пора переключать трек, поэтому в простое
+    нагрузка не зависит от числа комнат. У каждой комнаты не больше одного
+    действующего срока; перевзвод не ищет старую запись в куче, а просто помечает
+    её устаревшей (она выбрасывается при извлечении).
+
+    Одновременно обрабатывается не больше max_concurrent комнат. Следующая комната
+    извлекается из кучи только при свободном слоте, поэтому при наплыве первыми
+    обслуживаются комнаты с самым ранним сроком, то есть те, где трек кончается раньше.
+
+    Обработчик одной комнаты не запускается дважды одновременно: срок, назначенный,
+    пока обработчик комнаты ещё работает (например, по уведомлению о часах, которые
+    он сам же и поменял), откладывается и взводится, когда обработчик закончит.
+    Если к этому моменту срок уже прошёл, он сдвигается на TIMER_RETRY_MS.
+    """
+
+    def __init__(self, on_due: Callable[[uuid.UUID], Awaitable[None]], max_concurrent: int | None = None):
+        self._on_due = on_due
+        self._slots = asyncio.Semaphore(max_concurrent or settings.playback.SCHEDULER_MAX_CONCURRENT_ROOMS)
+        self._heap: list[tuple[int, int, uuid.UUID]] = []
+        self._deadlines: dict[uuid.UUID, int] = {}
+        self._sequence = itertools.count()
+        self._changed = asyncio.Event()
+        self._runner: asyncio.Task | None = None
+        self._handlers: set[asyncio.Task] = set()
+        self._running: set[uuid.UUID] = set()
+        self._deferred: dict[uuid.UUID, int] = {}
+
+    @staticmethod
+    def now_ms() -> int:
+        return time.time_ns() // 1_000_000
+
+    def __len__(self) -> int:
+        return len(self._deadlines.keys() | self._deferred.keys())
+
+    def rooms(self) -> list[uuid.UUID]:
+        return list(self._deadlines.keys() | self._deferred.keys())
+
+    def deadline(self, room_id: uuid.UUID) -> int | None:
+        return self._deadlines.get(room_id, self._deferred.get(room_id))
+
+    def arm(self, room_id: uuid.UUID, deadline_ms: int) -> None:
+        """
+        Назначает комнате срок (мс по часам сервера), заменяя предыдущий.
+        """
+        if room_id in self._running:
+            self._deferred[room_id] = deadline_ms
+            return
+        if self._deadlines.get(room_id) == deadline_ms:
+            return
+        earliest = self._heap[0][0] if self._heap else None
+        self._deadlines[room_id] = deadline_ms
+        heapq.heappush(self._heap, (deadline_ms, next(self._sequence), room_id))
+        self._compact()
+        if earliest is None or deadline_ms < earliest:
+            self._changed.set()
+
+    def disarm(self, room_id: uuid.UUID) -> None:
+        self._deadlines.pop(room_id, None)
+        self._deferred.pop(room_id, None)
+
+    def _compact(self) -> None:
+        # устаревших записей не должно стать сильно больше действующих
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [
+                entry for entry in self._heap
+                if self._deadlines.get(entry[2]) == entry[0]
+            ]
+            heapq.heapify(self._heap)
+
+    def start(self) -> None:
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        for handler in list(self._handlers):
+            handler.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            while self._heap and self._deadlines.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+
+            delay_ms = self._heap[0][0] - self.now_ms()
+            if delay_ms > 0:
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._slots.acquire()
+            # пока ждали слот, куча могла измениться
+            if (
+                not self._heap
+                or self._deadlines.get(self._heap[0][2]) != self._heap[0][0]
+                or self._heap[0][0] > self.now_ms()
+            ):
+                self._slots.release()
+                continue
+
+            _, _, room_id = heapq.heappop(self._heap)
+            del self._deadlines[room_id]
+            self._running.add(room_id)
+            handler = asyncio.create_task(self._fire(room_id))
+            self._handlers.add(handler)
+            handler.add_done_callback(self._handlers.discard)
+
+    async def _fire(self, room_id: uuid.UUID) -> None:
+        try:
+            await self._on_due(room_id)
+        except Exception as e:
+            logger.error('PlaybackTimer: ошибка при обработке таймера комнаты %s %r', room_id, e, exc_info=True)
+        finally:
+            self._slots.release()
+            self._running.discard(room_id)
+            deadline_ms = self._deferred.pop(room_id, None)
+            if deadline_ms is not None:
+                now = self.now_ms()
+                if deadline_ms <= now:
+                    # срок прошёл, пока работал обработчик: сразу же повторно его не запускаем
+                    deadline_ms = now + settings.playback.TIMER_RETRY_MS
+                self.arm(room_id, deadline_ms)
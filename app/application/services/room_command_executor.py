@@ -0,0 +1,180 @@
+import asyncio
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.domain.entity import PlayerCommand
+from app.domain.enum import ControlAction
+from app.infrastructure.redis.redis_service import RedisService
+
+
+_LOCK_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_UNLOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass(slots=True)
+class _PendingCommand:
+    command: PlayerCommand
+    execute: Callable[[PlayerCommand], Awaitable[Any]]
+    futures: list[asyncio.Future] = field(default_factory=list)
+
+
+class RoomCommandExecutor:
+    """
+    Выполняет команды плеера каждой комнаты строго по очереди.
+
+    У комнаты своя очередь и свой обработчик, который живёт, пока очередь не пуста:
+    команды разных комнат не ждут друг друга. Между процессами API команды одной
+    комнаты сериализуются короткой блокировкой в Redis, поэтому два модератора,
+    нажавшие кнопки одновременно, не перемешают вызовы Spotify и запись часов.
+    Пока команда выполняется, блокировка продлевается каждую треть
+    PLAYER_COMMAND_LOCK_TTL_MS: несколько вызовов Spotify подряд могут идти дольше TTL.
+
+    Первая команда ждёт PLAYER_COMMAND_COALESCE_MS, и всё, что пришло за это окно,
+    склеивается (coalesce): подряд идущие skip суммируются в один skip с count,
+    из подряд идущих play/pause остаётся последняя, а play конкретного трека
+    отменяет всё, что было до него. Каждый ожидающий получает результат той
+    команды, в которую склеилась его собственная.
+    """
+
+    def __init__(self, redis_service: RedisService):
+        self.redis_service = redis_service
+        self._queues: dict[uuid.UUID, deque[_PendingCommand]] = {}
+        self._workers: dict[uuid.UUID, asyncio.Task] = {}
+
+    @staticmethod
+    def _lock_key(room_id: uuid.UUID) -> str:
+        return f'room_player:{room_id}:command_lock'
+
+    async def submit(
+        self,
+        room_id: uuid.UUID,
+        command: PlayerCommand,
+        execute: Callable[[PlayerCommand], Awaitable[Any]],
+    ) -> Any:
+        """
+        Ставит команду в очередь комнаты и ждёт результата её выполнения.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(room_id, deque()).append(_PendingCommand(command, execute, [future]))
+        if room_id not in self._workers:
+            self._workers[room_id] = asyncio.create_task(self._drain(room_id))
+        return await future
+
+    async def _drain(self, room_id: uuid.UUID) -> None:
+        queue = self._queues[room_id]
+        try:
+            while queue:
+                await asyncio.sleep(settings.playback.PLAYER_COMMAND_COALESCE_MS / 1000)
+                batch = list(queue)
+                queue.clear()
+                merged = self._coalesce(batch)
+                if len(merged) < len(batch):
+                    logger.info(
+                        'RoomCommandExecutor: %s команд комнаты %s склеены в %s', len(batch), room_id, len(merged)
+                    )
+                for pending in merged:
+                    await self._run(room_id, pending)
+        finally:
+            del self._queues[room_id]
+            del self._workers[room_id]
+
+    async def _run(self, room_id: uuid.UUID, pending: _PendingCommand) -> None:
+        if all(future.done() for future in pending.futures):
+            return
+        try:
+            async with self._room_lock(room_id):
+                result = await pending.execute(pending.command)
+        except Exception as e:
+            for future in pending.futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future in pending.futures:
+                if not future.done():
+                    future.set_result(result)
+
+    @staticmethod
+    def _coalesce(batch: list[_PendingCommand]) -> list[_PendingCommand]:
+        """
+        Склеивает команды, пришедшие за одно окно, сохраняя итоговое состояние плеера.
+        Выполняется от имени последнего пользователя, чья команда вошла в склейку:
+        права каждой команды проверяются ещё до постановки в очередь.
+        """
+        merged: list[_PendingCommand] = []
+        for pending in batch:
+            command = pending.command
+            last = merged[-1] if merged else None
+            if command.action is ControlAction.PLAY and command.track_uri:
+                # конкретный трек с позиции полностью задаёт состояние плеера
+                futures = [future for previous in merged for future in previous.futures]
+                merged = [_PendingCommand(command, pending.execute, futures + pending.futures)]
+            elif last and command.is_toggle and last.command.is_toggle:
+                merged[-1] = _PendingCommand(command, pending.execute, last.futures + pending.futures)
+            elif last and command.action in (ControlAction.SKIP, ControlAction.SKIP_PREVIOUS) and last.command.action is command.action:
+                merged[-1] = _PendingCommand(
+                    replace(last.command, count=last.command.count + command.count),
+                    pending.execute,
+                    last.futures + pending.futures,
+                )
+            else:
+                merged.append(_PendingCommand(command, pending.execute, list(pending.futures)))
+        return merged
+
+    @asynccontextmanager
+    async def _room_lock(self, room_id: uuid.UUID) -> AsyncIterator[None]:
+        key = self._lock_key(room_id)
+        token = uuid.uuid4().hex
+        ttl_ms = settings.playback.PLAYER_COMMAND_LOCK_TTL_MS
+        while True:
+            locked = await self.redis_service.eval(_LOCK_SCRIPT, [key], [token, ttl_ms])
+            if locked is None:
+                # без Redis сериализуем хотя бы в пределах процесса
+                logger.warning('RoomCommandExecutor: блокировка комнаты %s недоступна', room_id)
+                break
+            if locked:
+                break
+            await asyncio.sleep(0.02)
+        renewal = asyncio.create_task(self._renew_lock(room_id, key, token)) if locked else None
+        try:
+            yield
+        finally:
+            if renewal:
+                renewal.cancel()
+                try:
+                    await renewal
+                except asyncio.CancelledError:
+                    pass
+            if locked:
+                await self.redis_service.eval(_UNLOCK_SCRIPT, [key], [token])
+
+    async def _renew_lock(self, room_id: uuid.UUID, key: str, token: str) -> None:
+        ttl_ms = settings.playback.PLAYER_COMMAND_LOCK_TTL_MS
+        while True:
+            await asyncio.sleep(ttl_ms / 3000)
+            renewed = await self.redis_service.eval(_RENEW_SCRIPT, [key], [token, ttl_ms])
+            if not renewed:
+                logger.warning('RoomCommandExecutor: блокировка комнаты %s потеряна во время команды', room_id)
+                return
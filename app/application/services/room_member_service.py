@@ -25,6 +25,7 @@ from app.domain.interfaces.notification_gateway import NotificationGateway
 
 from app.presentation.auth.hash import verify_pass
 from app.infrastructure.ws.manager_notify_service import NotifyService
+from app.infrastructure.redis.player_state_cache import PlayerStateCache
 from app.presentation.schemas.user_schemas import UserResponse
 
 from app.domain.exceptions.exception import ServerError
@@ -60,7 +61,8 @@ class RoomMemberService:
         ban_mapper: BanMapper,
         room_member_mapper: RoomMemberMapper,
         notify_mapper: NotificationMapper,
-        notify_service: NotifyService
+        notify_service: NotifyService,
+        player_state: PlayerStateCache,
     ):
         self.room_repo = room_repo
         self.user_repo = user_repo
@@ -73,6 +75,7 @@ class RoomMemberService:
         self.room_member_mapper = room_member_mapper
         self.notify_mapper = notify_mapper
         self.notify_service = notify_service
+        self.player_state = player_state
     
     def _check_notification_owner(self,notification: NotificationEntity,current_user_id: uuid.UUID):
         if not notification.user_id == current_user_id:
@@ -203,6 +206,7 @@ class RoomMemberService:
         try:
             room_name_for_message = room.name
             deleted_successfully = self.member_room_repo.remove_member(user.id, room_id)
+            await self.player_state.forget_member(room_id, user.id)
             
             await self.notify_service.send_mesasge_for_user(
                 action="leave_room",
@@ -407,6 +411,7 @@ class RoomMemberService:
 
         try:
             self.member_room_repo.remove_member(user_id, room_id)
+            await self.player_state.forget_member(room_id, user_id)
 
             await self.notify_service.send_mesasge_for_user(
                 action="user_kicked_from_room",
@@ -493,6 +498,7 @@ class RoomMemberService:
                 raise ServerError(
                     detail="Не удалось подготовить пользователя к бану.",
                 )
+            await self.player_state.forget_member(room_id, target_user_id)
         try:
             new_ban_entry = self.ban_repo.add_ban(
                 ban_user_id=target_user_id,
@@ -1,21 +1,33 @@
 import json
 import uuid
+from dataclasses import dataclass, replace
 
 from app.config.log_config import logger
+from app.config.settings import settings
+from app.domain.entity import PlayerCommand, RoomEntity, RoomPlaybackClock, RoomTrackAssociationEntity, TrackEntity
 from app.domain.entity.user import UserEntity
 from app.domain.interfaces.member_room_association import MemberRoomAssociationGateway
 from app.domain.interfaces.room_gateway import RoomGateway
 from app.domain.interfaces.room_track_association_gateway import RoomTrackAssociationGateway
+from app.domain.interfaces.track_gateway import TrackGateway
 from app.domain.interfaces.user_gateway import UserGateway
 
-from app.domain.enum import Role
+from app.domain.enum import ControlAction, Role
 from app.presentation.schemas.room_schemas import RoomResponse
-from app.presentation.schemas.spotify_schemas import SpotifyTrackDetails
+from app.presentation.schemas.track_schemas import TrackResponse
 
-from app.application.mappers.mappers import RoomMapper
+from app.application.mappers.room_mapper import RoomMapper
+from app.application.mappers.track_mapper import TrackMapper
+from app.application.services.room_command_executor import RoomCommandExecutor
 from app.infrastructure.external.spotify import SpotifyService
+from app.infrastructure.external.http_service import HttpService
+from app.infrastructure.redis.redis_service import RedisService
 
 from app.infrastructure.ws.manager_notify_service import NotifyService
+from app.infrastructure.redis.playback_clock_service import PlaybackClockService
+from app.infrastructure.redis.player_state_cache import PlayerStateCache
+from app.infrastructure.redis.room_queue_cache import RoomQueueCache
+from app.infrastructure.ws.room_event_service import RoomEventService
 
 from app.domain.exceptions.exception import ServerError
 from app.domain.exceptions.room_exception import (
@@ -27,6 +39,33 @@ from app.domain.exceptions.room_exception import (
 from app.domain.exceptions.spotify_exception import SpotifyAuthorizeError,SpotifyDeviceNotFoundError
 
 
+_COMMAND_NAMES = {
+    ControlAction.PLAY: "play",
+    ControlAction.PAUSE: "pause",
+    ControlAction.SKIP: "skip next",
+    ControlAction.SKIP_PREVIOUS: "skip previous",
+}
+
+
+@dataclass(slots=True)
+class _PlayerCommandContext:
+    """
+    Всё, что нужно команде плеера: загружается один раз на команду.
+    """
+    room: RoomEntity
+    host_user: UserEntity
+    spotify_service: SpotifyService
+    _spotify_index: dict[str, uuid.UUID] | None = None
+
+    def spotify_index(self, room_track_repo: RoomTrackAssociationGateway) -> dict[str, uuid.UUID]:
+        """
+        Spotify ID -> ID записи в очереди; очередь читается один раз и только если нужна.
+        """
+        if self._spotify_index is None:
+            self._spotify_index = room_track_repo.get_spotify_index(self.room.id)
+        return self._spotify_index
+
+
 class RoomPlaybackService:
     """
     Реализует бизнес логику для работы с плеером комнаты
@@ -38,13 +77,39 @@ class RoomPlaybackService:
         room_track_repo: RoomTrackAssociationGateway,
         room_repo: RoomGateway,
         member_room_repo: MemberRoomAssociationGateway,
+        track_repo: TrackGateway,
         notify_service: NotifyService,
+        playback_clock: PlaybackClockService,
+        track_mapper: TrackMapper,
+        room_events: RoomEventService,
+        player_state: PlayerStateCache,
+        command_executor: RoomCommandExecutor,
+        queue_cache: RoomQueueCache,
+        redis_service: RedisService,
+        http_service: HttpService,
+        room_mapper: RoomMapper,
     ):
         self.user_repo = user_repo
         self.room_track_repo = room_track_repo
         self.room_repo = room_repo
         self.member_room_repo = member_room_repo
+        self.track_repo = track_repo
         self.notify_service = notify_service
+        self.playback_clock = playback_clock
+        self.track_mapper = track_mapper
+        self.room_events = room_events
+        self.player_state = player_state
+        self.command_executor = command_executor
+        self.queue_cache = queue_cache
+        self.redis_service = redis_service
+        self.http_service = http_service
+        self.room_mapper = room_mapper
+
+    def _spotify_for(self, host_user: UserEntity) -> SpotifyService:
+        """
+        Клиент Spotify от имени хоста воспроизведения.
+        """
+        return SpotifyService(self.redis_service, self.http_service, user=host_user)
 
     async def set_playback_host(
         self, room_id: uuid.UUID, user_id: uuid.UUID, current_user: UserEntity
@@ -62,7 +127,7 @@ class RoomPlaybackService:
         )
         if not current_user_assoc:
             raise UserNotInRoomError()
-        if current_user_assoc.role not in [Role.MODERATOR, Role.OWNER]:
+        if current_user_assoc.role not in [Role.MODERATOR.value, Role.OWNER.value]:
             logger.warning(
                 f"API: Пользователь '{user_id}' попытался назначить хоста в комнате '{room_id}' без прав (роль: {current_user_assoc.role if current_user_assoc else 'None'})."
             )
@@ -82,7 +147,10 @@ class RoomPlaybackService:
         if not host_user:
             raise UserNotInRoomError(detail="Указанный пользователь не найден.")
 
-        if not host_user.spotify_access_token or not host_user.spotify_refresh_token:
+        spotify_service = self._spotify_for(host_user)
+        try:
+            await spotify_service.check_user_spotify_credentials()
+        except SpotifyAuthorizeError:
             logger.warning(
                 f"RoomService: Пользователь '{user_id}' не может быть хостом воспроизведения: не авторизован в Spotify."
             )
@@ -90,10 +158,7 @@ class RoomPlaybackService:
                 detail="Пользователь должен быть авторизован в Spotify, чтобы стать хостом воспроизведения."
             )
 
-        spotify_service = SpotifyService(host_user)
-        active_device_id = await spotify_service._get_device_id(
-            host_user.spotify_access_token
-        )
+        active_device_id = await spotify_service.get_active_device_id()
         if not active_device_id:
             logger.warning(
                 f"RoomService: Пользователь '{user_id}' не может быть хостом воспроизведения: нет активных устройств Spotify."
@@ -103,11 +168,13 @@ class RoomPlaybackService:
                 detail="У пользователя нет активных устройств Spotify. Пожалуйста, запустите Spotify на одном из ваших устройств и повторите попытку.",
             )
 
-        room.playback_host_id = user_id
-        room.active_spotify_device_id = active_device_id
-        room.is_playing = False
-
+        host_changes = {
+            "playback_host_id": user_id,
+            "active_spotify_device_id": active_device_id,
+            "is_playing": False,
+        }
         try:
+            self.room_repo.update_room(room, host_changes)
             logger.info(
                 f"RoomService: Пользователь '{user_id}' успешно назначен хостом воспроизведения для комнаты '{room_id}'."
             )
@@ -118,6 +185,9 @@ class RoomPlaybackService:
             )
             raise ServerError(detail="Не удалось назначить хоста воспроизведения.")
 
+        room = replace(room, **host_changes)
+        await self.player_state.save_host(room_id, user_id, host_user.username)
+
         await self.notify_service.send_mesasge_for_user(
             {
             "action": "playback_host_changed",
@@ -132,7 +202,7 @@ class RoomPlaybackService:
         logger.info(
             f"RoomService: Отправлено WS-уведомление о смене хоста воспроизведения в комнате '{room_id}'."
         )
-        return RoomMapper.to_response(room)
+        return self.room_mapper.to_response(room)
 
     async def clear_playback_host(self, room_id: uuid.UUID) -> RoomResponse:
         """
@@ -143,16 +213,19 @@ class RoomPlaybackService:
             logger.info(
                 f"RoomService: Для комнаты '{room_id}' нет активного хоста воспроизведения для сброса."
             )
-            return RoomMapper.to_response(room)
+            return self.room_mapper.to_response(room)
 
         old_host_id = room.playback_host_id
-
+        host_changes = {
+            "playback_host_id": None,
+            "active_spotify_device_id": None,
+            "is_playing": False,
+            "current_track_id": None,
+            "current_track_position_ms": 0,
+            "current_playing_track_association_id": None,
+        }
         try:
-            room.playback_host_id = None
-            room.active_spotify_device_id = None
-            room.is_playing = False
-            room.current_track_id = None
-            room.current_track_position_ms = 0
+            self.room_repo.update_room(room, host_changes)
             logger.info(
                 f"RoomService: Хост воспроизведения для комнаты '{room_id}' (бывший хост: '{old_host_id}') успешно очищен."
             )
@@ -163,6 +236,12 @@ class RoomPlaybackService:
             )
             raise ServerError(detail="Не удалось очистить хоста воспроизведения.")
 
+        room = replace(room, **host_changes)
+        # часы и кэш плеера сбрасываются только после того, как комната сохранена
+        await self.playback_clock.clear(room_id)
+        await self.player_state.save_host(room_id, None, None)
+        await self.player_state.save_playback(room_id, None, None)
+
         await self.notify_service.send_mesasge_for_user(
             {
             "action": "playback_host_cleared",
@@ -174,7 +253,228 @@ class RoomPlaybackService:
         logger.info(
             f"RoomService: Отправлено WS-уведомление об очистке хоста воспроизведения в комнате '{room_id}'."
         )
-        return RoomMapper.to_response(room)
+        return self.room_mapper.to_response(room)
+
+    async def _publish_player_state(self, room_id: uuid.UUID, clock: RoomPlaybackClock | None) -> None:
+        """
+        Рассылает участникам комнаты состояние плеера, вычисленное по часам комнаты.
+        Вместо позиции отправляется опорная точка (position_anchor): клиент, синхронизировавший
+        часы через time_sync, считает позицию сам, поэтому периодическая рассылка позиции не нужна.
+        """
+        now = self.playback_clock.now_ms()
+        current_track_details = self._current_track(clock)
+        current_track = current_track_details.model_dump(mode="json") if current_track_details else None
+        await self.player_state.save_playback(room_id, clock, current_track)
+
+        await self.notify_service.send_message_for_room(
+            {
+            "action": "player_state_changed",
+            "room_id": str(room_id),
+            "is_playing": clock.is_playing if clock else False,
+            "current_track_association_id": (
+                str(clock.track_association_id)
+                if clock and clock.track_association_id
+                else None
+            ),
+            "current_track": current_track,
+            "position_anchor": clock.anchor(now) if clock else None,
+            "duration_ms": clock.duration_ms if clock else 0,
+            }
+        )
+        logger.debug(
+            f"RoomService: Отправлено WS-уведомление об изменении состояния плеера в комнате '{room_id}'."
+        )
+
+    def _current_track(self, clock: RoomPlaybackClock | None) -> TrackResponse | None:
+        if not clock:
+            return None
+        track: TrackEntity | None = None
+        if clock.track_association_id:
+            current_track_assoc = self.room_track_repo.get_association_by_id(clock.track_association_id)
+            track = self.track_repo.get_track_by_id(current_track_assoc.track_id) if current_track_assoc else None
+        if not track and clock.track_uri:
+            track = self.track_repo.get_track_by_spotify_id(clock.track_uri.split(':')[-1])
+        return self.track_mapper.to_response_track(track) if track else None
+
+    async def _reconcile_with_spotify(
+        self,
+        room: RoomEntity,
+        spotify_service: SpotifyService,
+        context: _PlayerCommandContext | None = None,
+    ) -> tuple[RoomPlaybackClock | None, bool]:
+        """
+        Сверяет часы комнаты с фактическим состоянием плеера хоста.
+        Нужна, когда сервер не может сам вычислить состояние (skip) или часы давно не сверялись.
+        Возвращает часы и признак того, что они были исправлены.
+        """
+        playback_state = await spotify_service.get_playback_state()
+        if not playback_state:
+            return await self.playback_clock.get(room.id), False
+
+        current_track = playback_state.get("current_track")
+        spotify_index = (
+            context.spotify_index(self.room_track_repo)
+            if context
+            else self.room_track_repo.get_spotify_index(room.id)
+        )
+        track_assoc_id = spotify_index.get(current_track.id) if current_track else None
+        clock, drifted = await self.playback_clock.reconcile(
+            room.id,
+            progress_ms=playback_state.get("progress_ms") or 0,
+            is_playing=bool(playback_state.get("is_playing")),
+            duration_ms=playback_state.get("duration_ms") or 0,
+            track_association_id=track_assoc_id,
+            track_uri=current_track.uri if current_track else None,
+        )
+        self._store_playback_flags(room, clock)
+        return clock, drifted
+
+    def _store_playback_flags(self, room: RoomEntity, clock: RoomPlaybackClock | None) -> None:
+        """
+        Сохраняет в базе только то, что меняется редко: играет ли комната и какой трек.
+        Позиция живёт в часах комнаты.
+        """
+        is_playing = bool(clock and clock.is_playing)
+        track_assoc_id = clock.track_association_id if clock else None
+        if room.is_playing == is_playing and room.current_playing_track_association_id == track_assoc_id:
+            return
+        self.room_repo.update_room(
+            room,
+            {"is_playing": is_playing, "current_playing_track_association_id": track_assoc_id},
+        )
+
+    def _next_in_queue(self, room_id: uuid.UUID, current_association_id: uuid.UUID | None) -> RoomTrackAssociationEntity | None:
+        """
+        Запись очереди, которая должна играть после текущей.
+        """
+        queue = self.room_track_repo.get_queue_for_room(room_id)
+        queue_ids = [assoc.id for assoc in queue]
+        if current_association_id not in queue_ids:
+            return queue[0] if queue else None
+        next_index = queue_ids.index(current_association_id) + 1
+        return queue[next_index] if next_index < len(queue) else None
+
+    async def _drop_finished(self, room_id: uuid.UUID, association_id: uuid.UUID | None) -> None:
+        if association_id and self.room_track_repo.remove_track_from_queue_by_association_id(association_id):
+            await self.queue_cache.remove(room_id, association_id)
+            await self.room_events.publish(room_id, {"action": "queue_delta", "op": "remove", "id": str(association_id)})
+
+    async def advance_to_next_track(self, room_id: uuid.UUID) -> RoomPlaybackClock | None:
+        """
+        Вызывается планировщиком по таймеру комнаты.
+
+        Переход между треками делается без паузы: за PREQUEUE_LEAD_MS до конца
+        следующая запись очереди добавляется в очередь устройства хоста, и Spotify
+        переключается на неё сам. После конца трека планировщик сверяется со Spotify:
+        если играет уже следующий трек, переход подтверждён и доигравшая запись
+        убирается из очереди комнаты. Если Spotify не переключился (очередь устройства
+        очистили, трек не был добавлен), следующий трек включается явным play.
+        """
+        room = self.room_repo.get_room_by_id(room_id)
+        if not room or not room.playback_host_id or not room.active_spotify_device_id:
+            await self.playback_clock.clear(room_id)
+            return None
+
+        host_user = self.user_repo.get_user_by_id(room.playback_host_id)
+        if not host_user:
+            await self.clear_playback_host(room_id)
+            return None
+
+        spotify_service = self._spotify_for(host_user)
+        try:
+            return await self._advance_room(room, spotify_service)
+        except SpotifyDeviceNotFoundError:
+            rediscovered = await self._rediscover_device(room, spotify_service)
+            if not rediscovered:
+                raise
+            return await self._advance_room(rediscovered, spotify_service)
+
+    async def _advance_room(self, room: RoomEntity, spotify_service: SpotifyService) -> RoomPlaybackClock | None:
+        room_id = room.id
+        previous = await self.playback_clock.get(room_id)
+        track_finished = bool(
+            previous
+            and previous.is_playing
+            and previous.remaining_ms(self.playback_clock.now_ms()) <= settings.playback.TRACK_END_LEAD_MS
+        )
+        clock, drifted = await self._reconcile_with_spotify(room, spotify_service)
+
+        if (
+            previous
+            and clock
+            and clock.track_association_id
+            and clock.track_association_id != previous.track_association_id
+        ):
+            # Spotify сам перешёл на следующий трек (обычно — на заранее добавленный)
+            await self._drop_finished(room_id, previous.track_association_id)
+            await self._publish_player_state(room_id, clock)
+            logger.info(f"RoomService: В комнате '{room_id}' подтверждён переход на трек '{clock.track_uri}'.")
+            return clock
+
+        if clock and clock.is_playing:
+            remaining_ms = clock.remaining_ms(self.playback_clock.now_ms())
+            if remaining_ms > settings.playback.TRACK_END_LEAD_MS:
+                if remaining_ms <= settings.playback.PREQUEUE_LEAD_MS and not clock.prequeued_association_id:
+                    clock = await self._prequeue_next(room, spotify_service, clock) or clock
+                if drifted:
+                    await self._publish_player_state(room_id, clock)
+                return clock
+        elif clock and not track_finished:
+            if drifted:
+                await self._publish_player_state(room_id, clock)
+            return clock
+
+        await self._drop_finished(room_id, (clock or previous).track_association_id if (clock or previous) else None)
+
+        next_assoc = self.room_track_repo.get_first_track_in_queue(room_id)
+        track = self.track_repo.get_track_by_id(next_assoc.track_id) if next_assoc else None
+        if not track:
+            logger.info(f"RoomService: Очередь комнаты '{room_id}' закончилась, воспроизведение остановлено.")
+            await spotify_service.pause(device_id=room.active_spotify_device_id)
+            await self.playback_clock.clear(room_id)
+            self._store_playback_flags(room, None)
+            await self._publish_player_state(room_id, None)
+            return None
+
+        await spotify_service.play(device_id=room.active_spotify_device_id, track_uri=track.spotify_uri)
+        clock = await self.playback_clock.start(
+            room_id,
+            track_association_id=next_assoc.id,
+            track_uri=track.spotify_uri,
+            duration_ms=track.duration_ms,
+        )
+        self._store_playback_flags(room, clock)
+        await self._publish_player_state(room_id, clock)
+        logger.info(f"RoomService: В комнате '{room_id}' включён следующий трек '{track.spotify_uri}'.")
+        return clock
+
+    async def _rediscover_device(self, room: RoomEntity, spotify_service: SpotifyService) -> RoomEntity | None:
+        """
+        Spotify не нашёл устройство комнаты: заново запрашивает активное устройство хоста.
+        Если нашлось другое устройство, сохраняет его в комнате и возвращает копию комнаты
+        с новым устройством для повтора команды; иначе возвращает None.
+        """
+        device_id = await spotify_service.get_active_device_id(refresh=True)
+        if not device_id or device_id == room.active_spotify_device_id:
+            logger.warning(f"RoomService: Активное устройство хоста комнаты '{room.id}' не найдено.")
+            return None
+        logger.info(f"RoomService: Устройство хоста комнаты '{room.id}' сменилось на '{device_id}'.")
+        self.room_repo.update_room(room, {"active_spotify_device_id": device_id})
+        return replace(room, active_spotify_device_id=device_id)
+
+    async def _prequeue_next(
+        self, room: RoomEntity, spotify_service: SpotifyService, clock: RoomPlaybackClock
+    ) -> RoomPlaybackClock | None:
+        """
+        Добавляет следующую запись очереди комнаты в очередь устройства хоста.
+        """
+        next_assoc = self._next_in_queue(room.id, clock.track_association_id)
+        track = self.track_repo.get_track_by_id(next_assoc.track_id) if next_assoc else None
+        if not track:
+            return None
+        await spotify_service.add_to_queue(device_id=room.active_spotify_device_id, track_uri=track.spotify_uri)
+        logger.info(f"RoomService: В комнате '{room.id}' трек '{track.spotify_uri}' заранее добавлен в очередь устройства хоста.")
+        return await self.playback_clock.mark_prequeued(room.id, next_assoc.id)
 
     async def update_room_playback_state(
         self,
@@ -184,19 +484,32 @@ class RoomPlaybackService:
         is_playing: bool,
     ) -> RoomResponse:
         """
-        Обновляет состояние воспроизведения в полях комнаты.
-        Используется, например, планировщиком или при получении состояния плеера от хоста.
+        Обновляет состояние воспроизведения комнаты по данным плеера хоста.
+        Используется, например, планировщиком при сверке со Spotify.
         """
         room = self.room_repo.get_room_by_id(room_id)
         if not room:
             logger.warning(f"RoomService: Комната с такпим id {room_id} не найдена")
             raise RoomNotFoundError()
 
-        room.current_playing_track_association_id = current_playing_track_assoc_id
-        room.current_track_position_ms = progress_ms
-        room.is_playing = is_playing
+        track: TrackEntity | None = None
+        if current_playing_track_assoc_id:
+            current_track_assoc = self.room_track_repo.get_association_by_id(
+                current_playing_track_assoc_id
+            )
+            if current_track_assoc:
+                track = self.track_repo.get_track_by_id(current_track_assoc.track_id)
 
         try:
+            clock, drifted = await self.playback_clock.reconcile(
+                room_id,
+                progress_ms=progress_ms,
+                is_playing=is_playing,
+                duration_ms=track.duration_ms if track else 0,
+                track_association_id=current_playing_track_assoc_id,
+                track_uri=track.spotify_uri if track else None,
+            )
+            self._store_playback_flags(room, clock)
             logger.debug(
                 f"RoomService: Обновлено состояние воспроизведения для комнаты '{room_id}'. Трек: '{current_playing_track_assoc_id}', Прогресс: {progress_ms}ms, Играет: {is_playing}."
             )
@@ -209,43 +522,28 @@ class RoomPlaybackService:
                 detail="Не удалось обновить состояние воспроизведения комнаты."
             )
 
-        current_track_details: SpotifyTrackDetails | None = None
-        current_track_assoc = None
-        if current_playing_track_assoc_id:
-            current_track_assoc = self.room_track_repo.get_association_by_id(
-                current_playing_track_assoc_id
-            )
-            if current_track_assoc and current_track_assoc.track:
-                current_track_details = SpotifyTrackDetails.model_validate(
-                    current_track_assoc.track
-                )
+        if drifted:
+            await self._publish_player_state(room_id, clock)
+        return self.room_mapper.to_response(room)
 
-        await self.notify_service.send_mesasge_for_user(
-            {
-            "action": "player_state_changed",
-            "room_id": str(room_id),
-            "is_playing": is_playing,
-            "current_track_association_id": (
-                str(current_playing_track_assoc_id)
-                if current_playing_track_assoc_id
-                else None
-            ),
-            "current_track": (
-                current_track_details.model_dump() if current_track_details else None
-            ),
-            "progress_ms": progress_ms,
-            "duration_ms": (
-                current_track_assoc.track.duration_ms
-                if current_track_assoc and current_track_assoc.track
-                else 0
-            ),
-            }
-        )
-        
-        logger.debug(
-            f"RoomService: Отправлено WS-уведомление об изменении состояния плеера в комнате '{room_id}'."
+    async def dispatch_player_command(
+        self, room_id: uuid.UUID, current_user: UserEntity, command: PlayerCommand
+    ) -> dict[str, str]:
+        """
+        Единая точка входа для команд плеера.
+        Права проверяются до постановки в очередь: команды, пришедшие за одно окно,
+        склеиваются и выполняются от имени последнего пользователя, поэтому в очередь
+        попадают только команды владельца или модератора.
+        Команды комнаты выполняются по очереди (RoomCommandExecutor); контекст
+        (комната, хост, SpotifyService) загружается один раз уже внутри очереди,
+        чтобы команда видела результат предыдущей.
+        """
+        self._ensure_can_control_player(room_id, current_user)
+        return await self.command_executor.submit(
+            room_id,
+            command,
+            lambda queued_command: self._execute_player_command(room_id, current_user, queued_command),
         )
-        return RoomMapper.to_response(room)
 
     async def player_command_play(
         self,
@@ -257,85 +555,9 @@ class RoomPlaybackService:
         """
         Отправляет команду "PLAY" на Spotify плеер комнаты через хоста воспроизведения.
         """
-        room = self.room_repo.get_room_by_id(room_id)
-        if not room:
-            logger.warning(f"RoomService: Комната с такпим id {room_id} не найдена")
-            raise RoomNotFoundError()
-
-        member_assoc = self.member_room_repo.get_member_room_association(
-            room_id, current_user.id
+        return await self.dispatch_player_command(
+            room_id, current_user, PlayerCommand(ControlAction.PLAY, track_uri, position_ms)
         )
-        if not member_assoc or member_assoc.role not in [Role.OWNER, Role.MODERATOR]:
-            raise RoomPermissionDeniedError(
-                detail="Только владелец или модератор может управлять плеером."
-            )
-
-        if not room.playback_host_id or not room.active_spotify_device_id:
-            logger.warning(
-                f"RoomService: Попытка отправить команду 'play' в комнату '{room_id}', но нет активного хоста воспроизведения."
-            )
-            raise RoomHostNotFoundError()
-
-        host_user = self.user_repo.get_user_by_id(room.playback_host_id)
-        if not host_user:
-            logger.error(
-                f"RoomService: Хост воспроизведения '{room.playback_host_id}' для комнаты '{room_id}' не найден в БД. Очищаем хоста."
-            )
-            await self.clear_playback_host(room_id)
-            raise ServerError(
-                detail="Внутренняя ошибка: Хост воспроизведения не найден.",
-            )
-
-        spotify_service = SpotifyService(host_user)
-        try:
-            if track_uri:
-                await spotify_service.play(
-                    device_id=room.active_spotify_device_id,
-                    track_uri=track_uri,
-                    position_ms=position_ms,
-                )
-                logger.info(
-                    f"RoomService: Хост '{host_user.id}' по команде пользователя '{current_user.id}' начал воспроизведение трека '{track_uri}' в комнате '{room_id}'."
-                )
-            else:
-                await spotify_service.play(
-                    device_id=room.active_spotify_device_id, position_ms=position_ms
-                )
-                logger.info(
-                    f"RoomService: Хост '{host_user.id}' по команде пользователя '{current_user.id}' возобновил воспроизведение в комнате '{room_id}'."
-                )
-
-            room.is_playing = True
-
-            playback_state = await spotify_service.get_playback_state()
-            if playback_state:
-                current_track_assoc_id: uuid.UUID | None = None
-                if playback_state.get("current_track") and room.tracks_in_queue:
-                    for assoc in room.tracks_in_queue:
-                        if (
-                            assoc.track
-                            and assoc.track.spotify_id
-                            == playback_state["current_track"].id
-                        ):
-                            current_track_assoc_id = assoc.id
-                            break
-
-                await self.update_room_playback_state(
-                    room_id,
-                    current_track_assoc_id,
-                    playback_state.get("progress_ms", 0),
-                    playback_state.get("is_playing", False),
-                )
-        except Exception as e:
-            logger.error(
-                f"RoomService: Неизвестная ошибка при команде 'play' в комнате '{room_id}' через хоста '{host_user.id}': {e}",
-                exc_info=True,
-            )
-            raise ServerError(
-                detail="Ошибка при управлении плеером Spotify.",
-            )
-
-        return {"message": "Команда 'play' успешно отправлена."}
 
     async def player_command_pause(
         self, room_id: uuid.UUID, current_user: UserEntity
@@ -343,74 +565,7 @@ class RoomPlaybackService:
         """
         Отправляет команду "PAUSE" на Spotify плеер комнаты через хоста воспроизведения.
         """
-        room = self.room_repo.get_room_by_id(room_id)
-        if not room:
-            logger.warning(f"RoomService: Комната с такпим id {room_id} не найдена")
-            raise RoomNotFoundError()
-
-        member_assoc = self.member_room_repo.get_member_room_association(
-            room_id, current_user.id
-        )
-        if not member_assoc or member_assoc.role not in [Role.OWNER, Role.MODERATOR]:
-            raise RoomPermissionDeniedError(
-                detail="Только владелец или модератор может управлять плеером."
-            )
-
-        if not room.playback_host_id or not room.active_spotify_device_id:
-            logger.warning(
-                f"RoomService: Попытка отправить команду 'pause' в комнату '{room_id}', но нет активного хоста воспроизведения."
-            )
-            raise RoomHostNotFoundError()
-
-        host_user = self.user_repo.get_user_by_id(room.playback_host_id)
-        if not host_user:
-            logger.error(
-                f"RoomService: Хост воспроизведения '{room.playback_host_id}' для комнаты '{room_id}' не найден в БД. Очищаем хоста."
-            )
-            await self.clear_playback_host(room_id)
-            raise ServerError(
-                detail="Внутренняя ошибка: Хост воспроизведения не найден.",
-            )
-
-        spotify_service = SpotifyService(host_user)
-        try:
-            await spotify_service.pause(
-                device_id=room.active_spotify_device_id,
-            )
-            logger.info(
-                f"RoomService: Хост '{host_user.id}' по команде пользователя '{current_user.id}' остановил воспроизведение трека '{room.current_track_id}' в комнате '{room_id}'."
-            )
-            room.is_playing = False
-
-            playback_state = await spotify_service.get_playback_state()
-            if playback_state:
-                current_track_assoc_id: uuid.UUID | None = None
-                if playback_state.get("current_track") and room.tracks_in_queue:
-                    for assoc in room.tracks_in_queue:
-                        if (
-                            assoc.track
-                            and assoc.track.spotify_id
-                            == playback_state["current_track"].id
-                        ):
-                            current_track_assoc_id = assoc.id
-                            break
-
-                await self.update_room_playback_state(
-                    room_id,
-                    current_track_assoc_id,
-                    playback_state.get("progress_ms", 0),
-                    playback_state.get("is_playing", False),
-                )
-        except Exception as e:
-            logger.error(
-                f"RoomService: Неизвестная ошибка при команде 'pause' в комнате '{room_id}' через хоста '{host_user.id}': {e}",
-                exc_info=True,
-            )
-            raise ServerError(
-                detail="Ошибка при управлении плеером Spotify.",
-            )
-
-        return {"message": "Команда 'pause' успешно отправлена."}
+        return await self.dispatch_player_command(room_id, current_user, PlayerCommand(ControlAction.PAUSE))
 
     async def player_command_skip_next(
         self, room_id: uuid.UUID, current_user: UserEntity
@@ -418,71 +573,7 @@ class RoomPlaybackService:
         """
         Отправляет команду "SKIP NEXT" на Spotify плеер комнаты через хоста воспроизведения.
         """
-        room = self.room_repo.get_room_by_id(room_id)
-        if not room:
-            logger.warning(f"RoomService: Комната с такпим id {room_id} не найдена")
-            raise RoomNotFoundError()
-
-        member_assoc = self.member_room_repo.get_member_room_association(
-            room_id, current_user.id
-        )
-        if not member_assoc or member_assoc.role not in [Role.OWNER, Role.MODERATOR]:
-            raise RoomPermissionDeniedError(
-                detail="Только владелец или модератор может управлять плеером."
-            )
-
-        if not room.playback_host_id or not room.active_spotify_device_id:
-            logger.warning(
-                f"RoomService: Попытка отправить команду 'skip next' в комнату '{room_id}', но нет активного хоста воспроизведения."
-            )
-            raise RoomHostNotFoundError()
-
-        host_user = self.user_repo.get_user_by_id(room.playback_host_id)
-        if not host_user:
-            logger.error(
-                f"RoomService: Хост воспроизведения '{room.playback_host_id}' для комнаты '{room_id}' не найден в БД. Очищаем хоста."
-            )
-            await self.clear_playback_host(room_id)
-            raise ServerError(
-                detail="Внутренняя ошибка: Хост воспроизведения не найден.",
-            )
-
-        spotify_service = SpotifyService(host_user)
-        try:
-            await spotify_service.skip_next(device_id=room.active_spotify_device_id)
-            logger.info(
-                f"RoomService: Хост '{host_user.id}' по команде пользователя '{current_user.id}' переключил на следующий трек в комнате '{room_id}'."
-            )
-
-            playback_state = await spotify_service.get_playback_state()
-            if playback_state:
-                current_track_assoc_id: uuid.UUID | None = None
-                if playback_state.get("current_track") and room.tracks_in_queue:
-                    for assoc in room.tracks_in_queue:
-                        if (
-                            assoc.track
-                            and assoc.track.spotify_id
-                            == playback_state["current_track"].id
-                        ):
-                            current_track_assoc_id = assoc.id
-                            break
-
-                await self.update_room_playback_state(
-                    room_id,
-                    current_track_assoc_id,
-                    playback_state.get("progress_ms", 0),
-                    playback_state.get("is_playing", False),
-                )
-        except Exception as e:
-            logger.error(
-                f"RoomService: Неизвестная ошибка при команде 'skip next' в комнате '{room_id}' через хоста '{host_user.id}': {e}",
-                exc_info=True,
-            )
-            raise ServerError(
-                detail="Ошибка при управлении плеером Spotify.",
-            )
-
-        return {"message": "Команда 'skip next' успешно отправлена."}
+        return await self.dispatch_player_command(room_id, current_user, PlayerCommand(ControlAction.SKIP))
 
     async def player_command_skip_previous(
         self, room_id: uuid.UUID, current_user: UserEntity
@@ -490,22 +581,38 @@ class RoomPlaybackService:
         """
         Отправляет команду "SKIP PREVIOUS" на Spotify плеер комнаты через хоста воспроизведения.
         """
-        room = self.room_repo.get_room_by_id(room_id)
-        if not room:
-            logger.warning(f"RoomService: Комната с такпим id {room_id} не найдена")
-            raise RoomNotFoundError()
+        return await self.dispatch_player_command(room_id, current_user, PlayerCommand(ControlAction.SKIP_PREVIOUS))
 
+    def _ensure_can_control_player(self, room_id: uuid.UUID, current_user: UserEntity) -> None:
+        """
+        Проверяет, что пользователь — владелец или модератор комнаты.
+        """
         member_assoc = self.member_room_repo.get_member_room_association(
             room_id, current_user.id
         )
-        if not member_assoc or member_assoc.role not in [Role.OWNER, Role.MODERATOR]:
+        if not member_assoc:
+            if not self.room_repo.get_room_by_id(room_id):
+                logger.warning(f"RoomService: Комната с такпим id {room_id} не найдена")
+                raise RoomNotFoundError()
+        if not member_assoc or member_assoc.role not in [Role.OWNER.value, Role.MODERATOR.value]:
             raise RoomPermissionDeniedError(
                 detail="Только владелец или модератор может управлять плеером."
             )
 
+    async def _load_command_context(
+        self, room_id: uuid.UUID, command_name: str
+    ) -> _PlayerCommandContext:
+        """
+        Загружает всё, что нужно команде плеера. Права уже проверены при постановке в очередь.
+        """
+        room = self.room_repo.get_room_by_id(room_id)
+        if not room:
+            logger.warning(f"RoomService: Комната с такпим id {room_id} не найдена")
+            raise RoomNotFoundError()
+
         if not room.playback_host_id or not room.active_spotify_device_id:
             logger.warning(
-                f"RoomService: Попытка отправить команду 'skip previous' в комнату '{room_id}', но нет активного хоста воспроизведения."
+                f"RoomService: Попытка отправить команду '{command_name}' в комнату '{room_id}', но нет активного хоста воспроизведения."
             )
             raise RoomHostNotFoundError()
 
@@ -519,66 +626,163 @@ class RoomPlaybackService:
                 detail="Внутренняя ошибка: Хост воспроизведения не найден.",
             )
 
-        spotify_service = SpotifyService(host_user)
+        return _PlayerCommandContext(room=room, host_user=host_user, spotify_service=self._spotify_for(host_user))
+
+    async def _skip_ahead_in_queue(
+        self, context: _PlayerCommandContext, clock: RoomPlaybackClock | None, count: int
+    ) -> RoomPlaybackClock | None:
+        """
+        Skip (один или несколько склеенных) одним вызовом Spotify: сразу включается трек,
+        стоящий в очереди на count позиций дальше текущего, а пропущенные
+        записи убираются из очереди, чтобы переход по окончании трека их не включил.
+        Если текущего трека в очереди нет, skip повторяется count раз
+        и какой трек включил Spotify, узнаётся сверкой.
+        """
+        room = context.room
+        device_id = room.active_spotify_device_id
+        queue = self.room_track_repo.get_queue_for_room(room.id)
+        queue_ids = [assoc.id for assoc in queue]
+        current_id = clock.track_association_id if clock else None
+
+        if current_id not in queue_ids or queue_ids.index(current_id) + count >= len(queue):
+            for _ in range(count):
+                await context.spotify_service.skip_next(device_id=device_id)
+            clock, _ = await self._reconcile_with_spotify(room, context.spotify_service, context)
+            return clock
+
+        current_index = queue_ids.index(current_id)
+        target = queue[current_index + count]
+        track = self.track_repo.get_track_by_id(target.track_id)
+        await context.spotify_service.play(device_id=device_id, track_uri=track.spotify_uri)
+        for skipped in queue[current_index:current_index + count]:
+            if self.room_track_repo.remove_track_from_queue_by_association_id(skipped.id):
+                await self.queue_cache.remove(room.id, skipped.id)
+                await self.room_events.publish(room.id, {"action": "queue_delta", "op": "remove", "id": str(skipped.id)})
+        return await self.playback_clock.start(
+            room.id,
+            track_association_id=target.id,
+            track_uri=track.spotify_uri,
+            duration_ms=track.duration_ms,
+        )
+
+    async def _execute_player_command(
+        self, room_id: uuid.UUID, current_user: UserEntity, command: PlayerCommand
+    ) -> dict[str, str]:
+        command_name = _COMMAND_NAMES[command.action]
+        context = await self._load_command_context(room_id, command_name)
+        room = context.room
+
+        current_clock = await self.playback_clock.get(room_id)
+        if command.is_toggle and current_clock and current_clock.is_playing == (command.action is ControlAction.PLAY) and not command.position_ms:
+            # например, play/pause/play склеились в play, а комната и так играет
+            logger.info(f"RoomService: Команда '{command_name}' в комнате '{room_id}' не меняет состояние плеера, пропущена.")
+            return {"message": f"Команда '{command_name}' успешно отправлена."}
+
         try:
-            await spotify_service.skip_next(device_id=room.active_spotify_device_id)
+            try:
+                clock = await self._apply_player_command(context, command, current_clock)
+            except SpotifyDeviceNotFoundError:
+                rediscovered = await self._rediscover_device(room, context.spotify_service)
+                if not rediscovered:
+                    raise
+                context.room = room = rediscovered
+                clock = await self._apply_player_command(context, command, current_clock)
+
+            self._store_playback_flags(room, clock)
+            await self._publish_player_state(room_id, clock)
             logger.info(
-                f"RoomService: Хост '{host_user.id}' по команде пользователя '{current_user.id}' переключил на предыдущий трек в комнате '{room_id}'."
+                f"RoomService: Хост '{context.host_user.id}' по команде пользователя '{current_user.id}' выполнил '{command_name}' в комнате '{room_id}'."
             )
-
-            playback_state = await spotify_service.get_playback_state()
-            if playback_state:
-                current_track_assoc_id: uuid.UUID | None = None
-                if playback_state.get("current_track") and room.tracks_in_queue:
-                    for assoc in room.tracks_in_queue:
-                        if (
-                            assoc.track
-                            and assoc.track.spotify_id
-                            == playback_state["current_track"].id
-                        ):
-                            current_track_assoc_id = assoc.id
-                            break
-
-                await self.update_room_playback_state(
-                    room_id,
-                    current_track_assoc_id,
-                    playback_state.get("progress_ms", 0),
-                    playback_state.get("is_playing", False),
-                )
         except Exception as e:
             logger.error(
-                f"RoomService: Неизвестная ошибка при команде 'skip previous' в комнате '{room_id}' через хоста '{host_user.id}': {e}",
+                f"RoomService: Неизвестная ошибка при команде '{command_name}' в комнате '{room_id}' через хоста '{context.host_user.id}': {e}",
                 exc_info=True,
             )
             raise ServerError(
                 detail="Ошибка при управлении плеером Spotify.",
             )
 
-        return {"message": "Команда 'skip previous' успешно отправлена."}
+        return {"message": f"Команда '{command_name}' успешно отправлена."}
+
+    async def _apply_player_command(
+        self, context: _PlayerCommandContext, command: PlayerCommand, current_clock: RoomPlaybackClock | None
+    ) -> RoomPlaybackClock | None:
+        """
+        Отправляет команду в Spotify и обновляет часы комнаты.
+        Устройство берётся из комнаты без запроса /me/player/devices.
+        """
+        room = context.room
+        room_id = room.id
+        device_id = room.active_spotify_device_id
+        spotify_service = context.spotify_service
+        if command.action is ControlAction.PLAY and command.track_uri:
+            await spotify_service.play(
+                device_id=device_id,
+                track_uri=command.track_uri,
+                position_ms=command.position_ms,
+            )
+            spotify_id = command.track_uri.split(':')[-1]
+            track = self.track_repo.get_track_by_spotify_id(spotify_id)
+            clock = await self.playback_clock.start(
+                room_id,
+                track_association_id=context.spotify_index(self.room_track_repo).get(spotify_id),
+                track_uri=command.track_uri,
+                duration_ms=track.duration_ms if track else 0,
+                position_ms=command.position_ms,
+            )
+        elif command.action is ControlAction.PLAY:
+            await spotify_service.play(device_id=device_id, position_ms=command.position_ms)
+            clock = await self.playback_clock.resume(room_id, command.position_ms or None)
+            if clock is None:
+                clock, _ = await self._reconcile_with_spotify(room, spotify_service, context)
+        elif command.action is ControlAction.PAUSE:
+            await spotify_service.pause(device_id=device_id)
+            clock = await self.playback_clock.pause(room_id)
+        elif command.action is ControlAction.SKIP:
+            clock = await self._skip_ahead_in_queue(context, current_clock, command.count)
+        else:
+            for _ in range(command.count):
+                await spotify_service.skip_previous(device_id=device_id)
+            clock, _ = await self._reconcile_with_spotify(room, spotify_service, context)
+        return clock
 
     async def get_room_player_state(
         self, room_id: uuid.UUID, current_user: UserEntity
     ) -> dict[str, str]:
         """
-        Получает текущее состояние Spotify плеера для комнаты.
+        Возвращает состояние плеера комнаты по часам комнаты, без запроса к Spotify.
+        Обычно это одно чтение из Redis (PlayerStateCache) после проверки членства
+        по кэшу; база нужна только при промахе, после чего кэш заполняется.
         """
+        if not await self.player_state.is_member(room_id, current_user.id):
+            member_assoc = self.member_room_repo.get_member_room_association(
+                room_id, current_user.id
+            )
+            if not member_assoc:
+                if not self.room_repo.get_room_by_id(room_id):
+                    logger.warning(f"RoomService: Комната с такпим id {room_id} не найдена")
+                    raise RoomNotFoundError()
+                raise UserNotInRoomError(
+                    detail="Вы не являетесь участником этой комнаты."
+                )
+            await self.player_state.remember_member(room_id, current_user.id)
+
+        now = self.playback_clock.now_ms()
+        cached_state = await self.player_state.get(room_id, now)
+        if cached_state is not None:
+            return cached_state
+
         room = self.room_repo.get_room_by_id(room_id)
         if not room:
             logger.warning(f"RoomService: Комната с такпим id {room_id} не найдена")
             raise RoomNotFoundError()
 
-        member_assoc = self.member_room_repo.get_member_room_association(
-            room_id, current_user.id
-        )
-        if not member_assoc:
-            raise UserNotInRoomError(
-                detail="Вы не являетесь участником этой комнаты."
-            )
-
         if not room.playback_host_id:
             logger.info(
                 f"RoomService: Запрос состояния плеера для комнаты '{room_id}', но хост воспроизведения не назначен."
             )
+            await self.player_state.save_host(room_id, None, None)
+            await self.player_state.save_playback(room_id, None, None)
             return {
                 "is_playing": False,
                 "current_track": None,
@@ -600,35 +804,24 @@ class RoomPlaybackService:
                 detail="Внутренняя ошибка: Хост воспроизведения не найден.",
             )
 
-        current_track_details: SpotifyTrackDetails | None = None
-        current_track_assoc = None
+        clock = await self.playback_clock.get(room_id)
 
-        if room.current_playing_track_association_id:
-            current_track_assoc = self.room_track_repo.get_association_by_id(
-                room.current_playing_track_association_id
-            )
-            if current_track_assoc and current_track_assoc.track:
-                current_track_details = SpotifyTrackDetails.model_validate(
-                    current_track_assoc.track
-                )
+        current_track_details = self._current_track(clock)
+        current_track = current_track_details.model_dump(mode="json") if current_track_details else None
+        await self.player_state.save_host(room_id, host_user.id, host_user.username)
+        await self.player_state.save_playback(room_id, clock, current_track)
 
-            logger.info(
-                f"RoomService: Получено состояние плеера для комнаты '{room_id}'. Is playing: {room.is_playing}, Progress: {room.current_playback_progress_ms}ms."
-            )
+        logger.info(
+            f"RoomService: Получено состояние плеера для комнаты '{room_id}'. Is playing: {bool(clock and clock.is_playing)}, Progress: {clock.position_ms(now) if clock else 0}ms."
+        )
 
-            return {
-                "is_playing": room.is_playing,
-                "current_track": (
-                    current_track_details.model_dump()
-                    if current_track_details
-                    else None
-                ),
-                "progress_ms": room.current_track_position_ms,
-                "duration_ms": (
-                    current_track_assoc.track.duration_ms
-                    if current_track_assoc and current_track_assoc.track
-                    else 0
-                ),
-                "playback_host_id": str(room.playback_host_id),
-                "playback_host_username": host_user.username,
-            }
+        return {
+            "is_playing": clock.is_playing if clock else False,
+            "current_track": current_track,
+            "progress_ms": clock.position_ms(now) if clock else 0,
+            "duration_ms": clock.duration_ms if clock else 0,
+            "server_time_ms": now,
+            "position_anchor": clock.anchor(now) if clock else None,
+            "playback_host_id": str(room.playback_host_id),
+            "playback_host_username": host_user.username,
+        }
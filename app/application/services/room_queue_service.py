@@ -1,17 +1,23 @@
-import json
 import uuid
 
-from app.domain.entity import UserEntity,RoomTrackAssociationEntity
+from app.config.log_config import logger
+from app.domain.entity import UserEntity,RoomTrackAssociationEntity,TrackEntity
 from app.domain.interfaces.room_gateway import RoomGateway
 from app.domain.interfaces.room_track_association_gateway import RoomTrackAssociationGateway
 
 from app.domain.enum import Role
-from app.presentation.schemas.room_schemas import TrackInQueueResponse
+from app.presentation.schemas.room_schemas import TrackInQueueResponse,QueueSnapshotResponse,QueuePageResponse,QueueWindowResponse
+from app.presentation.schemas.spotify_schemas import SpotifyTrackDetails
 
 from app.application.mappers.mappers import TrackMapper
 from app.domain.interfaces.track_gateway import TrackGateway
 
-from app.infrastructure.ws.manager_notify_service import NotifyService
+from app.infrastructure.ws.room_event_service import RoomEventService
+from app.infrastructure.redis.room_queue_cache import RoomQueueCache
+from app.infrastructure.redis.playback_clock_service import PlaybackClockService
+from app.infrastructure.external.spotify import SpotifyService
+from app.infrastructure.external.http_service import HttpService
+from app.infrastructure.redis.redis_service import RedisService
 from app.domain.interfaces.member_room_association import MemberRoomAssociationGateway
 
 from app.domain.exceptions.room_exception import RoomNotFoundError,UserNotInRoomError,RoomPermissionDeniedError,TrackAlreadyInQueueError
@@ -29,40 +35,146 @@ class RoomQueueService:
         room_track_repo: RoomTrackAssociationGateway,
         track_repo: TrackGateway,
         member_room_repo: MemberRoomAssociationGateway,
-        notify_service: NotifyService
+        room_events: RoomEventService,
+        queue_cache: RoomQueueCache,
+        playback_clock: PlaybackClockService,
+        track_mapper: TrackMapper,
+        redis_service: RedisService,
+        http_service: HttpService,
     ):
         self.room_repo = room_repo
         self.room_track_repo = room_track_repo
         self.track_repo = track_repo
         self.member_room_repo = member_room_repo
-        self.notify_service = notify_service
+        self.room_events = room_events
+        self.queue_cache = queue_cache
+        self.playback_clock = playback_clock
+        self.track_mapper = track_mapper
+        self.redis_service = redis_service
+        self.http_service = http_service
+
+    @staticmethod
+    def _queue_item(assoc: RoomTrackAssociationEntity,track: TrackEntity) -> dict:
+        return {
+            "id": str(assoc.id),
+            "track_id": str(assoc.track_id),
+            "order": assoc.order_in_queue,
+            "title": track.title,
+            "artist": track.artist_names,
+            "album_art_url": track.album_cover_url,
+        }
+
+    async def _publish_queue_delta(self,room_id: uuid.UUID,op: str,**payload) -> None:
+        """
+        Рассылает изменение очереди (add/remove/move) с версией комнаты вместо всей очереди.
+        """
+        try:
+            await self.room_events.publish(room_id,{"action": "queue_delta","op": op,**payload})
+        except Exception as e:
+            logger.error('RoomQueueService: ошибка при отправке WebSocket-сообщения: %r',e,exc_info=True)
+
+    async def get_queue_snapshot(self,room_id: uuid.UUID) -> QueueSnapshotResponse:
+        """
+        Возвращает снимок очереди с версией комнаты.
+
+        Версия читается до очереди, поэтому снимок может уже содержать изменения,
+        чьи дельты придут с большей версией: изменение сохраняется раньше, чем
+        публикуется его дельта. Клиент применяет дельты идемпотентно по ID записи
+        очереди: add с уже известным id пропускается, remove отсутствующей записи
+        ничего не делает, move ставит запись на позицию to, а не сдвигает её.
+        """
+        version = await self.room_events.current_version(room_id)
+        queue = await self.get_room_queue(room_id)
+        return QueueSnapshotResponse(version=version,queue=queue)
     
     
     async def get_room_queue(self,room_id: uuid.UUID) -> list[TrackInQueueResponse]:
         """
         Получает текущую очередь треков для комнаты.
+        Очередь читается из Redis (RoomQueueCache); из базы — только если её там нет,
+        после чего она загружается в Redis.
         """
+        cached_queue = await self.queue_cache.get(room_id)
+        if cached_queue is not None:
+            return [TrackInQueueResponse.model_validate(item) for item in cached_queue]
+
         room = self.room_repo.get_room_by_id(room_id)
         if not room:
             raise RoomNotFoundError()
-        
-        queue_response = []
-        if not room.room_track:
-            return queue_response
-
-        for assoc in room.room_track:
-            if assoc.track:
-                res = TrackInQueueResponse(
-                    track=TrackMapper.to_response_track(assoc.track),
-                    order_in_queue=assoc.order_in_queue,
-                    id=assoc.id,
-                    added_at=assoc.added_at
-                )
-                queue_response.append(res)
-        
 
+        queue_response = [
+            self.track_mapper.to_response_in_queue(track,assoc)
+            for assoc,track in self.room_track_repo.get_queue_page(room_id,None,None)
+        ]
+        await self.queue_cache.fill(
+            room_id, [item.model_dump(mode='json', by_alias=True) for item in queue_response]
+        )
         return queue_response
     
+    async def get_queue_page(
+        self,
+        room_id: uuid.UUID,
+        after: float | None,
+        limit: int,
+        after_id: uuid.UUID | None = None,
+    ) -> QueuePageResponse:
+        """
+        Возвращает страницу очереди: до limit треков после курсора (after, after_id).
+        Страница читается из Redis, если очередь там загружена, иначе одним
+        keyset-запросом к базе без загрузки всей очереди.
+        """
+        cached_page = await self.queue_cache.page(room_id,after,limit,after_id=after_id)
+        if cached_page is not None:
+            items = [TrackInQueueResponse.model_validate(item) for item in cached_page]
+        else:
+            room = self.room_repo.get_room_by_id(room_id)
+            if not room:
+                raise RoomNotFoundError()
+            items = [
+                self.track_mapper.to_response_in_queue(track,assoc)
+                for assoc,track in self.room_track_repo.get_queue_page(room_id,after,limit,after_id)
+            ]
+        if len(items) < limit:
+            return QueuePageResponse(items=items)
+        return QueuePageResponse(
+            items=items,
+            next_after=items[-1].order_in_queue,
+            next_after_id=items[-1].association_id,
+        )
+
+    async def get_queue_window(self,room_id: uuid.UUID,next_count: int) -> QueueWindowResponse:
+        """
+        Возвращает трек, который сейчас играет, и next_count треков после него.
+        Текущая запись берётся из часов комнаты; если ничего не играет,
+        окно начинается с начала очереди.
+        """
+        clock = await self.playback_clock.get(room_id)
+        now_id = clock.track_association_id if clock else None
+
+        cached_window = await self.queue_cache.page(room_id,None,next_count + 1,start_at=now_id)
+        if cached_window is not None:
+            items = [TrackInQueueResponse.model_validate(item) for item in cached_window]
+        else:
+            room = self.room_repo.get_room_by_id(room_id)
+            if not room:
+                raise RoomNotFoundError()
+            items = []
+            after = after_id = None
+            current = self.room_track_repo.get_association_by_id(now_id) if now_id else None
+            if current and current.room_id == room_id:
+                track = self.track_repo.get_track_by_id(current.track_id)
+                if track:
+                    items.append(self.track_mapper.to_response_in_queue(track,current))
+                after, after_id = current.order_in_queue, current.id
+            items += [
+                self.track_mapper.to_response_in_queue(track,assoc)
+                for assoc,track in self.room_track_repo.get_queue_page(room_id,after,next_count + 1 - len(items),after_id)
+            ]
+
+        if now_id and items and items[0].association_id == now_id:
+            return QueueWindowResponse(now_playing=items[0],up_next=items[1:next_count + 1])
+        return QueueWindowResponse(now_playing=None,up_next=items[:next_count])
+
     async def add_track_to_queue(
     self, 
     room_id: uuid.UUID,
@@ -91,42 +203,85 @@ class RoomQueueService:
         if not track:
             raise TrackNotFound()
         
-        dublicate_in_queue = self.room_track_repo.get_association_by_room_and_track(room_id,track.id)
-        if dublicate_in_queue:
-            raise TrackAlreadyInQueueError()
-        
-        order_in_queue = self.room_track_repo.get_last_order_in_queue(room_id)
-
         try:
-            add_track = self.room_track_repo.add_track_to_queue(room_id,track.id,order_in_queue,current_user.id)
+            add_track = self.room_track_repo.append_track_to_queue(room_id,track.id,current_user.id)
         except Exception as e:
             raise ServerError(
                 detail=f"Не удалось добавить трек в очередь{e}."
             )
-        try:
-            updated_queue = self.room_track_repo.get_queue_for_room( room_id)
-            await self.notify_service.send_message_for_room(
-            {
-            "action": "add",
-                "queue": [
-                    {
-                        "id": str(assoc.id),
-                        "track_id": str(assoc.track_id),
-                        "order": assoc.order_in_queue,
-                        "title": assoc.track.title,
-                        "artist": assoc.track.artist_names,
-                        "album_art_url": assoc.track.album_name
-                    } for assoc in updated_queue
-                ]
-            }
+        if not add_track:
+            raise TrackAlreadyInQueueError()
+        await self.queue_cache.add(
+            room_id, self.track_mapper.to_response_in_queue(track,add_track).model_dump(mode='json', by_alias=True)
         )
-        except Exception as e:
-            print(f"Ошибка при отправке WebSocket-сообщения: {e}")
-
+        await self._publish_queue_delta(room_id,"add",item=self._queue_item(add_track,track))
 
         return add_track
     
 
+    @staticmethod
+    def _track_data(details: SpotifyTrackDetails) -> dict:
+        return {
+            'spotify_id': details.id,
+            'spotify_uri': details.uri,
+            'title': details.name,
+            'artist_names': [artist.name for artist in details.artists],
+            'album_name': details.album.name,
+            'album_cover_url': details.album.images[0].url if details.album.images else None,
+            'duration_ms': details.duration_ms,
+            'is_playable': details.is_playable is not False,
+        }
+
+    async def import_playlist(
+        self,
+        room_id: uuid.UUID,
+        playlist_id: str,
+        current_user: UserEntity,
+    ) -> list[TrackInQueueResponse]:
+        """
+        Добавляет в конец очереди все треки плейлиста Spotify.
+
+        Треки создаются или обновляются одним INSERT ... ON CONFLICT, записи очереди
+        добавляются одним многострочным INSERT ... ON CONFLICT DO NOTHING с рангами
+        из счётчика комнаты, а участники получают одно событие очереди на весь
+        плейлист. Треки, которые уже стоят в очереди, и повторы внутри плейлиста пропускаются.
+        """
+        room = self.room_repo.get_room_by_id(room_id)
+        if not room:
+            raise RoomNotFoundError()
+
+        user_assoc = self.member_room_repo.get_association_by_ids(current_user.id,room_id)
+        if not user_assoc:
+            raise UserNotInRoomError()
+
+        is_owner = (room.owner_id == current_user.id)
+        is_moderator = (user_assoc and user_assoc.role == Role.MODERATOR.value)
+        if not is_owner and not is_moderator:
+            raise RoomPermissionDeniedError(detail="У вас недостаточно прав.")
+
+        spotify_service = SpotifyService(self.redis_service,self.http_service,user=current_user)
+        playlist_tracks = await spotify_service.get_playlist_tracks(playlist_id)
+
+        try:
+            tracks = self.track_repo.upsert_tracks([self._track_data(details) for details in playlist_tracks])
+            added = self.room_track_repo.add_tracks_to_queue(room_id,[track.id for track in tracks],current_user.id)
+            tracks_by_id = {track.id: track for track in tracks}
+            tracks = [tracks_by_id[assoc.track_id] for assoc in added]
+        except Exception as e:
+            logger.error('RoomQueueService: ошибка при импорте плейлиста %s в комнату %s %r',playlist_id,room_id,e,exc_info=True)
+            raise ServerError(
+                detail=f"Не удалось импортировать плейлист в очередь{e}."
+            )
+
+        response = [self.track_mapper.to_response_in_queue(track,assoc) for track,assoc in zip(tracks,added)]
+        if response:
+            await self.queue_cache.add_many(room_id,[item.model_dump(mode='json', by_alias=True) for item in response])
+            await self._publish_queue_delta(
+                room_id,"add_many",items=[self._queue_item(assoc,track) for track,assoc in zip(tracks,added)]
+            )
+        logger.info('RoomQueueService: в очередь комнаты %s импортировано %s треков из плейлиста %s',room_id,len(response),playlist_id)
+        return response
+
     async def remove_track_from_queue(
         self,
         room_id: uuid.UUID,
@@ -160,32 +315,13 @@ class RoomQueueService:
             deleted_successfully = self.room_track_repo.remove_track_from_queue_by_association_id(
                 association_id
             )
-            if deleted_successfully:
-                self._reorder_queue(room_id)
-                
         except Exception as e:
             raise ServerError(
                 detail=f"Не удалось удалить трек из очередь{e}."
             )
-        try:
-            updated_queue = self.room_track_repo.get_queue_for_room( room_id)
-            await self.notify_service.send_message_for_room(
-            {
-            "action": "remove",
-                "queue": [
-                    {
-                        "id": str(assoc.id),
-                        "track_id": str(assoc.track_id),
-                        "order": assoc.order_in_queue,
-                        "title": assoc.track.title,
-                        "artist": assoc.track.artist_names,
-                        "album_art_url": assoc.track.album_name
-                    } for assoc in updated_queue
-                ]
-            }
-        )
-        except Exception as e:
-            print(f"Ошибка при отправке WebSocket-сообщения: {e}")
+        if deleted_successfully:
+            await self.queue_cache.remove(room_id,association_id)
+            await self._publish_queue_delta(room_id,"remove",id=str(association_id))
 
         return {
             'status': 'success',
@@ -194,84 +330,41 @@ class RoomQueueService:
         }
     
 
-    #todo
-    #def _reorder_queue(self,room_id: uuid.UUID):
-    #    """
-    #    Переупорядочивает order_in_queue для всех оставшихся треков в очереди.
-    #    """
-    #    queue_association = self.self._db.query(RoomTrackAssociationModel).where(
-    #        RoomTrackAssociationModel.room_id == room_id,
-    #    ).order_by(RoomTrackAssociationModel.order_in_queue).all()
-#
-    #    try:
-    #        for index,assoc in enumerate(queue_association):
-    #            assoc.order_in_queue = index
-    #            self.self._db.add(assoc)
-#
-    #        
-    #    except Exception as e:
-    #        
-    #        raise HTTPException(
-    #            status_code=500,
-    #            detail=f'Не удалось перепорядочить очередь.{e}'
-    #        )
-
-
     async def move_track_in_queue(self,room_id: uuid.UUID,association_id: uuid.UUID,current_user: UserEntity,new_position: int,) -> RoomTrackAssociationEntity:
-        """Перемещает трек в очереди."""
-        room = self.room_repo.get_room_by_id(room_id)
-        if not room:
-            raise RoomNotFoundError()
-        
-        if room.owner_id != current_user.id:
+        """
+        Перемещает трек в очереди.
+        Очередь упорядочена по дробному рангу, поэтому меняется ранг только перемещаемой записи.
+        Перестановка выполняется в Redis, в Postgres её переносит QueueWriteBehind;
+        напрямую в базу пишется, только если Redis недоступен.
+        """
+        user_assoc = self.member_room_repo.get_association_by_ids(current_user.id,room_id)
+        if not user_assoc or user_assoc.role != Role.OWNER.value:
             raise  RoomPermissionDeniedError()
-        
-        queue = self.room_track_repo.get_queue_for_room(room_id)
-        if not queue:
-            raise ValueError("Очередь комнаты пуста.")
-        
-        track_to_move = None
-        for assoc in queue:
-            if assoc.id == association_id:
-                track_to_move = assoc
-                break
-        
-        current_length = len(queue)
-        if not track_to_move:
+
+        rank = await self.queue_cache.move(room_id,association_id,new_position)
+        if rank is None:
+            await self.get_room_queue(room_id)
+            rank = await self.queue_cache.move(room_id,association_id,new_position)
+        if rank is not None:
+            await self._publish_queue_delta(room_id,"move",id=str(association_id),to=new_position)
+            return {"message": "Трек успешно перемещён."}
+
+        logger.warning('RoomQueueService: очередь комнаты %s недоступна в Redis, перестановка пишется в базу', room_id)
+        track_to_move = self.room_track_repo.get_association_by_id(association_id)
+        if not track_to_move or track_to_move.room_id != room_id:
             raise ValueError(f"Трек с ассоциацией ID {association_id} не найден в очереди.")
         
+        current_length = self.room_track_repo.get_queue_length(room_id)
         if not (0 <= new_position < current_length):
             raise ValueError(f"Некорректная позиция: {new_position}. Допустимый диапазон от 0 до {current_length - 1}.")
     
         try:
-            queue.remove(track_to_move)
-
-            queue.insert(new_position, track_to_move)
-
-            for index, assoc in enumerate(queue):
-                assoc.order_in_queue = index
+            self.room_track_repo.move_track_in_queue(association_id, new_position)
         except Exception as e:
             raise ServerError(
                 detail=f'Не удалось перепорядочить очередь.{e}'
             )
 
-        try:
-            updated_queue = self.room_track_repo.get_queue_for_room( room_id)
-            update_message = {
-                "action": "move",
-                "queue": [
-                    {
-                        "id": str(assoc.id),
-                        "track_id": str(assoc.track_id),
-                        "order": assoc.order_in_queue,
-                        "title": assoc.track.title,
-                        "artist": assoc.track.artist_names,
-                        "album_art_url": assoc.track.album_name
-                    } for assoc in updated_queue
-                ]
-            }
-            await self.notify_service.send_message_for_room(update_message)
-        except Exception as e:
-            print(f"Ошибка при отправке WebSocket-сообщения: {e}")
+        await self._publish_queue_delta(room_id,"move",id=str(association_id),to=new_position)
 
         return {"message": "Трек успешно перемещён."}
\ No newline at end of file
@@ -1,80 +1,156 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-
-from app.config.session import get_db
-from app.infrastructure.db.gateway.room_gateway import SARoomGateway
-from app.infrastructure.db.gateway.room_track_association_gateway import SARoomTrackAssociationGateway
-from app.application.services.room_service import RoomService
-from app.application.services.spotify_service import SpotifyService
+import asyncio
+import uuid
+
+from dishka import AsyncContainer
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+from sqlalchemy.orm import Session
+
+from app.application.services.playback_timer import PlaybackTimer
+from app.application.services.room_playback_service import RoomPlaybackService
 from app.config.log_config import logger
+from app.config.settings import settings
+from app.infrastructure.redis.playback_clock_service import PlaybackClockService
+from app.infrastructure.redis.redis_service import RedisService
+from app.infrastructure.redis.scheduler_lease_service import SchedulerLeaseService
+from app.infrastructure.redis.spotify_request_budget import SpotifyRequestBudget
 
 
 class SchedulerService:
-    def __init__(self):
-        # todo Impelemnting D(Solid)
-        self.scheduler = AsyncIOScheduler()
-        self.room_service = RoomService()
+    """
+    Переключает треки в комнатах по окончании текущего.
+
+    Вместо опроса всех комнат раз в несколько секунд у каждой играющей комнаты
+    есть один таймер на ближайшую точку: добавить следующий трек в очередь
+    устройства (за PREQUEUE_LEAD_MS до конца), подтвердить переход (через
+    TRANSITION_CONFIRM_MS после конца) или сверка со Spotify. Таймеры перевзводятся
+    по уведомлениям PlaybackClockService о любом изменении часов (play, pause,
+    skip, сверка), поэтому Spotify опрашивается только тогда, когда это нужно.
+
+    Экземпляров может быть несколько: каждый ведёт таймеры только комнат из шардов,
+    на которые держит аренду (SchedulerLeaseService), а перед переключением трека
+    проверяет свой fencing token.
+
+    Наплыв сработавших таймеров обрабатывается параллельно, но не больше
+    SCHEDULER_MAX_CONCURRENT_ROOMS комнат сразу и в пределах общего бюджета
+    запросов к Spotify (SpotifyRequestBudget).
+    """
+
+    SPOTIFY_REQUESTS_PER_ROOM = 2
+
+    def __init__(self, container: AsyncContainer, playback_clock: PlaybackClockService, redis_client: Redis):
+        self.container = container
+        self.playback_clock = playback_clock
+        self.redis_client = redis_client
+        redis_service = RedisService(redis_client)
+        self.timer = PlaybackTimer(self._on_due)
+        self.budget = SpotifyRequestBudget(redis_service)
+        self.leases = SchedulerLeaseService(
+            redis_service,
+            on_acquired=self._on_shards_acquired,
+            on_lost=self._on_shards_lost,
+        )
+        self._pubsub: PubSub | None = None
+        self._listener: asyncio.Task | None = None
 
-    def start(self):
+    async def start(self) -> None:
         """
-        Запускает планировщик и добавляет задачу.
+        Подписывается на изменения часов, захватывает свою долю шардов, взводит
+        таймеры для уже играющих комнат этих шардов и запускает исполнитель таймеров.
         """
-        # Добавляем задачу, которая будет выполняться каждые 5 секунд
-        self.scheduler.add_job(
-            self._check_rooms_for_playback,
-            trigger=IntervalTrigger(seconds=5),
-            id='check_rooms_playback_job',
-            name='Check Rooms Playback Status'
+        # подписка раньше начальной загрузки, чтобы не пропустить изменения между ними
+        self._pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(PlaybackClockService.CHANGES_CHANNEL)
+        self._listener = asyncio.create_task(self._listen())
+
+        await self.leases.rebalance()
+        self.leases.start()
+        self.timer.start()
+        logger.info(
+            'SchedulerService: запущен, шардов: %s, таймеров взведено: %s',
+            len(self.leases.owned_shards()), len(self.timer),
         )
-        self.scheduler.start()
 
-    async def _check_rooms_for_playback(self):
-        """
-        Фоновая задача, которая проверяет статус воспроизведения в каждой комнате.
-        """ 
-        db = next(get_db())
-        try:
-            active_rooms = SARoomGateway.get_active_rooms(db)
-
-            for room in active_rooms:
-                if room.current_track_id and room.is_playing:
-                    owner_user = SARoomGateway.get_owner_room(db, room.id)
-                    if not owner_user or not owner_user.spotify_access_token:
-                        continue
-
-                    spotify = SpotifyService(db,owner_user)
-
-
-                    try:
-                        device_id = await spotify._get_device_id(owner_user.spotify_access_token)
-                        if not device_id:
-                            continue
-                        state = await spotify.get_playback_state()
-                        time_left = state.get('duration_ms') - state.get('progress_ms')
-                        if time_left <= 5000:
-                            next_track_association = SARoomTrackAssociationGateway.get_first_track_in_queue(db, room.id)
-                        
-                            if next_track_association:
-                                await spotify.play(
-                                    access_token=owner_user.spotify_access_token,
-                                    track_uri=next_track_association.track.spotify_uri,
-                                    device_id=device_id
-                                )
-                            
-                            room.current_track_id = next_track_association.track_id
-                            room.current_track_position_ms = 0
-                            
-                            SARoomTrackAssociationGateway.remove_track_from_queue_by_association_id(db, next_track_association.id)
-                            RoomService._reorder_queue(db, room.id)
-                        else:
-                            await spotify.pause(device_id=device_id)
-                            room.is_playing = False
-                            room.current_track_id = None
-                            db.commit()
-                    except Exception:
-                        try:
-                            await spotify.pause(device_id=device_id)
-                        except Exception as e:
-                            logger.error('SchesulerService: произошла ошибка %r',e,exc_info=True)             
-        finally:
-            db.close()
\ No newline at end of file
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        await self.timer.stop()
+        await self.leases.stop()
+
+    async def _on_shards_acquired(self, shards: set[int]) -> None:
+        for room_id in await self.playback_clock.rooms():
+            if self.leases.shard_of(room_id) in shards:
+                await self._rearm(room_id)
+
+    async def _on_shards_lost(self, shards: set[int]) -> None:
+        for room_id in self.timer.rooms():
+            if self.leases.shard_of(room_id) in shards:
+                self.timer.disarm(room_id)
+
+    async def _rearm(self, room_id: uuid.UUID, after_fire: bool = False) -> None:
+        if self.leases.token_for(room_id) is None:
+            self.timer.disarm(room_id)
+            return
+        clock = await self.playback_clock.get(room_id)
+        if not clock or not clock.is_playing:
+            self.timer.disarm(room_id)
+            return
+        now = self.timer.now_ms()
+        ends_at = clock.ends_at_server_ms
+        if clock.prequeued_association_id:
+            # следующий трек уже в очереди устройства: проверяем, что Spotify переключился сам
+            boundary = ends_at + settings.playback.TRANSITION_CONFIRM_MS
+        elif now < ends_at - settings.playback.PREQUEUE_LEAD_MS:
+            boundary = ends_at - settings.playback.PREQUEUE_LEAD_MS
+        else:
+            boundary = ends_at - settings.playback.TRACK_END_LEAD_MS
+        next_reconcile = clock.reconciled_at_ms + settings.playback.RECONCILE_INTERVAL_SECONDS * 1000
+        deadline = min(boundary, next_reconcile)
+        if after_fire and deadline <= now:
+            # срок всё ещё в прошлом: попытка не обновила часы (Spotify недоступен), не крутимся вхолостую
+            deadline = now + settings.playback.TIMER_RETRY_MS
+        self.timer.arm(room_id, deadline)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                await self._rearm(uuid.UUID(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error('SchedulerService: ошибка при чтении изменений часов %r', e, exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _on_due(self, room_id: uuid.UUID) -> None:
+        token = self.leases.token_for(room_id)
+        if token is None:
+            return
+        if not await self.leases.fence(room_id, token):
+            logger.warning('SchedulerService: комнату %s уже ведёт другой экземпляр, таймер пропущен', room_id)
+            self.timer.disarm(room_id)
+            return
+        # сверка состояния и, если трек кончился, команда play или pause
+        await self.budget.acquire(cost=self.SPOTIFY_REQUESTS_PER_ROOM)
+        async with self.container() as request_container:
+            playback_service = await request_container.get(RoomPlaybackService)
+            session = await request_container.get(Session)
+            try:
+                await playback_service.advance_to_next_track(room_id)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                # если часы не изменились, уведомления не будет
+                await self._rearm(room_id, after_fire=True)
@@ -2,10 +2,13 @@ from dishka import Provider, Scope, provide
 from redis.asyncio import Redis
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy import Engine
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 
 from app.config.session import get_engine, get_sessionmaker, get_session
 from app.infrastructure.redis.redis import get_redis_client
+from app.infrastructure.db.chat_write_buffer import ChatWriteBuffer
+from app.infrastructure.db.queue_write_behind import QueueWriteBehind
+from app.infrastructure.redis.redis_service import RedisService
 
 
 class DataBaseProvider(Provider):
@@ -23,4 +26,20 @@ class DataBaseProvider(Provider):
 
     @provide(scope=Scope.APP)
     async def redis_client(self) -> Redis:
-        return await get_redis_client()
\ No newline at end of file
+        return await get_redis_client()
+
+    @provide(scope=Scope.APP)
+    async def chat_write_buffer(self, session_factory: sessionmaker[Session]) -> AsyncIterator[ChatWriteBuffer]:
+        buffer = ChatWriteBuffer(session_factory)
+        buffer.start()
+        yield buffer
+        await buffer.stop()
+
+    @provide(scope=Scope.APP)
+    async def queue_write_behind(
+        self, session_factory: sessionmaker[Session], redis_service: RedisService
+    ) -> AsyncIterator[QueueWriteBehind]:
+        write_behind = QueueWriteBehind(session_factory, redis_service)
+        write_behind.start()
+        yield write_behind
+        await write_behind.stop()
@@ -3,7 +3,7 @@ from dishka import Provider,Scope,provide_all,provide
 from app.application.mappers.user_mapper import UserMapper
 from app.application.services.user_service import UserService
 from app.application.services.ban_service import BanService
-from app.application.services.chat_service import ChatService
+from app.application.chat.create_message import ChatService
 from app.application.services.favorite_track_service import FavoriteTrackService
 from app.application.services.friendship_service import FriendshipService
 from app.application.services.notification_service import NotificationService
@@ -11,8 +11,16 @@ from app.application.services.room_service import RoomService
 from app.application.services.track_service import TrackService
 from app.application.services.room_member_service import RoomMemberService
 from app.application.services.room_playback_service import RoomPlaybackService
+from app.application.services.room_command_executor import RoomCommandExecutor
 from app.application.services.room_queue_service import RoomQueueService
-from app.application.services.redis_service import RedisService
+from app.infrastructure.redis.redis_service import RedisService
+from app.infrastructure.ws.manager_notify_service import NotifyService
+from app.infrastructure.ws.room_event_service import RoomEventService
+from app.infrastructure.ws.presence_service import PresenceService
+from app.infrastructure.redis.playback_clock_service import PlaybackClockService
+from app.infrastructure.redis.player_state_cache import PlayerStateCache
+from app.infrastructure.redis.room_queue_cache import RoomQueueCache
+from app.infrastructure.external.http_service import HttpService
 from app.application.services.google_service import GoogleService
 from app.application.services.spotify_service import SpotifyService
 from redis.asyncio import Redis
@@ -29,6 +37,38 @@ class ServiceProvider(Provider):
     def redis_service(self,client: Redis) -> RedisService:
         return RedisService(client)
 
+    @provide(scope=Scope.APP)
+    def http_service(self) -> HttpService:
+        return HttpService()
+
+    @provide(scope=Scope.APP)
+    def notify_service(self) -> NotifyService:
+        return NotifyService()
+
+    @provide(scope=Scope.APP)
+    def room_event_service(self,redis: RedisService,notify_service: NotifyService) -> RoomEventService:
+        return RoomEventService(redis,notify_service)
+
+    @provide(scope=Scope.APP)
+    def presence_service(self,redis: RedisService) -> PresenceService:
+        return PresenceService(redis)
+
+    @provide(scope=Scope.APP)
+    def playback_clock_service(self,redis: RedisService) -> PlaybackClockService:
+        return PlaybackClockService(redis)
+
+    @provide(scope=Scope.APP)
+    def player_state_cache(self,redis: RedisService) -> PlayerStateCache:
+        return PlayerStateCache(redis)
+
+    @provide(scope=Scope.APP)
+    def room_queue_cache(self,redis: RedisService) -> RoomQueueCache:
+        return RoomQueueCache(redis)
+
+    @provide(scope=Scope.APP)
+    def room_command_executor(self,redis: RedisService) -> RoomCommandExecutor:
+        return RoomCommandExecutor(redis)
+
     @provide
     def google_service(self,user: UserEntity,redis: RedisService) -> GoogleService:
         return GoogleService(user,redis)
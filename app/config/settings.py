@@ -77,6 +77,79 @@ class AvatarConfig:
     AVATARS_STORAGE_DIR: Path = BACKEND_ROOT / "avatars"
 
 
+@dataclass(slots=True, frozen=True)
+class WebSocketConfig:
+    SEND_TIMEOUT_SECONDS: float = 2.0
+    MAX_CONCURRENT_SENDS: int = 256
+    MAX_MISSED_DEADLINES: int = 3
+    OUTBOUND_QUEUE_SIZE: int = 256
+    # drop_oldest | coalesce | disconnect, см. BackpressurePolicy
+    BACKPRESSURE_POLICY: str = 'coalesce'
+    COALESCE_MESSAGE_TYPES: tuple[str, ...] = ('player_state_changed', 'playback_state')
+    ROOM_EVENTS_REPLAY_SIZE: int = 500
+    ROOM_EVENTS_TTL_SECONDS: int = 86400
+    PRESENCE_HEARTBEAT_INTERVAL_SECONDS: int = 15
+    # запись о присутствии считается устаревшей, если клиент пропустил несколько heartbeat подряд
+    PRESENCE_TTL_SECONDS: int = 45
+    PRESENCE_SWEEP_INTERVAL_SECONDS: int = 30
+    CHAT_FLUSH_INTERVAL_MS: int = 250
+    CHAT_FLUSH_BATCH_SIZE: int = 500
+    # сколько несохранённых сообщений держать в памяти, пока база недоступна
+    CHAT_MAX_PENDING_MESSAGES: int = 50000
+
+
+@dataclass(slots=True, frozen=True)
+class PlaybackConfig:
+    # как часто сверять часы комнаты со Spotify, пока трек играет
+    RECONCILE_INTERVAL_SECONDS: int = 60
+    # расхождение позиции, после которого часы перезаписываются данными Spotify
+    DRIFT_TOLERANCE_MS: int = 2000
+    CLOCK_TTL_SECONDS: int = 86400
+    # за сколько до конца трека включать следующий (запас на задержку Spotify)
+    TRACK_END_LEAD_MS: int = 1000
+    # за сколько до конца трека добавлять следующий в очередь устройства хоста
+    PREQUEUE_LEAD_MS: int = 15000
+    # сколько ждать после конца трека, прежде чем проверить, что Spotify сам переключился
+    TRANSITION_CONFIRM_MS: int = 1500
+    # повтор таймера комнаты, если Spotify не ответил и часы не сдвинулись
+    TIMER_RETRY_MS: int = 5000
+    # комнаты делятся между экземплярами планировщика по шардам с арендой в Redis
+    SCHEDULER_SHARDS: int = 64
+    SCHEDULER_LEASE_TTL_MS: int = 15000
+    SCHEDULER_LEASE_RENEW_INTERVAL_MS: int = 5000
+    # сколько комнат экземпляр планировщика обслуживает одновременно
+    SCHEDULER_MAX_CONCURRENT_ROOMS: int = 32
+    # общий для всех экземпляров лимит запросов планировщика к Spotify
+    SPOTIFY_REQUESTS_PER_SECOND: int = 50
+    SPOTIFY_REQUESTS_BURST: int = 100
+    # сколько помнить, что пользователь состоит в комнате, для эндпоинта состояния плеера
+    MEMBERSHIP_TTL_SECONDS: int = 60
+    # блокировка, под которой выполняется команда плеера комнаты
+    PLAYER_COMMAND_LOCK_TTL_MS: int = 5000
+    # окно, в котором команды плеера комнаты склеиваются в одну
+    PLAYER_COMMAND_COALESCE_MS: int = 300
+    # сколько помнить активное устройство Spotify хоста без повторного запроса /me/player/devices
+    DEVICE_CACHE_TTL_SECONDS: int = 30
+
+
+@dataclass(slots=True, frozen=True)
+class QueueConfig:
+    # если соседние ранги очереди сошлись ближе, очередь комнаты перенумеровывается
+    MIN_RANK_GAP: float = 1e-6
+    # сколько очередь комнаты живёт в Redis без обращений
+    CACHE_TTL_SECONDS: int = 3600
+    # отложенная запись перестановок очереди в Postgres
+    WRITE_BEHIND_BATCH_SIZE: int = 500
+    WRITE_BEHIND_BLOCK_MS: int = 1000
+    # через сколько неподтверждённую запись забирает другой обработчик
+    WRITE_BEHIND_CLAIM_IDLE_MS: int = 30000
+    # страница очереди и окно «сейчас и следующие» в API
+    PAGE_DEFAULT_SIZE: int = 50
+    PAGE_MAX_SIZE: int = 200
+    WINDOW_DEFAULT_NEXT: int = 10
+    WINDOW_MAX_NEXT: int = 50
+
+
 @dataclass(slots=True, frozen=True)
 class Settings:
     database: DataBaseConfig = DataBaseConfig()
@@ -87,6 +160,9 @@ class Settings:
     redis: RedisConfig = RedisConfig()
     rabbit: RabbitConfig = RabbitConfig()
     avatar: AvatarConfig = AvatarConfig()
+    ws: WebSocketConfig = WebSocketConfig()
+    playback: PlaybackConfig = PlaybackConfig()
+    queue: QueueConfig = QueueConfig()
 
     BASE_URL: str = "http://127.0.0.1:8000"
     SESSION_EXPIRATION = 604800
@@ -9,6 +9,8 @@ __all__ = (
     'MemberRoomEntity',
     'FriendshipEntity',
     'FavoriteTrackEntity',
+    'RoomPlaybackClock',
+    'PlayerCommand',
 )
 
 from app.domain.entity.user import UserEntity
@@ -20,4 +22,6 @@ from app.domain.entity.room import RoomEntity
 from app.domain.entity.notification import NotificationEntity
 from app.domain.entity.member_room_association import MemberRoomEntity
 from app.domain.entity.friendship import FriendshipEntity
-from app.domain.entity.favorite_track import FavoriteTrackEntity
\ No newline at end of file
+from app.domain.entity.favorite_track import FavoriteTrackEntity
+from app.domain.entity.playback_clock import RoomPlaybackClock
+from app.domain.entity.player_command import PlayerCommand
@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+import uuid
+
+
+@dataclass(slots=True,frozen=True)
+class RoomPlaybackClock:
+    """
+    Часы воспроизведения комнаты.
+
+    Позиция не хранится, а вычисляется: пока трек играет, она равна
+    now - started_at_server_ms; на паузе зафиксирована в paused_at_ms.
+    Все времена — миллисекунды по часам сервера (unix epoch).
+    prequeued_association_id — запись очереди, уже добавленная в очередь
+    устройства хоста, чтобы Spotify переключился на неё сам, без паузы.
+    """
+    track_association_id: uuid.UUID | None
+    track_uri: str | None
+    duration_ms: int
+    started_at_server_ms: int
+    paused_at_ms: int | None
+    reconciled_at_ms: int
+    prequeued_association_id: uuid.UUID | None = None
+
+    @property
+    def is_playing(self) -> bool:
+        return self.paused_at_ms is None
+
+    def position_ms(self, now_ms: int) -> int:
+        position = self.paused_at_ms if self.paused_at_ms is not None else now_ms - self.started_at_server_ms
+        if self.duration_ms:
+            position = min(position, self.duration_ms)
+        return max(position, 0)
+
+    def remaining_ms(self, now_ms: int) -> int:
+        return max(self.duration_ms - self.position_ms(now_ms), 0)
+
+    def anchor(self, now_ms: int) -> dict[str, int]:
+        """
+        Опорная точка для клиента: позиция position_ms в момент server_time_ms
+        и скорость (1 — играет, 0 — пауза). Клиент, знающий смещение своих часов
+        относительно сервера (time_sync), сам вычисляет текущую позицию.
+        """
+        return {
+            'server_time_ms': now_ms,
+            'position_ms': self.position_ms(now_ms),
+            'rate': 1 if self.is_playing else 0,
+        }
+
+    @property
+    def ends_at_server_ms(self) -> int | None:
+        """
+        Момент окончания трека по часам сервера; None на паузе.
+        """
+        if not self.is_playing:
+            return None
+        return self.started_at_server_ms + self.duration_ms
@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+
+from app.domain.enum import ControlAction
+
+
+@dataclass(slots=True,frozen=True)
+class PlayerCommand:
+    """
+    Команда плеера комнаты.
+    track_uri и position_ms имеют смысл только для PLAY, count — для SKIP и SKIP_PREVIOUS
+    (несколько нажатий подряд, склеенных в одну команду).
+    """
+    action: ControlAction
+    track_uri: str | None = None
+    position_ms: int = 0
+    count: int = 1
+
+    @property
+    def is_toggle(self) -> bool:
+        """
+        Play без трека или pause: важна только последняя такая команда.
+        """
+        return self.action is ControlAction.PAUSE or (self.action is ControlAction.PLAY and not self.track_uri)
@@ -11,6 +11,6 @@ class RoomTrackAssociationEntity:
     id: uuid.UUID
     room_id: uuid.UUID
     track_id: uuid.UUID
-    order_in_queue: int
+    order_in_queue: float
     added_at: datetime
     added_by_user_id: uuid.UUID
\ No newline at end of file
@@ -4,6 +4,7 @@ class ControlAction(Enum):
     PLAY = 'play'
     PAUSE = 'pause'
     SKIP = 'skip'
+    SKIP_PREVIOUS = 'skip_previous'
 
 
 class Role(Enum):
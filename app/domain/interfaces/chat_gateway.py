@@ -19,4 +19,10 @@ class ChatGateway(ABC):
     def create_message(self,room_id: uuid.UUID,user_id: uuid.UUID,text: str) -> MessageEntity:
         """
         Создает сообщение в базе данных
-        """
\ No newline at end of file
+        """
+
+    @abstractmethod
+    def create_messages(self,messages: list[MessageEntity]) -> None:
+        """
+        Сохраняет пачку уже сформированных сообщений одним многострочным INSERT
+        """
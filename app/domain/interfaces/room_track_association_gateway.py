@@ -1,6 +1,7 @@
 from abc import ABC,abstractmethod
 import uuid
 from app.domain.entity.room_track_association import RoomTrackAssociationEntity
+from app.domain.entity.track import TrackEntity
 
 
 class RoomTrackAssociationGateway(ABC):
@@ -13,23 +14,54 @@ class RoomTrackAssociationGateway(ABC):
         self,
         room_id: uuid.UUID,
         track_id: uuid.UUID,
-        order_in_queue: int,
+        order_in_queue: float,
         user_id: uuid.UUID,
 ) -> RoomTrackAssociationEntity:
         """Добавляет новый трек в очередь конкретной комнаты."""
         raise NotImplementedError()
     
+    @abstractmethod
+    def append_track_to_queue(
+        self,
+        room_id: uuid.UUID,
+        track_id: uuid.UUID,
+        user_id: uuid.UUID,
+    ) -> RoomTrackAssociationEntity | None:
+        """Добавляет трек в конец очереди; None, если он уже в очереди."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def add_tracks_to_queue(
+        self,
+        room_id: uuid.UUID,
+        track_ids: list[uuid.UUID],
+        user_id: uuid.UUID,
+    ) -> list[RoomTrackAssociationEntity]:
+        """Добавляет в конец очереди комнаты несколько треков одним запросом, пропуская те, что уже в очереди."""
+        raise NotImplementedError()
+
     @abstractmethod
     def get_queue_for_room(self,room_id: uuid.UUID) -> list[RoomTrackAssociationEntity]:
         """Получает все треки, находящиеся в очереди данной комнаты, отсортированные по порядку."""
         raise NotImplementedError()
 
+    @abstractmethod
+    def get_queue_page(
+        self,
+        room_id: uuid.UUID,
+        after_order: float | None,
+        limit: int | None,
+        after_id: uuid.UUID | None = None,
+    ) -> list[tuple[RoomTrackAssociationEntity, TrackEntity]]:
+        """Возвращает до limit записей очереди (None — все) после курсора (after_order, after_id) вместе с треками."""
+        raise NotImplementedError()
+
     @abstractmethod
     def remove_track_from_queue(self,room_id: uuid.UUID,track_id: uuid.UUID) -> bool:
         """Удаляет конкретный трек из очереди комнаты по room_id и track_id."""
         raise NotImplementedError()
     @abstractmethod
-    def get_last_order_in_queue(self,room_id: uuid.UUID) -> int:
+    def get_last_order_in_queue(self,room_id: uuid.UUID) -> float:
         """Определяет следующий доступный номер для нового трека в очереди."""
         raise NotImplementedError()
 
@@ -53,4 +85,39 @@ class RoomTrackAssociationGateway(ABC):
         """
         Получает первый трек в очереди комнаты
         """
-        raise NotImplementedError()
\ No newline at end of file
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_queue_length(self, room_id: uuid.UUID) -> int:
+        """
+        Возвращает количество треков в очереди комнаты.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def move_track_in_queue(self, association_id: uuid.UUID, new_position: int) -> RoomTrackAssociationEntity | None:
+        """
+        Ставит запись очереди на позицию new_position, изменяя только её ранг.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def set_ranks(self, ranks: dict[uuid.UUID, float]) -> None:
+        """
+        Записывает ранги нескольких записей очереди.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def rebalance_queue(self, room_id: uuid.UUID) -> None:
+        """
+        Перенумеровывает ранги очереди комнаты с равным шагом.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_spotify_index(self, room_id: uuid.UUID) -> dict[str, uuid.UUID]:
+        """
+        Возвращает словарь Spotify ID трека -> ID записи в очереди комнаты.
+        """
+        raise NotImplementedError()
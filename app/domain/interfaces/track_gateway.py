@@ -25,4 +25,9 @@ class TrackGateway(ABC):
     @abstractmethod
     def delete_track(self, track_id: uuid.UUID) -> bool:
         """Удаляет трек по его UUID."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def upsert_tracks(self, tracks_data: list[dict]) -> list[TrackEntity]:
+        """Создаёт недостающие треки и обновляет метаданные существующих одним запросом."""
         raise NotImplementedError()
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""Store queue order as a fractional rank
+
+Revision ID: b7d41c2e9a10
+Revises: 8963470b23f9
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41c2e9a10'
+down_revision: Union[str, None] = '8963470b23f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Существующие целые позиции остаются валидными рангами
+    op.alter_column('room_track_associations', 'order_in_queue',
+               existing_type=sa.Integer(),
+               type_=sa.Float(),
+               existing_nullable=False)
+    op.create_index('ix_room_track_associations_room_order', 'room_track_associations', ['room_id', 'order_in_queue'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_room_track_associations_room_order', table_name='room_track_associations')
+    # Ранги сворачиваются обратно в плотные позиции, чтобы не потерять порядок при округлении
+    op.execute("""
+        UPDATE room_track_associations AS rta
+        SET order_in_queue = ranked.position
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY room_id ORDER BY order_in_queue) - 1 AS position
+            FROM room_track_associations
+        ) AS ranked
+        WHERE rta.id = ranked.id
+    """)
+    op.alter_column('room_track_associations', 'order_in_queue',
+               existing_type=sa.Float(),
+               type_=sa.Integer(),
+               existing_nullable=False,
+               postgresql_using='order_in_queue::integer')
@@ -0,0 +1,50 @@
+"""Per-room queue order counter and unique queue entries
+
+Revision ID: c3e85a1f47d2
+Revises: b7d41c2e9a10
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e85a1f47d2'
+down_revision: Union[str, None] = 'b7d41c2e9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rooms', sa.Column('queue_order_seq', sa.Integer(), server_default='0', nullable=False, comment='Следующий свободный ранг в конце очереди комнаты.'))
+    # Счётчик продолжает существующую очередь с первого целого ранга после последнего
+    op.execute("""
+        UPDATE rooms
+        SET queue_order_seq = queue.next_order
+        FROM (
+            SELECT room_id, FLOOR(MAX(order_in_queue))::integer + 1 AS next_order
+            FROM room_track_associations
+            GROUP BY room_id
+        ) AS queue
+        WHERE rooms.id = queue.room_id
+    """)
+    # Повторы трека в очереди комнаты: остаётся самая ранняя запись
+    op.execute("""
+        DELETE FROM room_track_associations AS rta
+        USING (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY room_id, track_id ORDER BY added_at, order_in_queue) AS copy
+            FROM room_track_associations
+        ) AS ranked
+        WHERE rta.id = ranked.id AND ranked.copy > 1
+    """)
+    op.create_unique_constraint('uq_room_track_associations_room_track', 'room_track_associations', ['room_id', 'track_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_room_track_associations_room_track', 'room_track_associations', type_='unique')
+    op.drop_column('rooms', 'queue_order_seq')
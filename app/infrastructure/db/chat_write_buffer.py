@@ -0,0 +1,124 @@
+import asyncio
+from collections import deque
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.domain.entity import MessageEntity
+from app.infrastructure.db.gateway.chat_gateway import SAChatGateway
+
+
+class ChatWriteBuffer:
+    """
+    Отложенная (write-behind) запись сообщений чата.
+
+    Сообщение рассылается участникам сразу, а в базу попадает пачкой: буфер
+    сбрасывается каждые CHAT_FLUSH_INTERVAL_MS миллисекунд или как только накопится
+    CHAT_FLUSH_BATCH_SIZE сообщений — одним многострочным INSERT и одним commit.
+
+    Гарантии сохранности:
+    - при штатной остановке (stop) всё накопленное записывается;
+    - при падении процесса теряется то, что ещё не сброшено: не больше одного
+      интервала или одной пачки сообщений;
+    - если база недоступна, пачка возвращается в буфер и повторяется; в памяти
+      держится не больше CHAT_MAX_PENDING_MESSAGES сообщений, самые старые сверх
+      лимита отбрасываются с ошибкой в логе;
+    - если пачка нарушает ограничения базы (например, комната уже удалена),
+      она записывается заново по одному сообщению и отбрасываются только
+      отклонённые сообщения.
+    Клиент, которому нужна гарантированная история, перечитывает её через REST.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker[Session],
+        batch_size: int | None = None,
+        flush_interval_ms: int | None = None,
+        max_pending: int | None = None,
+    ):
+        self._session_factory = session_factory
+        self._batch_size = batch_size or settings.ws.CHAT_FLUSH_BATCH_SIZE
+        self._flush_interval = (flush_interval_ms or settings.ws.CHAT_FLUSH_INTERVAL_MS) / 1000
+        self._max_pending = max_pending or settings.ws.CHAT_MAX_PENDING_MESSAGES
+        self._pending: deque[MessageEntity] = deque()
+        self._batch_ready = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+
+    def put(self, message: MessageEntity) -> None:
+        """
+        Ставит сообщение в очередь на запись. Не ждёт базу.
+        """
+        self._pending.append(message)
+        if len(self._pending) > self._max_pending:
+            dropped = self._pending.popleft()
+            logger.error('ChatWriteBuffer: буфер переполнен, сообщение %s не будет сохранено', dropped.id)
+        if len(self._pending) >= self._batch_size:
+            self._batch_ready.set()
+
+    def start(self) -> None:
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновый сброс и записывает всё, что осталось в буфере.
+        """
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Записывает накопленные сообщения пачками по CHAT_FLUSH_BATCH_SIZE.
+        """
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self._batch_size, len(self._pending)))]
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except IntegrityError as e:
+                logger.warning('ChatWriteBuffer: пачка из %s сообщений отклонена базой, запись по одному %r', len(batch), e)
+                try:
+                    await asyncio.to_thread(self._write_each, batch)
+                except Exception as e:
+                    logger.error('ChatWriteBuffer: не удалось сохранить %s сообщений, повторим позже %r', len(batch), e, exc_info=True)
+                    self._pending.extendleft(reversed(batch))
+                    return
+            except Exception as e:
+                logger.error('ChatWriteBuffer: не удалось сохранить %s сообщений, повторим позже %r', len(batch), e, exc_info=True)
+                self._pending.extendleft(reversed(batch))
+                return
+
+    def _write(self, batch: list[MessageEntity]) -> None:
+        with self._session_factory() as session:
+            SAChatGateway(session).create_messages(batch)
+            session.commit()
+
+    def _write_each(self, batch: list[MessageEntity]) -> None:
+        """
+        Записывает пачку по одному сообщению в точках сохранения (SAVEPOINT):
+        сообщение, нарушающее ограничения базы, отбрасывается, остальные сохраняются.
+        """
+        with self._session_factory() as session:
+            gateway = SAChatGateway(session)
+            for message in batch:
+                try:
+                    with session.begin_nested():
+                        gateway.create_messages([message])
+                except IntegrityError as e:
+                    logger.error('ChatWriteBuffer: сообщение %s отклонено базой и не будет сохранено %r', message.id, e)
+            session.commit()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
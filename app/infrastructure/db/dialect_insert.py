@@ -0,0 +1,12 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(session: Session, model):
+    """
+    INSERT с поддержкой ON CONFLICT для диалекта сессии.
+    В приложении это Postgres, в тестах шлюзов — SQLite; синтаксис ON CONFLICT у них общий.
+    """
+    if session.get_bind().dialect.name == 'sqlite':
+        return sqlite.insert(model)
+    return postgresql.insert(model)
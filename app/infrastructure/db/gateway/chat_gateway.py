@@ -1,4 +1,4 @@
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session,joinedload
 from app.infrastructure.db.models import Message
 from datetime import datetime
@@ -67,4 +67,29 @@ class SAChatGateway(ChatGateway):
         )
         self._db.add(new_message)
         self._db.flush()
-        return self.from_model_to_entity(new_message)
\ No newline at end of file
+        return self.from_model_to_entity(new_message)
+
+    def create_messages(self,messages: list[MessageEntity]) -> None:
+        """Сохраняет пачку сообщений одним многострочным INSERT
+
+        Идентификатор и время создания уже заданы в сущностях, поэтому
+        сохранённые строки совпадают с тем, что получили клиенты.
+
+        Args:
+            messages (list[MessageEntity]): Сообщения для сохранения
+        """
+        if not messages:
+            return
+        self._db.execute(
+            insert(Message),
+            [
+                {
+                    'id': message.id,
+                    'text': message.text,
+                    'user_id': message.user_id,
+                    'room_id': message.room_id,
+                    'created_at': message.created_at,
+                }
+                for message in messages
+            ],
+        )
@@ -1,5 +1,5 @@
 from app.domain.exceptions.exception import ServerError
-from app.infrastructure.db.models import Room,Member_room_association,RoomTrackAssociationModel
+from app.infrastructure.db.models import Room,Member_room_association
 from sqlalchemy import select,delete,update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session,joinedload
@@ -51,7 +51,6 @@ class SARoomGateway(RoomGateway):
         stmt = select(Room).options(
             joinedload(Room.owner),
             joinedload(Room.member_room).joinedload(Member_room_association.user),
-            joinedload(Room.room_track).joinedload(RoomTrackAssociationModel.track)
         ).filter(Room.id == room_id)
         result = self._db.execute(stmt).unique().scalar_one_or_none()
         return self.from_model_to_entity(result)
@@ -70,7 +69,6 @@ class SARoomGateway(RoomGateway):
         stmt = select(Room).options(
             joinedload(Room.owner),
             joinedload(Room.member_room).joinedload(Member_room_association.user),
-            joinedload(Room.room_track).joinedload(RoomTrackAssociationModel.track)
         ).filter(Room.name == name)
         result = self._db.execute(stmt).unique().scalar_one_or_none()
         return self.from_model_to_entity(result)
@@ -86,7 +84,6 @@ class SARoomGateway(RoomGateway):
         stmt = select(Room).options(
             joinedload(Room.owner),
             joinedload(Room.member_room).joinedload(Member_room_association.user),
-            joinedload(Room.room_track).joinedload(RoomTrackAssociationModel.track)
         )
         result = self._db.execute(stmt).unique().scalars().all()
         return [self.from_model_to_entity(res) for res in result ]
@@ -176,12 +173,9 @@ class SARoomGateway(RoomGateway):
     def get_active_rooms(self) -> list[RoomEntity]:
         """
         Возвращает список комнат, в которых сейчас играет музыка.
-        Связанные объекты current_track загружаются одним запросом.
         """
         stmt = select(Room).where(
             Room.is_playing,
-        ).options(
-            joinedload(Room.room_track),
         )
         result = self._db.execute(stmt).scalars().all()
         return [self.from_model_to_entity(res) for res in result ]
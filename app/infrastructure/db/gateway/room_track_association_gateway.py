@@ -1,8 +1,13 @@
-from sqlalchemy import select,delete,func
+from sqlalchemy import select,delete,update,func,case,cast,Integer,and_,or_
 from sqlalchemy.orm import Session,joinedload
+from app.config.settings import settings
 from app.infrastructure.db.models.room_track_association import RoomTrackAssociationModel
+from app.infrastructure.db.models.track import Track
+from app.infrastructure.db.models.room import Room
+from app.infrastructure.db.dialect_insert import dialect_insert
+from app.infrastructure.db.gateway.track_gateway import SATrackGateway
 import uuid
-from app.domain.entity import RoomTrackAssociationEntity
+from app.domain.entity import RoomTrackAssociationEntity,TrackEntity
 from app.domain.interfaces.room_track_association_gateway import RoomTrackAssociationGateway
 
 
@@ -29,7 +34,7 @@ class SARoomTrackAssociationGateway(RoomTrackAssociationGateway):
         self,
         room_id: uuid.UUID,
         track_id: uuid.UUID,
-        order_in_queue: int,
+        order_in_queue: float,
         user_id: uuid.UUID,
 ) -> RoomTrackAssociationEntity:
         """Добавляет новый трек в очередь конкретной комнаты."""
@@ -46,6 +51,73 @@ class SARoomTrackAssociationGateway(RoomTrackAssociationGateway):
     
 
     
+    def _reserve_orders(self, room_id: uuid.UUID, count: int) -> int | None:
+        """
+        Резервирует count рангов в конце очереди счётчиком комнаты (UPDATE ... RETURNING)
+        и возвращает первый из них; None, если комнаты нет.
+        Строка комнаты блокируется до конца транзакции, поэтому параллельные добавления
+        получают разные ранги. Перестановка в конец ставит ранг выше последнего мимо счётчика,
+        поэтому первый ранг берётся не ниже округлённого до целого максимального ранга
+        очереди плюс один: так же поднимает ранг скрипт добавления в RoomQueueCache.
+        """
+        next_after_max = select(
+            cast(func.max(RoomTrackAssociationModel.order_in_queue), Integer) + 1
+        ).where(RoomTrackAssociationModel.room_id == room_id).scalar_subquery()
+        first_free = case(
+            (next_after_max > Room.queue_order_seq, next_after_max),
+            else_=Room.queue_order_seq,
+        )
+        stmt = update(Room).where(Room.id == room_id).values(
+            queue_order_seq=first_free + count
+        ).returning(Room.queue_order_seq)
+        next_order = self._db.execute(stmt).scalar_one_or_none()
+        return None if next_order is None else next_order - count
+
+    def append_track_to_queue(
+        self,
+        room_id: uuid.UUID,
+        track_id: uuid.UUID,
+        user_id: uuid.UUID,
+    ) -> RoomTrackAssociationEntity | None:
+        """
+        Добавляет трек в конец очереди комнаты.
+        Ранг берётся из счётчика комнаты, а повтор отсекает уникальный ключ (room_id, track_id)
+        через ON CONFLICT DO NOTHING: возвращается None, если трек уже в очереди.
+        """
+        added = self.add_tracks_to_queue(room_id, [track_id], user_id)
+        return added[0] if added else None
+
+    def add_tracks_to_queue(
+        self,
+        room_id: uuid.UUID,
+        track_ids: list[uuid.UUID],
+        user_id: uuid.UUID,
+    ) -> list[RoomTrackAssociationEntity]:
+        """
+        Добавляет в конец очереди комнаты несколько треков одним многострочным
+        INSERT ... ON CONFLICT DO NOTHING. Ранги резервируются счётчиком комнаты;
+        треки, которые уже в очереди, пропускаются.
+        """
+        if not track_ids:
+            return []
+        first_order = self._reserve_orders(room_id, len(track_ids))
+        if first_order is None:
+            return []
+        stmt = dialect_insert(self._db, RoomTrackAssociationModel).values([
+            {
+                'id': uuid.uuid4(),
+                'room_id': room_id,
+                'track_id': track_id,
+                'order_in_queue': first_order + index,
+                'added_by_user_id': user_id,
+            }
+            for index, track_id in enumerate(track_ids)
+        ]).on_conflict_do_nothing(
+            index_elements=[RoomTrackAssociationModel.room_id, RoomTrackAssociationModel.track_id]
+        ).returning(RoomTrackAssociationModel)
+        models = self._db.scalars(stmt).all()
+        return [self.from_model_to_entity(model) for model in sorted(models, key=lambda model: model.order_in_queue)]
+
     def get_queue_for_room(self,room_id: uuid.UUID) -> list[RoomTrackAssociationEntity]:
         """Получает все треки, находящиеся в очереди данной комнаты, отсортированные по порядку."""
         stmt = select(RoomTrackAssociationModel).where(
@@ -59,6 +131,43 @@ class SARoomTrackAssociationGateway(RoomTrackAssociationGateway):
     
 
     
+    def get_queue_page(
+        self,
+        room_id: uuid.UUID,
+        after_order: float | None,
+        limit: int | None,
+        after_id: uuid.UUID | None = None,
+    ) -> list[tuple[RoomTrackAssociationEntity, TrackEntity]]:
+        """
+        Страница очереди по ключу (keyset): до limit записей после курсора (after_order, after_id)
+        вместе с треками. Очередь упорядочена по (order_in_queue, id), поэтому записи
+        с одинаковым рангом на границе страниц не теряются. Без after_id курсор — только ранг.
+        Индекс (room_id, order_in_queue) отдаёт страницу без OFFSET,
+        сколько бы записей ни стояло перед ней. limit=None — вся очередь одним запросом.
+        """
+        stmt = select(RoomTrackAssociationModel, Track).join(
+            Track, Track.id == RoomTrackAssociationModel.track_id
+        ).where(
+            RoomTrackAssociationModel.room_id == room_id,
+        ).order_by(RoomTrackAssociationModel.order_in_queue, RoomTrackAssociationModel.id).limit(limit)
+        if after_order is not None and after_id is not None:
+            stmt = stmt.where(or_(
+                RoomTrackAssociationModel.order_in_queue > after_order,
+                and_(
+                    RoomTrackAssociationModel.order_in_queue == after_order,
+                    RoomTrackAssociationModel.id > after_id,
+                ),
+            ))
+        elif after_order is not None:
+            stmt = stmt.where(RoomTrackAssociationModel.order_in_queue > after_order)
+        track_gateway = SATrackGateway(self._db)
+        return [
+            (self.from_model_to_entity(assoc), track_gateway.from_model_to_entity(track))
+            for assoc, track in self._db.execute(stmt).all()
+        ]
+    
+
+    
     def remove_track_from_queue(self,room_id: uuid.UUID,track_id: uuid.UUID) -> bool:
         """Удаляет конкретный трек из очереди комнаты по room_id и track_id."""
         stmt = delete(RoomTrackAssociationModel).where(
@@ -70,7 +179,7 @@ class SARoomTrackAssociationGateway(RoomTrackAssociationGateway):
     
 
     
-    def get_last_order_in_queue(self,room_id: uuid.UUID) -> int:
+    def get_last_order_in_queue(self,room_id: uuid.UUID) -> float:
         """Определяет следующий доступный номер для нового трека в очереди."""
         stmt = select(func.max(RoomTrackAssociationModel.order_in_queue)).where(
             RoomTrackAssociationModel.room_id == room_id
@@ -133,4 +242,107 @@ class SARoomTrackAssociationGateway(RoomTrackAssociationGateway):
                 joinedload(RoomTrackAssociationModel.user)
             ).limit(1)
         result = self._db.execute(stmt).scalars().first()
-        return self.from_model_to_entity(result)
\ No newline at end of file
+        return self.from_model_to_entity(result)
+
+
+    def get_queue_length(self, room_id: uuid.UUID) -> int:
+        """
+        Возвращает количество треков в очереди комнаты.
+        """
+        stmt = select(func.count()).select_from(RoomTrackAssociationModel).where(
+            RoomTrackAssociationModel.room_id == room_id
+        )
+        return self._db.execute(stmt).scalar_one()
+
+    def _neighbour_ranks(
+        self, room_id: uuid.UUID, association_id: uuid.UUID, new_position: int
+    ) -> tuple[float | None, float | None]:
+        """
+        Ранги записей, между которыми окажется перемещаемая (без неё самой).
+        Читается не больше двух строк.
+        """
+        stmt = select(RoomTrackAssociationModel.order_in_queue).where(
+            RoomTrackAssociationModel.room_id == room_id,
+            RoomTrackAssociationModel.id != association_id,
+        ).order_by(RoomTrackAssociationModel.order_in_queue)
+        if new_position == 0:
+            after = self._db.execute(stmt.limit(1)).scalar_one_or_none()
+            return None, after
+        ranks = self._db.execute(stmt.offset(new_position - 1).limit(2)).scalars().all()
+        before = ranks[0] if ranks else None
+        after = ranks[1] if len(ranks) > 1 else None
+        return before, after
+
+    def move_track_in_queue(self, association_id: uuid.UUID, new_position: int) -> RoomTrackAssociationEntity | None:
+        """
+        Ставит запись очереди на позицию new_position, изменяя только её ранг:
+        новый ранг берётся посередине между соседями. Если соседи сошлись ближе
+        settings.queue.MIN_RANK_GAP, очередь комнаты один раз перенумеровывается (rebalance_queue).
+        """
+        model = self._db.get(RoomTrackAssociationModel, association_id)
+        if model is None:
+            return None
+
+        before, after = self._neighbour_ranks(model.room_id, association_id, new_position)
+        if before is not None and after is not None and after - before < settings.queue.MIN_RANK_GAP:
+            self.rebalance_queue(model.room_id)
+            before, after = self._neighbour_ranks(model.room_id, association_id, new_position)
+
+        if before is None and after is None:
+            rank = model.order_in_queue
+        elif before is None:
+            rank = after - 1
+        elif after is None:
+            rank = before + 1
+        else:
+            rank = (before + after) / 2
+
+        self._db.execute(
+            update(RoomTrackAssociationModel).where(
+                RoomTrackAssociationModel.id == association_id
+            ).values(order_in_queue=rank)
+        )
+        self._db.flush()
+        self._db.refresh(model)
+        return self.from_model_to_entity(model)
+
+    def set_ranks(self, ranks: dict[uuid.UUID, float]) -> None:
+        """
+        Записывает ранги нескольких записей очереди одним пакетным UPDATE по первичному ключу.
+        Записи, которых уже нет, пропускаются.
+        """
+        if not ranks:
+            return
+        existing = self._db.execute(
+            select(RoomTrackAssociationModel.id).where(RoomTrackAssociationModel.id.in_(ranks))
+        ).scalars().all()
+        if existing:
+            self._db.execute(
+                update(RoomTrackAssociationModel),
+                [{'id': association_id, 'order_in_queue': ranks[association_id]} for association_id in existing],
+            )
+            self._db.flush()
+
+    def rebalance_queue(self, room_id: uuid.UUID) -> None:
+        """
+        Перенумеровывает ранги очереди комнаты в 0, 1, 2... в текущем порядке.
+        Нужна редко: только когда перемещения исчерпали точность между соседями.
+        """
+        stmt = select(RoomTrackAssociationModel).where(
+            RoomTrackAssociationModel.room_id == room_id,
+        ).order_by(RoomTrackAssociationModel.order_in_queue)
+        for index, model in enumerate(self._db.execute(stmt).scalars().all()):
+            model.order_in_queue = index
+        self._db.flush()
+
+    def get_spotify_index(self, room_id: uuid.UUID) -> dict[str, uuid.UUID]:
+        """
+        Возвращает словарь Spotify ID трека -> ID записи в очереди комнаты одним запросом.
+        Если трек стоит в очереди несколько раз, берётся самая ранняя запись.
+        """
+        stmt = select(Track.spotify_id, RoomTrackAssociationModel.id).join(
+            Track, Track.id == RoomTrackAssociationModel.track_id
+        ).where(
+            RoomTrackAssociationModel.room_id == room_id,
+        ).order_by(RoomTrackAssociationModel.order_in_queue.desc())
+        return {spotify_id: association_id for spotify_id, association_id in self._db.execute(stmt).all()}
@@ -1,9 +1,10 @@
-from sqlalchemy import select,delete
+from sqlalchemy import select,delete,func
 from sqlalchemy.orm import Session
 from app.infrastructure.db.models import Track
 import uuid
 from app.domain.interfaces.track_gateway import TrackGateway
 from app.domain.entity import TrackEntity
+from app.infrastructure.db.dialect_insert import dialect_insert
 
 
 class SATrackGateway(TrackGateway):
@@ -63,4 +64,32 @@ class SATrackGateway(TrackGateway):
             Track.id == track_id,
         )
         result = self._db.execute(stmt)
-        return result.rowcount > 0
\ No newline at end of file
+        return result.rowcount > 0
+
+    def upsert_tracks(self, tracks_data: list[dict]) -> list[TrackEntity]:
+        """
+        Создаёт недостающие треки и обновляет метаданные существующих
+        одним многострочным INSERT ... ON CONFLICT (spotify_id) DO UPDATE ... RETURNING.
+        Возвращает треки в порядке tracks_data (без повторов Spotify ID).
+        """
+        rows = list({data['spotify_id']: data for data in tracks_data}.values())
+        if not rows:
+            return []
+        stmt = dialect_insert(self._db, Track).values([{'id': uuid.uuid4(), **row} for row in rows])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Track.spotify_id],
+            set_={
+                'title': stmt.excluded.title,
+                'artist_names': stmt.excluded.artist_names,
+                'album_name': stmt.excluded.album_name,
+                'album_cover_url': stmt.excluded.album_cover_url,
+                'duration_ms': stmt.excluded.duration_ms,
+                'is_playable': stmt.excluded.is_playable,
+                'last_synced_at': func.now(),
+            },
+        ).returning(Track)
+        tracks = {
+            track.spotify_id: track
+            for track in self._db.scalars(stmt, execution_options={'populate_existing': True})
+        }
+        return [self.from_model_to_entity(tracks[row['spotify_id']]) for row in rows]
\ No newline at end of file
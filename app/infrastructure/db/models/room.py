@@ -32,6 +32,9 @@ class Room(Base):
     current_playing_track_association_id: Mapped[uuid.UUID | None] = mapped_column(
         ForeignKey('room_track_associations.id', ondelete="SET NULL"), nullable=True, comment="ID записи в очереди (RoomTrackAssociationModel) для текущего играющего трека."
     )
+    queue_order_seq: Mapped[int] = mapped_column(
+        nullable=False, default=0, server_default='0', comment="Следующий свободный ранг в конце очереди комнаты."
+    )
 
 
     owner: Mapped["User"] = relationship(
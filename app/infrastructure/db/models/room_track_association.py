@@ -1,5 +1,5 @@
 from app.infrastructure.db.models.base import Base
-from sqlalchemy import ForeignKey,DateTime,func
+from sqlalchemy import ForeignKey,DateTime,Float,Index,UniqueConstraint,func
 from sqlalchemy.orm import Mapped,mapped_column,relationship
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID 
@@ -17,11 +17,16 @@ class RoomTrackAssociationModel(Base):
     """
     __tablename__ = 'room_track_associations'
 
+    __table_args__ = (
+        Index('ix_room_track_associations_room_order', 'room_id', 'order_in_queue'),
+        UniqueConstraint('room_id', 'track_id', name='uq_room_track_associations_room_track'),
+    )
     
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     room_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('rooms.id',ondelete="CASCADE"), nullable=False)
     track_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('tracks.id',ondelete="CASCADE"), nullable=False)
-    order_in_queue: Mapped[int] = mapped_column(nullable=False)
+    # дробный ранг: перемещение пишет значение между соседями, не трогая остальные записи
+    order_in_queue: Mapped[float] = mapped_column(Float, nullable=False)
     added_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
     added_by_user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
 
@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.infrastructure.db.gateway.room_track_association_gateway import SARoomTrackAssociationGateway
+from app.infrastructure.redis.redis_service import RedisService
+from app.infrastructure.redis.room_queue_cache import RoomQueueCache
+
+
+class QueueWriteBehind:
+    """
+    Переносит перестановки очереди из Redis в Postgres (write-behind).
+
+    RoomQueueCache пишет каждую перестановку в поток RoomQueueCache.WRITE_BEHIND_STREAM.
+    Поток читается группой потребителей, поэтому обработчиков может быть несколько.
+    Запись подтверждается только после commit. Если обработчик упал, его записи через
+    WRITE_BEHIND_CLAIM_IDLE_MS забирает другой.
+
+    В базу пишется текущий ранг записи в Redis, а не ранг из записи потока. Поэтому
+    повтор и обработка не по порядку приводят к одному и тому же результату.
+    """
+
+    GROUP = 'queue_writers'
+
+    def __init__(self, session_factory: sessionmaker[Session], redis_service: RedisService):
+        self._session_factory = session_factory
+        self.redis_service = redis_service
+        self.consumer = uuid.uuid4().hex
+        self._worker: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _run(self) -> None:
+        stream = RoomQueueCache.WRITE_BEHIND_STREAM
+        await self.redis_service.xgroup_create(stream, self.GROUP)
+        while True:
+            try:
+                entries = await self.redis_service.xautoclaim(
+                    stream,
+                    self.GROUP,
+                    self.consumer,
+                    settings.queue.WRITE_BEHIND_CLAIM_IDLE_MS,
+                    settings.queue.WRITE_BEHIND_BATCH_SIZE,
+                )
+                entries += await self.redis_service.xreadgroup(
+                    self.GROUP,
+                    self.consumer,
+                    stream,
+                    settings.queue.WRITE_BEHIND_BATCH_SIZE,
+                    settings.queue.WRITE_BEHIND_BLOCK_MS,
+                )
+                if entries:
+                    await self.apply(entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error('QueueWriteBehind: ошибка при переносе очереди в базу %r', e, exc_info=True)
+                await asyncio.sleep(settings.queue.WRITE_BEHIND_BLOCK_MS / 1000)
+
+    async def apply(self, entries: list[tuple[str, dict[str, str]]]) -> None:
+        """
+        Записывает пачку перестановок одним UPDATE и подтверждает её.
+        """
+        latest: dict[uuid.UUID, tuple[uuid.UUID, float]] = {}
+        for _, fields in entries:
+            latest[uuid.UUID(fields['association_id'])] = (uuid.UUID(fields['room_id']), float(fields['rank']))
+
+        ranks: dict[uuid.UUID, float] = {}
+        by_room: dict[uuid.UUID, list[uuid.UUID]] = {}
+        for association_id, (room_id, rank) in latest.items():
+            ranks[association_id] = rank
+            by_room.setdefault(room_id, []).append(association_id)
+        for room_id, association_ids in by_room.items():
+            current = await self.redis_service.zmscore(
+                RoomQueueCache.order_key(room_id), [str(association_id) for association_id in association_ids]
+            )
+            for association_id, score in zip(association_ids, current):
+                if score is not None:
+                    ranks[association_id] = score
+
+        await asyncio.to_thread(self._write, ranks)
+        await self.redis_service.xack(RoomQueueCache.WRITE_BEHIND_STREAM, self.GROUP, *(entry_id for entry_id, _ in entries))
+        logger.debug('QueueWriteBehind: в базу перенесено %s перестановок очереди', len(ranks))
+
+    def _write(self, ranks: dict[uuid.UUID, float]) -> None:
+        with self._session_factory() as session:
+            SARoomTrackAssociationGateway(session).set_ranks(ranks)
+            session.commit()
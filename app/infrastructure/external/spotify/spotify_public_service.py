@@ -10,7 +10,7 @@ from app.presentation.schemas.spotify_schemas import (
 )
 
 from app.domain.exceptions.spotify_exception import SpotifyAuthorizeError,SpotifyAPIError
-from app.application.services.http_service import HttpService
+from app.infrastructure.external.http_service import HttpService
 
 class SpotifyPublicService:
     """
@@ -13,9 +13,9 @@ from app.presentation.schemas.spotify_schemas import (
 )
 
 from app.domain.exceptions.exception import ServerError
-from app.domain.exceptions.spotify_exception import SpotifyAPIError,SpotifyAuthorizeError,CommandError
+from app.domain.exceptions.spotify_exception import SpotifyAPIError,SpotifyAuthorizeError,CommandError,SpotifyDeviceNotFoundError
 from app.infrastructure.redis.redis_service import RedisService
-from app.application.services.http_service import HttpService
+from app.infrastructure.external.http_service import HttpService
 
 
 class SpotifyService:
@@ -30,30 +30,23 @@ class SpotifyService:
         self.user = user
         self.redis_service = redis_service
         self.http_service = http_service
-        self._check_user_spotify_credentials()
 
 
     
-    async def _get_device_id(self, access_token: str) -> str | None:
-        """
-        Получает ID активного устройства пользователя Spotify.
+    def _device_key(self) -> str:
+        return f'spotify_device:{self.user.id}'
 
-        Args:
-            access_token (str): Токен доступа Spotify.
+    async def _get_device_id(self) -> str | None:
+        """
+        Запрашивает у Spotify ID активного устройства пользователя.
 
         Returns:
             str | None: ID активного устройства или None, если оно не найдено.
         """
-        device_url = f'{self.SPOTIFY_API_BASE_URL}/me/player/devices'
-        headers = {
-            'Authorization': f'Bearer {access_token}'
-        }
-        
-        
-        logger.info(f'SpotifyService: Отправляем запрос на Spotify API для получения устройств пользователя {self.user.id} по адресу: {device_url}')
-        response = self.http_service.handle_request_get(device_url,headers=headers)
-        
-        devices = response.json().get('devices', [])
+        logger.info(f'SpotifyService: Запрашиваем устройства Spotify пользователя {self.user.id}.')
+        response = await self._make_spotify_request('GET', '/me/player/devices')
+
+        devices = (response or {}).get('devices', [])
         if not devices:
             logger.info(f'SpotifyService: Для пользователя {self.user.id} не обнаружено активных устройств Spotify.')
             return None
@@ -62,18 +55,44 @@ class SpotifyService:
         if active_device:
             logger.info(f"SpotifyService: Найдено активное устройство {active_device.get('name')}")
             return active_device.get('id')
-            
+
         logger.info("SpotifyService: Активных устройств не найдено.")
         return None
 
-    async def _check_user_spotify_credentials(self):
+    async def get_active_device_id(self, refresh: bool = False) -> str | None:
+        """
+        Возвращает ID активного устройства пользователя из кэша в Redis.
+        Устройства запрашиваются у Spotify, только если кэша нет, он истёк
+        (DEVICE_CACHE_TTL_SECONDS) или передан refresh.
+        """
+        if not refresh:
+            cached_device_id = await self.redis_service.get(self._device_key())
+            if cached_device_id:
+                return cached_device_id
+
+        device_id = await self._get_device_id()
+        if device_id:
+            await self.redis_service.set(
+                self._device_key(), device_id, expiration=settings.playback.DEVICE_CACHE_TTL_SECONDS
+            )
+        else:
+            await self.invalidate_device_id()
+        return device_id
+
+    async def invalidate_device_id(self) -> None:
+        """
+        Сбрасывает закэшированное устройство, например, когда Spotify его больше не видит.
+        """
+        await self.redis_service.default_delete(self._device_key())
+
+    async def check_user_spotify_credentials(self) -> None:
         """
         Проверяет наличие необходимых токенов Spotify у пользователя.
         """
         key_access = f'spotify_auth:{self.user.id}:access'
         key_config = f'spotify_auth:{self.user.id}:config'
         access_token = await self.redis_service.get(key_access)
-        data_token: dict = await self.redis_service.hget(key_config)
+        data_token: dict = await self.redis_service.hget(key_config) or {}
         refresh_token = data_token.get('refresh_token',None)
         if not access_token and not refresh_token:
             logger.error(f'SpotifyService: Отсутствуют токены Spotify у пользователя {self.user.id}.')
@@ -160,12 +179,17 @@ class SpotifyService:
                     raise ServerError(
                         detail="Не удалось выполнить запрос к Spotify API после обновления токена."
                     )
+            if e.response.status_code == 404 and endpoint.startswith('/me/player'):
+                # устройство выключили или сменили: закэшированный ID больше не годится
+                await self.invalidate_device_id()
+                raise SpotifyDeviceNotFoundError(
+                    detail=f"Устройство Spotify не найдено ({endpoint}): {e.response.text}"
+                )
             raise SpotifyAPIError(
                 status_code=e.response.status_code,
                 detail=f"Ошибка Spotify API ({endpoint}): {e.response.text}"
             )
     
-    @property.setter
     def set_user(self,current_user: UserEntity) -> None:
         self.user = current_user
         
@@ -221,11 +245,32 @@ class SpotifyService:
                 json=body
             )
             logger.info(f"SpotifyService: Команда 'play' успешно отправлена для пользователя {self.user.id} на устройство '{device_id}'.")
+        except SpotifyDeviceNotFoundError:
+            raise
         except Exception as e:
             logger.error(f"SpotifyService: Ошибка при отправке команды 'play' для пользователя {self.user.id}: {e}", exc_info=True)
             raise CommandError(detail="Не удалось отправить команду воспроизведения Spotify.")
 
 
+    async def add_to_queue(self, device_id: str, track_uri: str):
+        """
+        Добавляет трек в конец очереди воспроизведения на указанном устройстве.
+        """
+        try:
+            logger.info(f"SpotifyService: Добавляем трек '{track_uri}' в очередь устройства '{device_id}' для пользователя {self.user.id}.")
+            await self._make_spotify_request(
+                'POST',
+                '/me/player/queue',
+                params={'uri': track_uri, 'device_id': device_id}
+            )
+            logger.info(f"SpotifyService: Трек '{track_uri}' добавлен в очередь для пользователя {self.user.id}.")
+        except SpotifyDeviceNotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"SpotifyService: Ошибка при добавлении трека в очередь для пользователя {self.user.id}: {e}", exc_info=True)
+            raise CommandError(detail="Не удалось добавить трек в очередь Spotify.")
+
+
     async def pause(self, device_id: str):
         """
         Ставит воспроизведение на паузу на указанном устройстве.
@@ -238,6 +283,8 @@ class SpotifyService:
                 params={'device_id': device_id}
             )
             logger.info(f"SpotifyService: Команда 'pause' успешно отправлена для пользователя {self.user.id}.")
+        except SpotifyDeviceNotFoundError:
+            raise
         except Exception as e:
             logger.error(f"SpotifyService: Ошибка при отправке команды 'pause' для пользователя {self.user.id}: {e}", exc_info=True)
             raise CommandError(etail="Не удалось отправить команду паузы Spotify.")
@@ -255,6 +302,8 @@ class SpotifyService:
                 params={'device_id': device_id}
             )
             logger.info(f"SpotifyService: Команда 'skip next' успешно отправлена для пользователя {self.user.id}.")
+        except SpotifyDeviceNotFoundError:
+            raise
         except Exception as e:
             logger.error(f"SpotifyService: Ошибка при отправке команды 'skip next' для пользователя {self.user.id}: {e}", exc_info=True)
             raise CommandError(detail="Не удалось отправить команду 'следующий трек' Spotify.")
@@ -271,6 +320,8 @@ class SpotifyService:
                 params={'device_id': device_id}
             )
             logger.info(f"SpotifyService: Команда 'skip previous' успешно отправлена для пользователя {self.user.id}.")
+        except SpotifyDeviceNotFoundError:
+            raise
         except Exception as e:
             logger.error(f"SpotifyService: Ошибка при отправке команды 'skip previous' для пользователя {self.user.id}: {e}", exc_info=True)
             raise CommandError(detail="Не удалось отправить команду 'предыдущий трек' Spotify.")
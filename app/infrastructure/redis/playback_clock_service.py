@@ -0,0 +1,191 @@
+import time
+import uuid
+from dataclasses import replace
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.domain.entity import RoomPlaybackClock
+from app.infrastructure.redis.redis_service import RedisService
+
+
+class PlaybackClockService:
+    """
+    Хранит часы воспроизведения комнат в Redis.
+
+    Вместо того чтобы спрашивать у Spotify progress_ms после каждой команды,
+    сервер запоминает момент старта трека и позицию паузы и сам вычисляет позицию.
+    Со Spotify часы сверяются редко: раз в RECONCILE_INTERVAL_SECONDS или когда
+    состояние заведомо неизвестно (например, после skip). Данные Spotify
+    перезаписывают часы, только если расхождение больше DRIFT_TOLERANCE_MS
+    или играет другой трек.
+
+    О каждом изменении часов сообщается в канал CHANGES_CHANNEL (сообщение — room_id),
+    чтобы планировщик перевзвёл таймер окончания трека. Комнаты с часами перечислены
+    в множестве ROOMS_KEY.
+    """
+
+    CHANGES_CHANNEL = 'room_playback:changes'
+    ROOMS_KEY = 'room_playback:rooms'
+
+    def __init__(self, redis_service: RedisService):
+        self.redis_service = redis_service
+
+    @staticmethod
+    def now_ms() -> int:
+        return time.time_ns() // 1_000_000
+
+    @staticmethod
+    def _key(room_id: uuid.UUID) -> str:
+        return f'room_playback:{room_id}:clock'
+
+    @staticmethod
+    def _to_hash(clock: RoomPlaybackClock) -> dict[str, str]:
+        return {
+            'track_association_id': str(clock.track_association_id) if clock.track_association_id else '',
+            'track_uri': clock.track_uri or '',
+            'duration_ms': str(clock.duration_ms),
+            'started_at_server_ms': str(clock.started_at_server_ms),
+            'paused_at_ms': '' if clock.paused_at_ms is None else str(clock.paused_at_ms),
+            'reconciled_at_ms': str(clock.reconciled_at_ms),
+            'prequeued_association_id': str(clock.prequeued_association_id) if clock.prequeued_association_id else '',
+        }
+
+    @staticmethod
+    def _from_hash(data: dict[str, str]) -> RoomPlaybackClock:
+        return RoomPlaybackClock(
+            track_association_id=uuid.UUID(data['track_association_id']) if data.get('track_association_id') else None,
+            track_uri=data.get('track_uri') or None,
+            duration_ms=int(data.get('duration_ms') or 0),
+            started_at_server_ms=int(data.get('started_at_server_ms') or 0),
+            paused_at_ms=int(data['paused_at_ms']) if data.get('paused_at_ms') else None,
+            reconciled_at_ms=int(data.get('reconciled_at_ms') or 0),
+            prequeued_association_id=(
+                uuid.UUID(data['prequeued_association_id']) if data.get('prequeued_association_id') else None
+            ),
+        )
+
+    async def get(self, room_id: uuid.UUID) -> RoomPlaybackClock | None:
+        data = await self.redis_service.hget(self._key(room_id))
+        if not data:
+            return None
+        return self._from_hash(data)
+
+    async def _save(self, room_id: uuid.UUID, clock: RoomPlaybackClock) -> RoomPlaybackClock:
+        key = self._key(room_id)
+        await self.redis_service.hset(key, self._to_hash(clock))
+        await self.redis_service.expire(key, settings.playback.CLOCK_TTL_SECONDS)
+        await self.redis_service.sadd(self.ROOMS_KEY, str(room_id))
+        await self.redis_service.publish(self.CHANGES_CHANNEL, str(room_id))
+        return clock
+
+    async def start(
+        self,
+        room_id: uuid.UUID,
+        track_association_id: uuid.UUID | None,
+        track_uri: str | None,
+        duration_ms: int,
+        position_ms: int = 0,
+    ) -> RoomPlaybackClock:
+        """
+        Запускает часы для нового трека с указанной позиции.
+        """
+        now = self.now_ms()
+        return await self._save(room_id, RoomPlaybackClock(
+            track_association_id=track_association_id,
+            track_uri=track_uri,
+            duration_ms=duration_ms,
+            started_at_server_ms=now - position_ms,
+            paused_at_ms=None,
+            reconciled_at_ms=now,
+        ))
+
+    async def pause(self, room_id: uuid.UUID) -> RoomPlaybackClock | None:
+        """
+        Фиксирует текущую позицию. Повторная пауза ничего не меняет.
+        """
+        clock = await self.get(room_id)
+        if not clock or not clock.is_playing:
+            return clock
+        return await self._save(room_id, replace(clock, paused_at_ms=clock.position_ms(self.now_ms())))
+
+    async def resume(self, room_id: uuid.UUID, position_ms: int | None = None) -> RoomPlaybackClock | None:
+        """
+        Продолжает воспроизведение с позиции паузы (или с указанной позиции).
+        """
+        clock = await self.get(room_id)
+        if not clock:
+            return None
+        now = self.now_ms()
+        if position_ms is None:
+            position_ms = clock.position_ms(now)
+        return await self._save(room_id, replace(clock, started_at_server_ms=now - position_ms, paused_at_ms=None))
+
+    async def mark_prequeued(self, room_id: uuid.UUID, association_id: uuid.UUID) -> RoomPlaybackClock | None:
+        """
+        Запоминает, что следующий трек уже стоит в очереди устройства хоста.
+        """
+        clock = await self.get(room_id)
+        if not clock:
+            return None
+        return await self._save(room_id, replace(clock, prequeued_association_id=association_id))
+
+    async def clear(self, room_id: uuid.UUID) -> None:
+        await self.redis_service.default_delete(self._key(room_id))
+        await self.redis_service.srem(self.ROOMS_KEY, str(room_id))
+        await self.redis_service.publish(self.CHANGES_CHANNEL, str(room_id))
+
+    async def rooms(self) -> list[uuid.UUID]:
+        """
+        Возвращает комнаты, для которых заведены часы.
+        """
+        return [uuid.UUID(room_id) for room_id in await self.redis_service.smembers(self.ROOMS_KEY)]
+
+    async def reconcile(
+        self,
+        room_id: uuid.UUID,
+        progress_ms: int,
+        is_playing: bool,
+        duration_ms: int,
+        track_association_id: uuid.UUID | None,
+        track_uri: str | None,
+    ) -> tuple[RoomPlaybackClock, bool]:
+        """
+        Сверяет часы с фактическим состоянием плеера.
+        Возвращает актуальные часы и признак того, что они были исправлены.
+        """
+        now = self.now_ms()
+        clock = await self.get(room_id)
+        drifted = (
+            clock is None
+            or clock.track_uri != track_uri
+            or clock.is_playing != is_playing
+            or abs(clock.position_ms(now) - progress_ms) > settings.playback.DRIFT_TOLERANCE_MS
+        )
+        if drifted:
+            if clock is not None:
+                logger.info(
+                    'PlaybackClockService: часы комнаты %s разошлись со Spotify (%sms против %sms), исправляем',
+                    room_id, clock.position_ms(now), progress_ms,
+                )
+            clock = RoomPlaybackClock(
+                track_association_id=track_association_id,
+                track_uri=track_uri,
+                duration_ms=duration_ms,
+                started_at_server_ms=now - progress_ms,
+                paused_at_ms=None if is_playing else progress_ms,
+                reconciled_at_ms=now,
+                # тот же трек: следующий уже стоит в очереди устройства, второй раз его не добавляем
+                prequeued_association_id=clock.prequeued_association_id if clock and clock.track_uri == track_uri else None,
+            )
+        else:
+            clock = replace(clock, reconciled_at_ms=now)
+        return await self._save(room_id, clock), drifted
+
+    def needs_reconcile(self, clock: RoomPlaybackClock | None, now_ms: int | None = None) -> bool:
+        """
+        Пора ли сверить часы со Spotify.
+        """
+        if clock is None:
+            return True
+        now_ms = now_ms if now_ms is not None else self.now_ms()
+        return now_ms - clock.reconciled_at_ms >= settings.playback.RECONCILE_INTERVAL_SECONDS * 1000
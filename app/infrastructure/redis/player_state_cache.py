@@ -0,0 +1,99 @@
+import json
+import uuid
+from typing import Any
+
+from app.config.settings import settings
+from app.domain.entity import RoomPlaybackClock
+from app.infrastructure.redis.redis_service import RedisService
+
+
+class PlayerStateCache:
+    """
+    Готовое состояние плеера комнаты в Redis, чтобы эндпоинт состояния не ходил в Postgres.
+
+    Хэш room_player:{room_id}:state хранит хоста (id и имя), текущую запись очереди,
+    метаданные трека (JSON) и часы: момент старта, позицию паузы и длительность.
+    Позиция вычисляется при чтении. Хост и воспроизведение записываются разными
+    командами плеера; если какой-то части в хэше нет, чтение считается промахом
+    и состояние собирается из базы.
+
+    Членство в комнате кэшируется отдельно на MEMBERSHIP_TTL_SECONDS
+    и сбрасывается при выходе, кике и бане.
+    """
+
+    def __init__(self, redis_service: RedisService):
+        self.redis_service = redis_service
+
+    @staticmethod
+    def _key(room_id: uuid.UUID) -> str:
+        return f'room_player:{room_id}:state'
+
+    @staticmethod
+    def _member_key(room_id: uuid.UUID, user_id: uuid.UUID) -> str:
+        return f'room_player:{room_id}:member:{user_id}'
+
+    async def _write(self, room_id: uuid.UUID, fields: dict[str, str]) -> None:
+        key = self._key(room_id)
+        await self.redis_service.hset(key, fields)
+        await self.redis_service.expire(key, settings.playback.CLOCK_TTL_SECONDS)
+
+    async def save_host(self, room_id: uuid.UUID, host_id: uuid.UUID | None, host_username: str | None) -> None:
+        await self._write(room_id, {
+            'host_id': str(host_id) if host_id else '',
+            'host_username': host_username or '',
+        })
+
+    async def save_playback(
+        self,
+        room_id: uuid.UUID,
+        clock: RoomPlaybackClock | None,
+        track: dict[str, Any] | None,
+    ) -> None:
+        await self._write(room_id, {
+            'track_association_id': str(clock.track_association_id) if clock and clock.track_association_id else '',
+            'track': json.dumps(track, ensure_ascii=False) if track else '',
+            'duration_ms': str(clock.duration_ms) if clock else '0',
+            'started_at_server_ms': str(clock.started_at_server_ms) if clock else '0',
+            'paused_at_ms': '' if not clock or clock.paused_at_ms is None else str(clock.paused_at_ms),
+            'has_clock': '1' if clock else '',
+        })
+
+    async def get(self, room_id: uuid.UUID, now_ms: int) -> dict[str, Any] | None:
+        """
+        Возвращает состояние плеера в формате эндпоинта или None при промахе.
+        """
+        data = await self.redis_service.hget(self._key(room_id))
+        if not data or 'host_id' not in data or 'duration_ms' not in data:
+            return None
+
+        clock = None
+        if data.get('has_clock'):
+            clock = RoomPlaybackClock(
+                track_association_id=uuid.UUID(data['track_association_id']) if data.get('track_association_id') else None,
+                track_uri=None,
+                duration_ms=int(data['duration_ms']),
+                started_at_server_ms=int(data['started_at_server_ms']),
+                paused_at_ms=int(data['paused_at_ms']) if data.get('paused_at_ms') else None,
+                reconciled_at_ms=0,
+            )
+        return {
+            'is_playing': clock.is_playing if clock else False,
+            'current_track': json.loads(data['track']) if data.get('track') else None,
+            'progress_ms': clock.position_ms(now_ms) if clock else 0,
+            'duration_ms': clock.duration_ms if clock else 0,
+            'server_time_ms': now_ms,
+            'position_anchor': clock.anchor(now_ms) if clock else None,
+            'playback_host_id': data['host_id'] or None,
+            'playback_host_username': data.get('host_username') or None,
+        }
+
+    async def is_member(self, room_id: uuid.UUID, user_id: uuid.UUID) -> bool:
+        return await self.redis_service.get(self._member_key(room_id, user_id)) is not None
+
+    async def remember_member(self, room_id: uuid.UUID, user_id: uuid.UUID) -> None:
+        await self.redis_service.set(
+            self._member_key(room_id, user_id), '1', expiration=settings.playback.MEMBERSHIP_TTL_SECONDS
+        )
+
+    async def forget_member(self, room_id: uuid.UUID, user_id: uuid.UUID) -> None:
+        await self.redis_service.default_delete(self._member_key(room_id, user_id))
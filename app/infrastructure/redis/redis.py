@@ -8,17 +8,17 @@ from app.config.log_config import logger
 
 
 redis_pool = ConnectionPool(
-    max_connections=10
-)
-
-async_redis_client: Redis = Redis(
-    connection_pool=redis_pool,
+    max_connections=10,
     host=settings.redis.REDIS_HOST,
     port=settings.redis.REDIS_PORT,
     db=0,
     decode_responses=True
 )
 
+async_redis_client: Redis = Redis(
+    connection_pool=redis_pool,
+)
+
 async def get_redis_client():
     logger.info("Attempting to get Redis client...")
     try:
@@ -57,7 +57,7 @@ class RedisService:
                 logger.info('RedisService: Данные не найдены')
                 return None
             result = {
-                k.decode('utf-8'): v.decode('utf-8')
+                (k.decode('utf-8') if isinstance(k, bytes) else k): (v.decode('utf-8') if isinstance(v, bytes) else v)
                 for k,v in result.items()
             }
             logger.info('RedisService: Возвращаю данные по ключу %s',key)
@@ -74,6 +74,15 @@ class RedisService:
             logger.error("RedisService: set error for key=%s: %s", key, e, exc_info=True)
             return False
 
+    async def hdel(self,key: str,*fields: str) -> bool:
+        """Удаляет поля хэша."""
+        try:
+            await self._client.hdel(key,*fields)
+            return True
+        except Exception as e:
+            logger.error("RedisService: hdel error for key=%s: %s", key, e, exc_info=True)
+            return False
+
     async def lpush(self, name: str, value: str) -> bool:
         """Добавляет элемент в начало списка."""
         try:
@@ -138,4 +147,175 @@ class RedisService:
             return True
         except Exception as e:
             logger.error("RedisService: lrem error for key=%s: %s", key, e, exc_info=True)
-            return False
\ No newline at end of file
+            return False
+
+    async def incr(self, key: str, amount: int = 1) -> int | None:
+        """Атомарно увеличивает счётчик и возвращает новое значение."""
+        try:
+            return await self._client.incr(key, amount)
+        except Exception as e:
+            logger.error("RedisService: incr error for key=%s: %s", key, e, exc_info=True)
+            return None
+
+    async def get_int(self, key: str) -> int:
+        """Возвращает целочисленное значение ключа или 0."""
+        try:
+            value = await self._client.get(key)
+            return int(value) if value is not None else 0
+        except Exception as e:
+            logger.error("RedisService: get_int error for key=%s: %s", key, e, exc_info=True)
+            return 0
+
+    async def eval(self, script: str, keys: list[str], args: list[Any]) -> Any | None:
+        """Выполняет Lua-скрипт атомарно на стороне Redis."""
+        try:
+            return await self._client.eval(script, len(keys), *keys, *args)
+        except Exception as e:
+            logger.error("RedisService: eval error for keys=%s: %s", keys, e, exc_info=True)
+            return None
+
+    async def xrange(self, name: str, min: str = '-', max: str = '+', count: int | None = None) -> list[tuple[str, dict[str, str]]]:
+        """Возвращает записи потока в диапазоне идентификаторов."""
+        try:
+            return await self._client.xrange(name, min=min, max=max, count=count)
+        except Exception as e:
+            logger.error("RedisService: xrange error for name=%s: %s", name, e, exc_info=True)
+            return []
+
+    async def zadd(self, name: str, mapping: dict[str, float]) -> bool:
+        """Добавляет элементы в сортированное множество или обновляет их вес."""
+        try:
+            await self._client.zadd(name, mapping)
+            return True
+        except Exception as e:
+            logger.error("RedisService: zadd error for name=%s: %s", name, e, exc_info=True)
+            return False
+
+    async def zrem(self, name: str, *values: str) -> bool:
+        """Удаляет элементы из сортированного множества."""
+        try:
+            await self._client.zrem(name, *values)
+            return True
+        except Exception as e:
+            logger.error("RedisService: zrem error for name=%s: %s", name, e, exc_info=True)
+            return False
+
+    async def zmscore(self, name: str, values: list[str]) -> list[float | None]:
+        """Возвращает веса элементов сортированного множества (None для отсутствующих)."""
+        if not values:
+            return []
+        try:
+            return await self._client.zmscore(name, values)
+        except Exception as e:
+            logger.error("RedisService: zmscore error for name=%s: %s", name, e, exc_info=True)
+            return [None] * len(values)
+
+    async def zrangebyscore(self, name: str, min: float | str, max: float | str) -> list[str]:
+        """Возвращает элементы сортированного множества с весом в диапазоне."""
+        try:
+            result = await self._client.zrangebyscore(name, min, max)
+            return [item.decode('utf-8') if isinstance(item, bytes) else item for item in result]
+        except Exception as e:
+            logger.error("RedisService: zrangebyscore error for name=%s: %s", name, e, exc_info=True)
+            return []
+
+    async def zremrangebyscore(self, name: str, min: float | str, max: float | str) -> int:
+        """Удаляет элементы с весом в диапазоне и возвращает их количество."""
+        try:
+            return await self._client.zremrangebyscore(name, min, max)
+        except Exception as e:
+            logger.error("RedisService: zremrangebyscore error for name=%s: %s", name, e, exc_info=True)
+            return 0
+
+    async def zcard(self, name: str) -> int:
+        """Возвращает размер сортированного множества."""
+        try:
+            return await self._client.zcard(name)
+        except Exception as e:
+            logger.error("RedisService: zcard error for name=%s: %s", name, e, exc_info=True)
+            return 0
+
+    async def sadd(self, name: str, *values: str) -> bool:
+        """Добавляет элементы в множество."""
+        try:
+            await self._client.sadd(name, *values)
+            return True
+        except Exception as e:
+            logger.error("RedisService: sadd error for name=%s: %s", name, e, exc_info=True)
+            return False
+
+    async def srem(self, name: str, *values: str) -> bool:
+        """Удаляет элементы из множества."""
+        try:
+            await self._client.srem(name, *values)
+            return True
+        except Exception as e:
+            logger.error("RedisService: srem error for name=%s: %s", name, e, exc_info=True)
+            return False
+
+    async def smembers(self, name: str) -> list[str]:
+        """Возвращает все элементы множества."""
+        try:
+            result = await self._client.smembers(name)
+            return [item.decode('utf-8') if isinstance(item, bytes) else item for item in result]
+        except Exception as e:
+            logger.error("RedisService: smembers error for name=%s: %s", name, e, exc_info=True)
+            return []
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        """Задаёт время жизни ключа."""
+        try:
+            return bool(await self._client.expire(key, seconds))
+        except Exception as e:
+            logger.error("RedisService: expire error for key=%s: %s", key, e, exc_info=True)
+            return False
+
+    async def publish(self, channel: str, message: str) -> bool:
+        """Публикует сообщение в канал pub/sub."""
+        try:
+            await self._client.publish(channel, message)
+            return True
+        except Exception as e:
+            logger.error("RedisService: publish error for channel=%s: %s", channel, e, exc_info=True)
+            return False
+
+    async def xgroup_create(self, name: str, group: str) -> bool:
+        """Создаёт группу потребителей потока (и сам поток), если её ещё нет."""
+        try:
+            await self._client.xgroup_create(name, group, id='0', mkstream=True)
+            return True
+        except Exception as e:
+            if 'BUSYGROUP' in str(e):
+                return True
+            logger.error("RedisService: xgroup_create error for name=%s: %s", name, e, exc_info=True)
+            return False
+
+    async def xreadgroup(self, group: str, consumer: str, name: str, count: int, block_ms: int) -> list[tuple[str, dict[str, str]]]:
+        """Читает новые записи потока для потребителя группы, ожидая до block_ms."""
+        try:
+            result = await self._client.xreadgroup(group, consumer, {name: '>'}, count=count, block=block_ms)
+            return result[0][1] if result else []
+        except Exception as e:
+            logger.error("RedisService: xreadgroup error for name=%s: %s", name, e, exc_info=True)
+            return []
+
+    async def xautoclaim(self, name: str, group: str, consumer: str, min_idle_ms: int, count: int) -> list[tuple[str, dict[str, str]]]:
+        """Забирает записи, которые другие потребители группы давно не подтвердили."""
+        try:
+            result = await self._client.xautoclaim(name, group, consumer, min_idle_ms, start_id='0-0', count=count)
+            return [entry for entry in result[1] if entry and entry[1]]
+        except Exception as e:
+            logger.error("RedisService: xautoclaim error for name=%s: %s", name, e, exc_info=True)
+            return []
+
+    async def xack(self, name: str, group: str, *ids: str) -> bool:
+        """Подтверждает обработку записей потока и удаляет их из потока."""
+        if not ids:
+            return True
+        try:
+            await self._client.xack(name, group, *ids)
+            await self._client.xdel(name, *ids)
+            return True
+        except Exception as e:
+            logger.error("RedisService: xack error for name=%s: %s", name, e, exc_info=True)
+            return False
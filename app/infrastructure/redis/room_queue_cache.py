@@ -0,0 +1,310 @@
+import json
+import uuid
+from typing import Any
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.infrastructure.redis.redis_service import RedisService
+
+
+# KEYS: порядок (zset), записи (hash), признак загрузки. ARGV: TTL, затем тройки id, ранг, JSON
+_FILL_SCRIPT = """
+redis.call('DEL', KEYS[1], KEYS[2])
+for i = 2, #ARGV, 3 do
+    redis.call('ZADD', KEYS[1], ARGV[i + 1], ARGV[i])
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 2])
+end
+redis.call('SET', KEYS[3], '1')
+for i = 1, 3 do
+    redis.call('EXPIRE', KEYS[i], ARGV[1])
+end
+return 1
+"""
+
+_READ_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return false
+end
+local order = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+local ids = {}
+for i = 1, #order, 2 do
+    ids[#ids + 1] = order[i]
+end
+local items = {}
+if #ids > 0 then
+    items = redis.call('HMGET', KEYS[2], unpack(ids))
+end
+for i = 1, 3 do
+    redis.call('EXPIRE', KEYS[i], ARGV[1])
+end
+return {order, items}
+"""
+
+# Страница очереди: до ARGV[3] записей с рангом от ARGV[2] (ZRANGEBYSCORE, '(' — строго больше).
+# Курсор составной: если передан ARGV[5], записи с рангом ARGV[2] и ID не больше ARGV[5]
+# пропускаются. Записи с равным рангом zset хранит по возрастанию ID, как и ORDER BY в базе.
+# Если передан ARGV[4] и запись есть в очереди, страница начинается с неё самой.
+_PAGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return false
+end
+local min = ARGV[2]
+local tie_id = ARGV[5]
+local inclusive = false
+if ARGV[4] ~= '' then
+    local start_rank = redis.call('ZSCORE', KEYS[1], ARGV[4])
+    if start_rank then
+        min = start_rank
+        tie_id = ARGV[4]
+        inclusive = true
+    end
+end
+local offset = 0
+if tie_id ~= '' then
+    for _, member in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], min, min)) do
+        if member < tie_id or (member == tie_id and not inclusive) then
+            offset = offset + 1
+        end
+    end
+end
+local order = redis.call('ZRANGEBYSCORE', KEYS[1], min, '+inf', 'WITHSCORES', 'LIMIT', offset, ARGV[3])
+local ids = {}
+for i = 1, #order, 2 do
+    ids[#ids + 1] = order[i]
+end
+local items = {}
+if #ids > 0 then
+    items = redis.call('HMGET', KEYS[2], unpack(ids))
+end
+for i = 1, 3 do
+    redis.call('EXPIRE', KEYS[i], ARGV[1])
+end
+return {order, items}
+"""
+
+# Меняет очередь, только если она загружена: иначе следующее чтение возьмёт её из базы.
+# Если в конец уже переставлена запись, которая ещё не дошла до базы, ранг новой записи
+# поднимается выше неё и тоже уходит в поток отложенной записи.
+# ARGV: TTL, ID комнаты, затем тройки id, ранг, JSON.
+_ADD_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return 0
+end
+local last = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+local last_rank = last[2] and tonumber(last[2])
+for i = 3, #ARGV, 3 do
+    local rank = tonumber(ARGV[i + 1])
+    if last_rank and last_rank >= rank then
+        rank = math.floor(last_rank) + 1
+        redis.call('XADD', KEYS[4], '*', 'room_id', ARGV[2], 'association_id', ARGV[i], 'rank', rank)
+    end
+    redis.call('ZADD', KEYS[1], rank, ARGV[i])
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 2])
+    last_rank = rank
+end
+for i = 1, 3 do
+    redis.call('EXPIRE', KEYS[i], ARGV[1])
+end
+return 1
+"""
+
+# Перестановка: новый ранг между соседями на целевой позиции, запись в поток отложенной
+# записи в том же скрипте. Если соседи сошлись ближе ARGV[3], очередь перенумеровывается.
+# Возвращает {1, ранг}, {0} — очередь не загружена, {-1} — записи нет, {-2, длина} — плохая позиция.
+_MOVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return {0}
+end
+local id = ARGV[1]
+local position = tonumber(ARGV[2])
+local current = redis.call('ZSCORE', KEYS[1], id)
+if not current then
+    return {-1}
+end
+local length = redis.call('ZCARD', KEYS[1])
+if position < 0 or position >= length then
+    return {-2, length}
+end
+
+local function rank_at(index, skip)
+    -- ранг index-й записи очереди без перемещаемой
+    if index < 0 or index >= length - 1 then
+        return nil
+    end
+    if index >= skip then
+        index = index + 1
+    end
+    local found = redis.call('ZRANGE', KEYS[1], index, index, 'WITHSCORES')
+    return tonumber(found[2])
+end
+
+local function neighbours()
+    local skip = redis.call('ZRANK', KEYS[1], id)
+    return rank_at(position - 1, skip), rank_at(position, skip)
+end
+
+local before, after = neighbours()
+if before and after and after - before < tonumber(ARGV[3]) then
+    local members = redis.call('ZRANGE', KEYS[1], 0, -1)
+    for index, member in ipairs(members) do
+        redis.call('ZADD', KEYS[1], index - 1, member)
+        redis.call('XADD', KEYS[4], '*', 'room_id', ARGV[4], 'association_id', member, 'rank', index - 1)
+    end
+    before, after = neighbours()
+end
+
+local rank
+if not before and not after then
+    rank = tonumber(current)
+elseif not before then
+    rank = after - 1
+elseif not after then
+    rank = before + 1
+else
+    rank = (before + after) / 2
+end
+local encoded = string.format('%.17g', rank)
+redis.call('ZADD', KEYS[1], encoded, id)
+redis.call('XADD', KEYS[4], '*', 'room_id', ARGV[4], 'association_id', id, 'rank', encoded)
+for i = 1, 3 do
+    redis.call('EXPIRE', KEYS[i], ARGV[5])
+end
+return {1, encoded}
+"""
+
+
+class RoomQueueCache:
+    """
+    Очередь активной комнаты в Redis, чтобы чтения и перестановки не ходили в Postgres.
+
+    room_queue:{room_id}:order — сортированное множество ID записей очереди с рангом,
+    room_queue:{room_id}:items — хэш ID записи -> JSON элемента очереди (трек и время добавления).
+    Ключ room_queue:{room_id}:loaded отличает пустую очередь от незагруженной.
+
+    Добавление и удаление пишутся в базу сразу и дублируются сюда. Перестановка
+    выполняется только здесь: новый ранг вместе с записью в поток WRITE_BEHIND_STREAM
+    ставит один скрипт, а в Postgres её переносит QueueWriteBehind.
+    """
+
+    WRITE_BEHIND_STREAM = 'room_queue:write_behind'
+
+    def __init__(self, redis_service: RedisService):
+        self.redis_service = redis_service
+
+    @staticmethod
+    def order_key(room_id: uuid.UUID) -> str:
+        return f'room_queue:{room_id}:order'
+
+    def _keys(self, room_id: uuid.UUID) -> list[str]:
+        return [self.order_key(room_id), f'room_queue:{room_id}:items', f'room_queue:{room_id}:loaded']
+
+    async def get(self, room_id: uuid.UUID) -> list[dict[str, Any]] | None:
+        """
+        Возвращает элементы очереди по порядку или None, если очередь не загружена.
+        order_in_queue каждого элемента берётся из текущего ранга.
+        """
+        result = await self.redis_service.eval(
+            _READ_SCRIPT, self._keys(room_id), [settings.queue.CACHE_TTL_SECONDS]
+        )
+        if not result:
+            return None
+        return self._decode(room_id, *result)
+
+    async def page(
+        self,
+        room_id: uuid.UUID,
+        after: float | None,
+        limit: int,
+        start_at: uuid.UUID | None = None,
+        after_id: uuid.UUID | None = None,
+    ) -> list[dict[str, Any]] | None:
+        """
+        Возвращает до limit элементов после курсора (after, after_id) или None, если очередь
+        не загружена. Без after_id берутся элементы с рангом строго больше after.
+        Если запись start_at есть в очереди, страница начинается с неё самой.
+        """
+        if after is None:
+            min_rank = '-inf'
+        elif after_id is None:
+            min_rank = f'({after!r}'
+        else:
+            min_rank = repr(after)
+        result = await self.redis_service.eval(
+            _PAGE_SCRIPT,
+            self._keys(room_id),
+            [
+                settings.queue.CACHE_TTL_SECONDS,
+                min_rank,
+                limit,
+                str(start_at) if start_at else '',
+                str(after_id) if after is not None and after_id else '',
+            ],
+        )
+        if not result:
+            return None
+        return self._decode(room_id, *result)
+
+    @staticmethod
+    def _decode(room_id: uuid.UUID, order: list[str], items: list[str | None]) -> list[dict[str, Any]] | None:
+        queue = []
+        for index in range(0, len(order), 2):
+            raw = items[index // 2]
+            if raw is None:
+                logger.warning('RoomQueueCache: в очереди комнаты %s нет данных записи %s', room_id, order[index])
+                return None
+            item = json.loads(raw)
+            item['order_in_queue'] = float(order[index + 1])
+            queue.append(item)
+        return queue
+
+    async def fill(self, room_id: uuid.UUID, items: list[dict[str, Any]]) -> None:
+        """
+        Загружает очередь комнаты целиком. Каждый элемент должен содержать id и order_in_queue.
+        """
+        args: list[Any] = [settings.queue.CACHE_TTL_SECONDS]
+        for item in items:
+            args += [item['id'], item['order_in_queue'], json.dumps(item, default=str, ensure_ascii=False)]
+        await self.redis_service.eval(_FILL_SCRIPT, self._keys(room_id), args)
+
+    async def add(self, room_id: uuid.UUID, item: dict[str, Any]) -> None:
+        await self.add_many(room_id, [item])
+
+    async def add_many(self, room_id: uuid.UUID, items: list[dict[str, Any]]) -> None:
+        """
+        Добавляет элементы в конец загруженной очереди одним скриптом.
+        """
+        if not items:
+            return
+        args: list[Any] = [settings.queue.CACHE_TTL_SECONDS, str(room_id)]
+        for item in items:
+            args += [item['id'], item['order_in_queue'], json.dumps(item, default=str, ensure_ascii=False)]
+        await self.redis_service.eval(_ADD_SCRIPT, [*self._keys(room_id), self.WRITE_BEHIND_STREAM], args)
+
+    async def remove(self, room_id: uuid.UUID, association_id: uuid.UUID) -> None:
+        order_key, items_key, _ = self._keys(room_id)
+        await self.redis_service.zrem(order_key, str(association_id))
+        await self.redis_service.hdel(items_key, str(association_id))
+
+    async def move(self, room_id: uuid.UUID, association_id: uuid.UUID, new_position: int) -> float | None:
+        """
+        Ставит запись на позицию new_position и возвращает её новый ранг.
+        Возвращает None, если очередь комнаты не загружена или Redis недоступен.
+        """
+        result = await self.redis_service.eval(
+            _MOVE_SCRIPT,
+            [*self._keys(room_id), self.WRITE_BEHIND_STREAM],
+            [
+                str(association_id),
+                new_position,
+                repr(settings.queue.MIN_RANK_GAP),
+                str(room_id),
+                settings.queue.CACHE_TTL_SECONDS,
+            ],
+        )
+        if not result or result[0] == 0:
+            return None
+        if result[0] == -1:
+            raise ValueError(f"Трек с ассоциацией ID {association_id} не найден в очереди.")
+        if result[0] == -2:
+            raise ValueError(f"Некорректная позиция: {new_position}. Допустимый диапазон от 0 до {result[1] - 1}.")
+        return float(result[1])
@@ -0,0 +1,215 @@
+import asyncio
+import math
+import time
+import uuid
+import zlib
+from typing import Awaitable, Callable
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.infrastructure.redis.redis_service import RedisService
+
+
+# Захватывает свободную аренду и выдаёт новый, строго возрастающий токен
+_ACQUIRE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+local token = redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[1], ARGV[1] .. ':' .. token, 'PX', ARGV[2])
+return token
+"""
+
+# Продлевает аренду, только если она всё ещё наша
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Пропускает только токен не меньше уже виденного: запоздавший бывший владелец получит отказ
+_FENCE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local token = tonumber(ARGV[1])
+if token < current then
+    return 0
+end
+redis.call('SET', KEYS[1], token, 'EX', ARGV[2])
+return 1
+"""
+
+
+class SchedulerLeaseService:
+    """
+    Делит комнаты между экземплярами планировщика.
+
+    Комнаты раскладываются по SCHEDULER_SHARDS шардам, на каждый шард берётся
+    аренда в Redis с TTL. Экземпляр продлевает свои аренды каждые
+    SCHEDULER_LEASE_RENEW_INTERVAL_MS и держит не больше своей доли шардов
+    (шарды / живые экземпляры): лишние отпускает, свободные забирает. Если
+    экземпляр умер, его аренды истекают, и шарды подхватывают остальные.
+
+    Каждый захват выдаёт токен (fencing token), который растёт с каждой сменой
+    владельца. Перед переключением трека токен сверяется с последним виденным
+    для комнаты (fence), поэтому экземпляр, который «проспал» потерю аренды,
+    не повторит уже выполненное действие.
+    """
+
+    INSTANCES_KEY = 'scheduler:instances'
+
+    def __init__(
+        self,
+        redis_service: RedisService,
+        on_acquired: Callable[[set[int]], Awaitable[None]] | None = None,
+        on_lost: Callable[[set[int]], Awaitable[None]] | None = None,
+    ):
+        self.redis_service = redis_service
+        self.instance_id = uuid.uuid4().hex
+        self.on_acquired = on_acquired
+        self.on_lost = on_lost
+        self._shards = settings.playback.SCHEDULER_SHARDS
+        self._ttl_ms = settings.playback.SCHEDULER_LEASE_TTL_MS
+        self._renew_interval = settings.playback.SCHEDULER_LEASE_RENEW_INTERVAL_MS / 1000
+        # шард -> (токен, до какого момента аренда точно действительна по локальным часам)
+        self._leases: dict[int, tuple[int, float]] = {}
+        self._worker: asyncio.Task | None = None
+
+    @staticmethod
+    def _lease_key(shard: int) -> str:
+        return f'scheduler:shard:{shard}:lease'
+
+    @staticmethod
+    def _token_key(shard: int) -> str:
+        return f'scheduler:shard:{shard}:token'
+
+    @staticmethod
+    def _fence_key(room_id: uuid.UUID) -> str:
+        return f'room_playback:{room_id}:fence'
+
+    def shard_of(self, room_id: uuid.UUID) -> int:
+        return zlib.crc32(room_id.bytes) % self._shards
+
+    def _lease_value(self, shard: int) -> str:
+        return f'{self.instance_id}:{self._leases[shard][0]}'
+
+    def _preference(self, shard: int) -> int:
+        # у каждого экземпляра свой порядок шардов, чтобы они не толкались за одни и те же
+        return zlib.crc32(f'{self.instance_id}:{shard}'.encode())
+
+    def owned_shards(self) -> set[int]:
+        now = time.monotonic()
+        return {shard for shard, (_, valid_until) in self._leases.items() if valid_until > now}
+
+    def token_for(self, room_id: uuid.UUID) -> int | None:
+        """
+        Возвращает токен аренды шарда комнаты или None, если комната не наша.
+        """
+        lease = self._leases.get(self.shard_of(room_id))
+        if not lease or lease[1] <= time.monotonic():
+            return None
+        return lease[0]
+
+    async def fence(self, room_id: uuid.UUID, token: int) -> bool:
+        """
+        Проверяет, что действие с этим токеном не устарело, и запоминает токен.
+        """
+        result = await self.redis_service.eval(
+            _FENCE_SCRIPT,
+            [self._fence_key(room_id)],
+            [token, settings.playback.CLOCK_TTL_SECONDS],
+        )
+        return bool(result)
+
+    async def _live_instances(self) -> int:
+        now_ms = time.time_ns() // 1_000_000
+        await self.redis_service.zadd(self.INSTANCES_KEY, {self.instance_id: now_ms + self._ttl_ms})
+        await self.redis_service.zremrangebyscore(self.INSTANCES_KEY, '-inf', now_ms)
+        return max(await self.redis_service.zcard(self.INSTANCES_KEY), 1)
+
+    async def rebalance(self) -> None:
+        """
+        Продлевает свои аренды и приводит число шардов к своей доле.
+        """
+        lost: set[int] = set()
+        acquired: set[int] = set()
+
+        for shard in list(self._leases):
+            started = time.monotonic()
+            renewed = await self.redis_service.eval(
+                _RENEW_SCRIPT, [self._lease_key(shard)], [self._lease_value(shard), self._ttl_ms]
+            )
+            if renewed:
+                self._leases[shard] = (self._leases[shard][0], started + self._ttl_ms / 1000)
+            else:
+                del self._leases[shard]
+                lost.add(shard)
+
+        target = math.ceil(self._shards / await self._live_instances())
+        if len(self._leases) > target:
+            excess = sorted(self._leases, key=self._preference)[target:]
+            for shard in excess:
+                value = self._lease_value(shard)
+                del self._leases[shard]
+                lost.add(shard)
+                await self.redis_service.eval(_RELEASE_SCRIPT, [self._lease_key(shard)], [value])
+        elif len(self._leases) < target:
+            for shard in sorted(range(self._shards), key=self._preference):
+                if len(self._leases) >= target:
+                    break
+                if shard in self._leases:
+                    continue
+                started = time.monotonic()
+                token = await self.redis_service.eval(
+                    _ACQUIRE_SCRIPT,
+                    [self._lease_key(shard), self._token_key(shard)],
+                    [self.instance_id, self._ttl_ms],
+                )
+                if token:
+                    self._leases[shard] = (int(token), started + self._ttl_ms / 1000)
+                    acquired.add(shard)
+
+        if lost:
+            logger.info('SchedulerLeaseService: %s отпустил шарды %s', self.instance_id, sorted(lost))
+            if self.on_lost:
+                await self.on_lost(lost)
+        if acquired:
+            logger.info('SchedulerLeaseService: %s захватил шарды %s', self.instance_id, sorted(acquired))
+            if self.on_acquired:
+                await self.on_acquired(acquired)
+
+    def start(self) -> None:
+        self._worker = asyncio.create_task(self._rebalance_loop())
+
+    async def stop(self) -> None:
+        """
+        Останавливает продление и отпускает аренды, чтобы шарды сразу забрали другие.
+        """
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for shard in list(self._leases):
+            await self.redis_service.eval(_RELEASE_SCRIPT, [self._lease_key(shard)], [self._lease_value(shard)])
+        self._leases.clear()
+        await self.redis_service.zrem(self.INSTANCES_KEY, self.instance_id)
+
+    async def _rebalance_loop(self) -> None:
+        while True:
+            try:
+                await self.rebalance()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error('SchedulerLeaseService: ошибка при продлении аренд %r', e, exc_info=True)
+            await asyncio.sleep(self._renew_interval)
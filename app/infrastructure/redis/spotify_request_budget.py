@@ -0,0 +1,60 @@
+import asyncio
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.infrastructure.redis.redis_service import RedisService
+
+
+# Ведро токенов: пополняется со скоростью ARGV[1] в секунду до ARGV[2].
+# Возвращает 0, если токены списаны, иначе сколько миллисекунд подождать.
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or burst)
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or now)
+tokens = math.min(burst, tokens + (now - updated) * rate / 1000)
+
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = math.ceil((cost - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class SpotifyRequestBudget:
+    """
+    Общий для всех экземпляров планировщика лимит запросов к Spotify.
+
+    Ведро токенов живёт в Redis, время берётся из Redis (TIME), поэтому лимит
+    соблюдается суммарно, сколько бы процессов ни обращалось к Spotify.
+    """
+
+    KEY = 'spotify:request_budget'
+
+    def __init__(self, redis_service: RedisService):
+        self.redis_service = redis_service
+        self._rate = settings.playback.SPOTIFY_REQUESTS_PER_SECOND
+        self._burst = settings.playback.SPOTIFY_REQUESTS_BURST
+
+    async def acquire(self, cost: int = 1) -> None:
+        """
+        Ждёт, пока в бюджете не найдётся cost запросов, и списывает их.
+        """
+        while True:
+            wait_ms = await self.redis_service.eval(_TAKE_SCRIPT, [self.KEY], [self._rate, self._burst, cost])
+            if wait_ms is None:
+                # Redis недоступен: не блокируем воспроизведение, лимит Spotify отработает сам
+                logger.warning('SpotifyRequestBudget: бюджет недоступен, запрос выполняется без лимита')
+                return
+            if not wait_ms:
+                return
+            await asyncio.sleep(int(wait_ms) / 1000)
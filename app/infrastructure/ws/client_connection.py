@@ -0,0 +1,206 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from enum import Enum
+from typing import Awaitable, Callable
+
+from fastapi import WebSocket
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.infrastructure.ws.codec import MessageFormat, OutboundMessage
+
+
+class BackpressurePolicy(Enum):
+    DROP_OLDEST = 'drop_oldest'
+    COALESCE = 'coalesce'
+    DISCONNECT = 'disconnect'
+
+
+class _TimeSyncReply:
+    """
+    Ответ на обмен синхронизации часов в духе NTP.
+
+    Клиент шлёт {"action": "time_sync", "client_sent_ms": t0} и, получив ответ в момент t3,
+    считает RTT = (t3 - t0) - (server_sent_ms - server_received_ms) и смещение своих часов
+    ((server_received_ms - t0) + (server_sent_ms - t3)) / 2. Из нескольких обменов берётся
+    тот, у которого RTT меньше.
+
+    server_sent_ms проставляется при кодировании, то есть прямо перед отправкой в сокет:
+    ожидание в очереди соединения не попадает в RTT.
+    """
+
+    __slots__ = ('client_sent_ms', 'server_received_ms')
+
+    message_type = 'time_sync'
+
+    def __init__(self, client_sent_ms: int | None, server_received_ms: int):
+        self.client_sent_ms = client_sent_ms
+        self.server_received_ms = server_received_ms
+
+    def encode(self, message_format: MessageFormat) -> str | bytes:
+        return OutboundMessage(json.dumps({
+            'action': 'time_sync',
+            'client_sent_ms': self.client_sent_ms,
+            'server_received_ms': self.server_received_ms,
+            'server_sent_ms': time.time_ns() // 1_000_000,
+        })).encode(message_format)
+
+
+class ClientConnection:
+    """
+    Одно WebSocket-соединение с собственной ограниченной очередью исходящих сообщений.
+
+    Отправители только кладут сообщение в очередь и сразу возвращаются, а отдельная
+    задача-писатель отправляет сообщения в сокет по одному. При переполнении очереди
+    применяется политика BackpressurePolicy:
+    - DROP_OLDEST: выбрасывается самое старое сообщение;
+    - COALESCE: ожидающее сообщение того же типа (например, состояние плеера)
+      заменяется новым, иначе выбрасывается самое старое;
+    - DISCONNECT: клиент отключается.
+
+    Формат кадров (JSON-текст или msgpack) согласуется при подключении;
+    сообщение кодируется в нужный формат только в момент отправки.
+
+    Ответ time_sync идёт вне очереди, но ожидает отправки не больше одного:
+    новый запрос заменяет неотправленный ответ.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: uuid.UUID,
+        send_semaphore: asyncio.Semaphore,
+        on_evict: Callable[['ClientConnection'], Awaitable[None]],
+        policy: BackpressurePolicy | None = None,
+        max_queue_size: int | None = None,
+        message_format: MessageFormat = MessageFormat.JSON,
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.rooms: set[uuid.UUID] = set()
+        self.closed = False
+        self.message_format = message_format
+        self._policy = policy or BackpressurePolicy(settings.ws.BACKPRESSURE_POLICY)
+        self._max_queue_size = max_queue_size or settings.ws.OUTBOUND_QUEUE_SIZE
+        self._queue: deque[OutboundMessage] = deque()
+        self._has_messages = asyncio.Event()
+        self._send_semaphore = send_semaphore
+        self._on_evict = on_evict
+        self._evict_requested = False
+        self._missed_deadlines = 0
+        self._writer: asyncio.Task | None = None
+        self._time_sync: _TimeSyncReply | None = None
+
+    def start(self) -> None:
+        """
+        Запускает задачу-писатель соединения.
+        """
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def close(self) -> None:
+        """
+        Останавливает писателя. Неотправленные сообщения отбрасываются.
+        """
+        self.closed = True
+        self._queue.clear()
+        self._has_messages.set()
+
+    def put(self, message: OutboundMessage) -> bool:
+        """
+        Кладёт сообщение в очередь без ожидания. Возвращает False, если сообщение не принято.
+        Один объект OutboundMessage может стоять в очередях многих соединений.
+        """
+        if self.closed:
+            return False
+
+        message_type = message.message_type
+        if self._policy == BackpressurePolicy.COALESCE and message_type in settings.ws.COALESCE_MESSAGE_TYPES:
+            for index, queued in enumerate(self._queue):
+                if queued.message_type == message_type:
+                    self._queue[index] = message
+                    return True
+
+        if len(self._queue) >= self._max_queue_size:
+            if self._policy == BackpressurePolicy.DISCONNECT:
+                logger.warning('ClientConnection: очередь пользователя %s переполнена, отключаем', self.user_id)
+                self._request_evict()
+                return False
+            self._queue.popleft()
+            logger.debug('ClientConnection: очередь пользователя %s переполнена, старое сообщение отброшено', self.user_id)
+
+        self._queue.append(message)
+        self._has_messages.set()
+        return True
+
+    def put_front(self, messages: list[str]) -> None:
+        """
+        Ставит сообщения в начало очереди в заданном порядке (например, пропущенные события
+        при переподключении), чтобы они ушли раньше уже накопившихся живых сообщений.
+        """
+        if self.closed or not messages:
+            return
+        self._queue.extendleft(OutboundMessage(message) for message in reversed(messages))
+        self._has_messages.set()
+
+    def put_time_sync(self, client_sent_ms: int | None, server_received_ms: int) -> None:
+        """
+        Ставит ответ синхронизации часов перед очередью. Неотправленный ответ
+        заменяется новым, поэтому частые time_sync не раздувают очередь.
+        """
+        if self.closed:
+            return
+        self._time_sync = _TimeSyncReply(client_sent_ms, server_received_ms)
+        self._has_messages.set()
+
+    def _request_evict(self) -> None:
+        self._evict_requested = True
+        self.close()
+
+    async def _send(self, message: OutboundMessage | _TimeSyncReply) -> None:
+        async with self._send_semaphore:
+            try:
+                payload = message.encode(self.message_format)
+            except Exception as e:
+                # ошибка в самом сообщении, а не в соединении: выбрасываем только его
+                logger.error(
+                    'ClientConnection: не удалось закодировать сообщение %s для пользователя %s, отброшено: %r',
+                    message.message_type, self.user_id, e, exc_info=True,
+                )
+                return
+            send = self.websocket.send_bytes if isinstance(payload, bytes) else self.websocket.send_text
+            try:
+                await asyncio.wait_for(send(payload), settings.ws.SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self._missed_deadlines += 1
+                logger.warning(
+                    'ClientConnection: пользователь %s не успел принять сообщение (%s раз подряд)',
+                    self.user_id, self._missed_deadlines,
+                )
+                if self._missed_deadlines >= settings.ws.MAX_MISSED_DEADLINES:
+                    self._request_evict()
+                return
+            except Exception as e:
+                logger.warning('ClientConnection: ошибка отправки пользователю %s: %r', self.user_id, e)
+                self._request_evict()
+                return
+        self._missed_deadlines = 0
+
+    async def _write_loop(self) -> None:
+        try:
+            while not self.closed:
+                if self._time_sync is not None:
+                    reply, self._time_sync = self._time_sync, None
+                    await self._send(reply)
+                    continue
+                if not self._queue:
+                    self._has_messages.clear()
+                    await self._has_messages.wait()
+                    continue
+                message = self._queue.popleft()
+                await self._send(message)
+        finally:
+            if self._evict_requested:
+                await self._on_evict(self)
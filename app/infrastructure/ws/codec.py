@@ -0,0 +1,65 @@
+import json
+from enum import Enum
+from typing import Any
+
+import msgpack
+
+
+class MessageFormat(Enum):
+    """
+    Формат кадров WebSocket, согласуемый через заголовок Sec-WebSocket-Protocol.
+    """
+    JSON = 'json'
+    MSGPACK = 'msgpack'
+
+
+def negotiate_format(subprotocols: list[str]) -> tuple[MessageFormat, str | None]:
+    """
+    Выбирает формат по списку подпротоколов, предложенных клиентом.
+    Возвращает формат и подпротокол для ответа (None, если клиент ничего не предлагал).
+    JSON остаётся форматом по умолчанию.
+    """
+    if MessageFormat.MSGPACK.value in subprotocols:
+        return MessageFormat.MSGPACK, MessageFormat.MSGPACK.value
+    if MessageFormat.JSON.value in subprotocols:
+        return MessageFormat.JSON, MessageFormat.JSON.value
+    return MessageFormat.JSON, None
+
+
+class OutboundMessage:
+    """
+    Сообщение для рассылки, общее для всех получателей на воркере.
+
+    Исходный JSON приходит уже сериализованным; бинарное представление строится
+    при первом запросе и переиспользуется, так что каждый формат кодируется
+    не больше одного раза на рассылку.
+    """
+
+    __slots__ = ('text', 'message_type', '_binary')
+
+    def __init__(self, text: str, message_type: str | None = None):
+        self.text = text
+        self.message_type = message_type
+        self._binary: bytes | None = None
+
+    def encode(self, message_format: MessageFormat) -> str | bytes:
+        if message_format == MessageFormat.JSON:
+            return self.text
+        if self._binary is None:
+            self._binary = msgpack.packb(json.loads(self.text), use_bin_type=True)
+        return self._binary
+
+
+def decode_frame(text: str | None, data: bytes | None) -> Any | None:
+    """
+    Разбирает входящий кадр клиента: текст как JSON, бинарный кадр как msgpack.
+    Возвращает None, если кадр не удалось разобрать.
+    """
+    try:
+        if data is not None:
+            return msgpack.unpackb(data, raw=False)
+        if text is not None:
+            return json.loads(text)
+    except ValueError:
+        return None
+    return None
@@ -1,78 +1,269 @@
-from fastapi import WebSocket
+import asyncio
 import uuid
-from app.application.services.redis_service import RedisService
+
+from fastapi import WebSocket
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.infrastructure.ws.client_connection import ClientConnection
+from app.infrastructure.ws.codec import OutboundMessage, negotiate_format
 
 
 class ConnectionManager:
-    def __init__(self,redis_serive: RedisService):
-        self.redis_service = redis_serive
+    """
+    Реестр живых WebSocket-соединений текущего процесса.
+
+    Сами сокеты хранятся только в памяти воркера. Доставка между воркерами идёт
+    через Redis pub/sub: broadcast и send_personal_message публикуют сообщение
+    один раз в канал комнаты/пользователя, а каждый воркер, подписанный на этот канал,
+    доставляет его своим локальным клиентам.
+
+    Локальная доставка не ждёт сокеты: сообщение кладётся в ограниченную очередь
+    каждого соединения (см. ClientConnection), а отправку выполняет его задача-писатель.
+    Медленные клиенты, не успевающие принимать сообщения, отключаются.
+
+    Клиент может запросить бинарный формат msgpack через Sec-WebSocket-Protocol,
+    по умолчанию используется JSON. При рассылке все локальные получатели делят
+    один OutboundMessage, поэтому каждый формат кодируется не больше одного раза.
+
+    У одного пользователя может быть несколько соединений (вкладки, телефон и десктоп):
+    персональные сообщения получает каждое из них.
+    """
 
     GLOBAL_ROOM_ID = uuid.UUID('00000000-0000-0000-0000-000000000000')
-    # global room id -> user_id | user_id -> websocket
+    ROOM_CHANNEL_PREFIX = 'ws:room:'
+    USER_CHANNEL_PREFIX = 'ws:user:'
 
+    def __init__(self):
+        # room_id -> соединения этого процесса | user_id -> соединения этого процесса
+        self.active_connections: dict[uuid.UUID, set[ClientConnection]] = {}
+        self.user_connections: dict[uuid.UUID, set[ClientConnection]] = {}
+        self._connections: dict[WebSocket, ClientConnection] = {}
+        self._redis: Redis | None = None
+        self._pubsub: PubSub | None = None
+        self._listener: asyncio.Task | None = None
+        self._send_semaphore = asyncio.Semaphore(settings.ws.MAX_CONCURRENT_SENDS)
 
-    async def connect(self,room_id: uuid.UUID,user_id: uuid.UUID,websocket: WebSocket):
+    async def start(self, redis_client: Redis, subscribe: bool = True) -> None:
         """
-        Устанавливает новое WebSocket-соединение и привязывает его к комнате и пользователю.
+        Подключает менеджер к Redis и запускает фоновое чтение pub/sub.
+        Без вызова start менеджер работает только в пределах одного процесса.
+        С subscribe=False менеджер только публикует события: так работают API-воркеры,
+        у которых нет собственных сокетов (их обслуживает WebSocket-шлюз).
         """
-        await websocket.accept()
-
-        key = f'user_connection:{user_id}'
-        await self.redis_service.set(key,websocket)
-        if room_id not in self.active_connections:
-            await self.redis_service.rpush(f'{room_id}', websocket)
+        self._redis = redis_client
+        if not subscribe:
+            logger.info('ConnectionManager: публикация событий через Redis pub/sub включена')
             return
-        
+        self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self._room_channel(self.GLOBAL_ROOM_ID))
+        self._listener = asyncio.create_task(self._listen())
+        logger.info('ConnectionManager: подписка на Redis pub/sub запущена')
 
-    async def disconnect(self,room_id: uuid.UUID,user_id: uuid.UUID,websocket: WebSocket):
+    async def stop(self) -> None:
         """
-        Разрывает WebSocket-соединение
+        Останавливает чтение pub/sub и закрывает соединение подписки.
         """
-        key_user_connection = f'user_connection:{user_id}'
-        key_room_connection = str(room_id)
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._redis = None
 
-        exist_user_connection =await  self.redis_service.get(key_user_connection)
-        if exist_user_connection:
-            await self.redis_service.default_delete(key_user_connection)
+    def _room_channel(self, room_id: uuid.UUID) -> str:
+        return f'{self.ROOM_CHANNEL_PREFIX}{room_id}'
 
-        room_connections = await self.redis_service.lrange(str(key_room_connection))
-        if room_connections:
-            if websocket in room_connections:
-                await self.redis_service.lrem(key_room_connection,websocket)
+    def _user_channel(self, user_id: uuid.UUID) -> str:
+        return f'{self.USER_CHANNEL_PREFIX}{user_id}'
 
-        room_connections = self.redis_service.lrange(str(key_room_connection))
-        if not room_connections:
-            await self.redis_service.default_delete(key_room_connection)
-    
-    async def broadcast(self, room_id: uuid.UUID, message: str):
+    def pubsub_room_channel(self, room_id: uuid.UUID) -> str | None:
         """
-        Отправляет сообщение всем клиентам в определённой комнате.
-        Сообщение должно быть в формате JSON-строки.
+        Канал комнаты в Redis pub/sub или None, если менеджер не подключён к Redis
+        и доставляет сообщения сам.
+        """
+        return self._room_channel(room_id) if self._redis else None
+
+    @staticmethod
+    def pack_header(message_type: str | None) -> str:
+        # тип сообщения идёт первой строкой: JSON из json.dumps не содержит переводов строк
+        return f'{message_type or ""}\n'
+
+    @classmethod
+    def _pack(cls, message: str, message_type: str | None) -> str:
+        return cls.pack_header(message_type) + message
+
+    @staticmethod
+    def _unpack(data: str) -> tuple[str, str | None]:
+        message_type, _, message = data.partition('\n')
+        return message, message_type or None
+
+    async def _subscribe(self, channel: str) -> None:
+        if self._pubsub:
+            await self._pubsub.subscribe(channel)
+
+    async def _unsubscribe(self, channel: str) -> None:
+        if self._pubsub:
+            await self._pubsub.unsubscribe(channel)
+
+    async def _join_room(self, room_id: uuid.UUID, connection: ClientConnection) -> None:
+        connections = self.active_connections.setdefault(room_id, set())
+        if not connections and room_id != self.GLOBAL_ROOM_ID:
+            await self._subscribe(self._room_channel(room_id))
+        connections.add(connection)
+        connection.rooms.add(room_id)
+
+    async def _leave_room(self, room_id: uuid.UUID, connection: ClientConnection) -> None:
+        connections = self.active_connections.get(room_id)
+        if not connections:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self.active_connections[room_id]
+            if room_id != self.GLOBAL_ROOM_ID:
+                await self._unsubscribe(self._room_channel(room_id))
+
+    async def connect(
+        self,
+        room_id: uuid.UUID,
+        user_id: uuid.UUID,
+        websocket: WebSocket,
+        start_writer: bool = True,
+    ) -> ClientConnection:
+        """
+        Устанавливает новое WebSocket-соединение и привязывает его к комнате и пользователю.
+        Каждое соединение также попадает в глобальную комнату.
+        С start_writer=False сообщения копятся в очереди, пока вызывающий не запустит
+        писателя сам (например, после досылки пропущенных событий).
         """
-        key_room_connection = str(room_id)
+        message_format, subprotocol = negotiate_format(websocket.scope.get('subprotocols', []))
+        await websocket.accept(subprotocol=subprotocol)
+
+        connection = ClientConnection(
+            websocket, user_id, self._send_semaphore, self._evict, message_format=message_format,
+        )
+        self._connections[websocket] = connection
+        for room in {self.GLOBAL_ROOM_ID, room_id}:
+            await self._join_room(room, connection)
+
+        user_connections = self.user_connections.setdefault(user_id, set())
+        if not user_connections:
+            await self._subscribe(self._user_channel(user_id))
+        user_connections.add(connection)
 
-        room_connections = await self.redis_service.lrange(str(key_room_connection))
+        if start_writer:
+            connection.start()
+        return connection
 
-        if not room_connections:
+    async def disconnect(self, room_id: uuid.UUID, user_id: uuid.UUID, websocket: WebSocket):
+        """
+        Разрывает одно WebSocket-соединение. Остальные соединения пользователя продолжают работать.
+        """
+        connection = self._connections.pop(websocket, None)
+        if not connection:
             return
+        connection.close()
+        for room in connection.rooms | {room_id}:
+            await self._leave_room(room, connection)
+
+        user_connections = self.user_connections.get(user_id)
+        if user_connections is not None:
+            user_connections.discard(connection)
+            if not user_connections:
+                del self.user_connections[user_id]
+                await self._unsubscribe(self._user_channel(user_id))
 
-        connection: WebSocket
+    def has_connection(self, user_id: uuid.UUID, room_id: uuid.UUID | None = None) -> bool:
+        """
+        Проверяет, остались ли у пользователя соединения на этом воркере (в комнате, если она указана).
+        """
+        connections = self.user_connections.get(user_id, ())
+        if room_id is None:
+            return bool(connections)
+        return any(room_id in connection.rooms for connection in connections)
+
+    async def _evict(self, connection: ClientConnection) -> None:
+        """
+        Отключает медленный или сломанный сокет и убирает его из реестра.
+        """
+        await self.disconnect(self.GLOBAL_ROOM_ID, connection.user_id, connection.websocket)
+        try:
+            await connection.websocket.close()
+        except Exception:
+            pass
 
-        if room_id in room_connections:
-            for connection in room_connections:
-                await connection.send_text(message)
+    async def broadcast(self, room_id: uuid.UUID, message: str, message_type: str | None = None):
+        """
+        Отправляет сообщение всем клиентам в определённой комнате на всех воркерах.
+        Сообщение должно быть в формате JSON-строки, сериализованной один раз.
+        message_type используется для схлопывания устаревших сообщений в очередях клиентов.
+        """
+        if self._redis:
+            await self._redis.publish(self._room_channel(room_id), self._pack(message, message_type))
+            return
+        self._deliver_to_room(uuid.UUID(str(room_id)), message, message_type)
 
-    async def send_personal_message(self,message: str,user_id: uuid.UUID):
+    async def send_personal_message(self, message: str, user_id: uuid.UUID, message_type: str | None = None):
         """
-        Отправляет персональное сообщение конкретному пользователю по его ID.
+        Отправляет персональное сообщение во все соединения пользователя на всех воркерах.
         Сообщение должно быть в формате JSON-строки.
         """
-        key_user_connection = f'user_connection:{user_id}'
+        if self._redis:
+            await self._redis.publish(self._user_channel(user_id), self._pack(message, message_type))
+            return
+        self._deliver_to_user(uuid.UUID(str(user_id)), message, message_type)
+
+    def _deliver_to_room(self, room_id: uuid.UUID, message: str, message_type: str | None) -> None:
+        connections = list(self.active_connections.get(room_id, ()))
+        if not connections:
+            return
+        outbound = OutboundMessage(message, message_type)
+        for connection in connections:
+            connection.put(outbound)
 
-        exist_user_connection = await self.redis_service.get(key_user_connection)
+    def _deliver_to_user(self, user_id: uuid.UUID, message: str, message_type: str | None) -> None:
+        connections = list(self.user_connections.get(user_id, ()))
+        if not connections:
+            return
+        outbound = OutboundMessage(message, message_type)
+        for connection in connections:
+            connection.put(outbound)
+
+    def _dispatch(self, channel: str | bytes, data: str | bytes) -> None:
+        if isinstance(channel, bytes):
+            channel = channel.decode('utf-8')
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        message, message_type = self._unpack(data)
+        if channel.startswith(self.ROOM_CHANNEL_PREFIX):
+            room_id = uuid.UUID(channel.removeprefix(self.ROOM_CHANNEL_PREFIX))
+            self._deliver_to_room(room_id, message, message_type)
+        elif channel.startswith(self.USER_CHANNEL_PREFIX):
+            user_id = uuid.UUID(channel.removeprefix(self.USER_CHANNEL_PREFIX))
+            self._deliver_to_user(user_id, message, message_type)
+
+    async def _listen(self) -> None:
+        """
+        Читает сообщения из подписанных каналов и раскладывает их по очередям локальных клиентов.
+        """
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                self._dispatch(message['channel'], message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error('ConnectionManager: ошибка при чтении pub/sub %r', e, exc_info=True)
+                await asyncio.sleep(1)
 
-        if exist_user_connection:
-            websocket = exist_user_connection
-            await websocket.send_text(message)
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
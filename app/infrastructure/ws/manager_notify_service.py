@@ -1,28 +1,46 @@
 from app.infrastructure.ws.connection_manager import manager
 import json
+import uuid
 
 
 class NotifyService:
 
+    @staticmethod
+    def _encode(data_message: dict) -> str:
+        """
+        Сериализует сообщение один раз; дальше одна и та же строка уходит всем получателям.
+        """
+        return json.dumps(data_message, default=str, ensure_ascii=False)
+
+    def room_pubsub(self, room_id: uuid.UUID, message_type: str | None) -> tuple[str, str] | None:
+        """
+        Канал комнаты и заголовок сообщения, чтобы опубликовать событие прямо из скрипта Redis.
+        None, если менеджер работает без Redis: тогда событие рассылается через send_message_for_room.
+        """
+        channel = manager.pubsub_room_channel(room_id)
+        if channel is None:
+            return None
+        return channel, manager.pack_header(message_type)
+
     async def send_mesasge_for_user(
         self,
         data_message: dict[str,str]
     ) -> None:
         user_id = data_message['user_id']
         await manager.send_personal_message(
-            json.dumps(data_message), user_id
+            self._encode(data_message), user_id, data_message.get('action')
         )
 
     async def send_message_for_requester(self,data_message: dict[str,str]):
         requester_id = data_message['requester_id']
         await manager.send_personal_message(
-            json.dumps(data_message), requester_id
+            self._encode(data_message), requester_id, data_message.get('action')
         )
         
     async def send_message_for_accepter(self,data_message: dict[str,str]):
         accepter_id = data_message['accepter_id']
         await manager.send_personal_message(
-            json.dumps(data_message), accepter_id
+            self._encode(data_message), accepter_id, data_message.get('action')
         )
     
     
@@ -31,4 +49,5 @@ class NotifyService:
         self,
         data_message: dict[str,str]
     ) -> None:
-        await manager.broadcast(data_message['room_id'] if data_message['room_id'] else manager.GLOBAL_ROOM_ID, json.dumps(data_message))
\ No newline at end of file
+        room_id = data_message.get('room_id') or manager.GLOBAL_ROOM_ID
+        await manager.broadcast(room_id, self._encode(data_message), data_message.get('action'))
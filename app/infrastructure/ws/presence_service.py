@@ -0,0 +1,120 @@
+import asyncio
+import time
+import uuid
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.infrastructure.redis.redis_service import RedisService
+
+
+class PresenceService:
+    """
+    Учёт того, кто сейчас онлайн и в какой комнате.
+
+    Присутствие хранится в Redis в сортированных множествах, где вес элемента —
+    время последнего heartbeat:
+    - presence:online — все пользователи с живым соединением;
+    - presence:room:{room_id} — участники, подключённые к комнате.
+
+    Клиент шлёт heartbeat по сокету раз в PRESENCE_HEARTBEAT_INTERVAL_SECONDS.
+    Записи старше PRESENCE_TTL_SECONDS считаются устаревшими: запросы их не видят,
+    а периодическая очистка удаляет. Запросы не обращаются к Postgres.
+    """
+
+    ONLINE_KEY = 'presence:online'
+    ROOMS_KEY = 'presence:rooms'
+
+    def __init__(self, redis_service: RedisService):
+        self.redis_service = redis_service
+        self._sweeper: asyncio.Task | None = None
+
+    @staticmethod
+    def _room_key(room_id: uuid.UUID) -> str:
+        return f'presence:room:{room_id}'
+
+    @staticmethod
+    def _alive_since() -> float:
+        return time.time() - settings.ws.PRESENCE_TTL_SECONDS
+
+    async def heartbeat(self, user_id: uuid.UUID, room_id: uuid.UUID | None = None) -> None:
+        """
+        Отмечает пользователя онлайн (и в комнате, если она указана) на текущий момент.
+        """
+        now = time.time()
+        await self.redis_service.zadd(self.ONLINE_KEY, {str(user_id): now})
+        if room_id is not None:
+            await self.redis_service.zadd(self._room_key(room_id), {str(user_id): now})
+            await self.redis_service.sadd(self.ROOMS_KEY, str(room_id))
+
+    async def leave_room(self, user_id: uuid.UUID, room_id: uuid.UUID) -> None:
+        """
+        Убирает пользователя из присутствующих в комнате.
+        Глобальный статус не сбрасывается: у пользователя могут быть другие соединения,
+        без heartbeat запись истечёт сама.
+        """
+        await self.redis_service.zrem(self._room_key(room_id), str(user_id))
+
+    async def who_is_online(self, room_id: uuid.UUID) -> list[uuid.UUID]:
+        """
+        Возвращает пользователей, подключённых к комнате.
+        """
+        members = await self.redis_service.zrangebyscore(self._room_key(room_id), self._alive_since(), '+inf')
+        return [uuid.UUID(member) for member in members]
+
+    async def is_online(self, user_id: uuid.UUID) -> bool:
+        """
+        Проверяет, есть ли у пользователя живое соединение.
+        """
+        return bool(await self.online_among([user_id]))
+
+    async def online_among(self, user_ids: list[uuid.UUID]) -> set[uuid.UUID]:
+        """
+        Возвращает тех из переданных пользователей, кто сейчас онлайн.
+        Проверка выполняется одним запросом, удобно для списков друзей.
+        """
+        scores = await self.redis_service.zmscore(self.ONLINE_KEY, [str(user_id) for user_id in user_ids])
+        alive_since = self._alive_since()
+        return {
+            user_id
+            for user_id, score in zip(user_ids, scores)
+            if score is not None and score >= alive_since
+        }
+
+    async def sweep(self) -> int:
+        """
+        Удаляет устаревшие записи присутствия. Возвращает количество удалённых записей.
+        Безопасно вызывать одновременно с нескольких воркеров.
+        """
+        alive_since = self._alive_since()
+        removed = await self.redis_service.zremrangebyscore(self.ONLINE_KEY, '-inf', f'({alive_since}')
+        for room_id in await self.redis_service.smembers(self.ROOMS_KEY):
+            room_key = f'presence:room:{room_id}'
+            removed += await self.redis_service.zremrangebyscore(room_key, '-inf', f'({alive_since}')
+            if not await self.redis_service.zcard(room_key):
+                await self.redis_service.srem(self.ROOMS_KEY, room_id)
+        return removed
+
+    def start(self) -> None:
+        """
+        Запускает периодическую очистку устаревших записей.
+        """
+        self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        if self._sweeper:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.ws.PRESENCE_SWEEP_INTERVAL_SECONDS)
+            try:
+                removed = await self.sweep()
+                if removed:
+                    logger.debug('PresenceService: удалено %s устаревших записей присутствия', removed)
+            except Exception as e:
+                logger.error('PresenceService: ошибка при очистке присутствия %r', e, exc_info=True)
@@ -0,0 +1,115 @@
+import json
+import uuid
+from typing import Any
+
+from app.config.log_config import logger
+from app.config.settings import settings
+from app.infrastructure.redis.redis_service import RedisService
+from app.infrastructure.ws.manager_notify_service import NotifyService
+
+
+# Версия, запись в журнал и рассылка в pub/sub выполняются одним скриптом, чтобы
+# идентификаторы потока шли строго по возрастанию, а участники получали события в порядке
+# версий даже при публикации с нескольких воркеров. Версия дописывается последним полем
+# в JSON события (ARGV[1] — непустой объект из json.dumps). Без канала (ARGV[4] пуст)
+# событие рассылает вызывающий код.
+# Истекает только журнал: счётчик версий живёт без TTL, иначе после простоя
+# версии комнаты начались бы заново с 1.
+_PUBLISH_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], version .. '-0', 'event', ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+if ARGV[4] ~= '' then
+    local message = string.sub(ARGV[1], 1, -2) .. ', "version": ' .. version .. '}'
+    redis.call('PUBLISH', ARGV[4], ARGV[5] .. message)
+end
+return version
+"""
+
+
+class RoomEventService:
+    """
+    Публикует события комнаты с монотонно растущей версией.
+
+    Версия хранится в Redis без срока жизни и общая для всех воркеров. Клиент, заметивший разрыв
+    в версиях (пришла версия больше последней + 1), запрашивает снимок состояния.
+
+    Последние события каждой комнаты лежат в ограниченном Redis Stream, где
+    идентификатор записи совпадает с версией. Переподключившийся клиент передаёт
+    last_event_id и получает только пропущенные события; если журнал уже обрезан,
+    ему нужен снимок.
+    """
+
+    def __init__(self, redis_service: RedisService, notify_service: NotifyService):
+        self.redis_service = redis_service
+        self.notify_service = notify_service
+
+    @staticmethod
+    def _version_key(room_id: uuid.UUID) -> str:
+        return f'room_events:{room_id}:version'
+
+    @staticmethod
+    def _log_key(room_id: uuid.UUID) -> str:
+        return f'room_events:{room_id}:log'
+
+    async def current_version(self, room_id: uuid.UUID) -> int:
+        """
+        Возвращает версию последнего опубликованного события комнаты.
+        """
+        return await self.redis_service.get_int(self._version_key(room_id))
+
+    async def publish(self, room_id: uuid.UUID, event: dict[str, Any]) -> int | None:
+        """
+        Присваивает событию следующую версию комнаты, сохраняет его в журнал и рассылает участникам.
+        В pub/sub событие уходит из того же скрипта, что выдаёт версию, поэтому версия v + 1
+        не может обогнать v.
+        """
+        body = {**event, 'room_id': str(room_id)}
+        pubsub = self.notify_service.room_pubsub(room_id, body.get('action'))
+        channel, header = pubsub or ('', '')
+        version = await self.redis_service.eval(
+            _PUBLISH_SCRIPT,
+            [self._version_key(room_id), self._log_key(room_id)],
+            [
+                json.dumps(body, default=str, ensure_ascii=False),
+                settings.ws.ROOM_EVENTS_REPLAY_SIZE,
+                settings.ws.ROOM_EVENTS_TTL_SECONDS,
+                channel,
+                header,
+            ],
+        )
+        if version is None:
+            logger.error('RoomEventService: не удалось получить версию события для комнаты %s', room_id)
+            return None
+        if pubsub is None:
+            await self.notify_service.send_message_for_room({**body, 'version': int(version)})
+        return int(version)
+
+    async def replay(self, room_id: uuid.UUID, last_event_id: int) -> list[dict[str, Any]] | None:
+        """
+        Возвращает события комнаты с версией больше last_event_id.
+        Возвращает None, если часть пропущенных событий уже вытеснена из журнала
+        и клиенту нужно запросить снимок.
+        """
+        current = await self.current_version(room_id)
+        if last_event_id == current:
+            return []
+        if last_event_id > current:
+            return None
+
+        entries = await self.redis_service.xrange(self._log_key(room_id), min=f'({last_event_id}-0')
+        if not entries:
+            return None
+
+        events = []
+        for entry_id, fields in entries:
+            version = int(entry_id.split('-')[0])
+            events.append({**json.loads(fields['event']), 'version': version})
+
+        if events[0]['version'] != last_event_id + 1:
+            logger.info(
+                'RoomEventService: журнал комнаты %s обрезан, клиенту с версией %s нужен снимок',
+                room_id, last_event_id,
+            )
+            return None
+        return events
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -10,12 +12,22 @@ from app.presentation.api.v1.all_route import V1_ROUTERS
 from app.config.log_config import configure_logging
 from app.config.settings import settings
 from app.presentation.api.v1.error_handler import register_errors_handlers
+from app.infrastructure.redis.redis import async_redis_client
+from app.infrastructure.ws.connection_manager import manager
 import uvicorn
 import multiprocessing
 
 configure_logging()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # сокеты обслуживает app.ws_gateway, API только публикует события в Redis
+    await manager.start(async_redis_client, subscribe=False)
+    yield
+    await manager.stop()
+
+
 def setup_router(app: FastAPI, routers: list):
     @app.get('/ping')
     async def ping():
@@ -49,7 +61,7 @@ def create_app() -> FastAPI:
             "name": "music",
             "description": "Операции с музыкальными треками"
         }],
-        # lifespan=lifespan
+        lifespan=lifespan
     )
 
     app.add_middleware(ProxyHeadersMiddleware)
@@ -79,4 +91,4 @@ app = create_app()
 
 
 if __name__ == "__main__":
-    uvicorn.run(app,reload=True,workers=multiprocessing.cpu_count(),host='0.0.0.0',port=8000,factory=True)
+    uvicorn.run("app.main:create_app",workers=multiprocessing.cpu_count(),host='0.0.0.0',port=8000,factory=True)
@@ -0,0 +1,40 @@
+import asyncio
+
+from redis.asyncio import Redis
+
+from app.application.services.scheduler_service import SchedulerService
+from app.config.di.container import get_container
+from app.config.log_config import configure_logging
+from app.infrastructure.db.queue_write_behind import QueueWriteBehind
+from app.infrastructure.redis.playback_clock_service import PlaybackClockService
+from app.infrastructure.ws.connection_manager import manager
+
+configure_logging()
+
+
+async def main() -> None:
+    """
+    Отдельный процесс с таймерами окончания треков.
+
+    Таймеры не привязаны к API-воркерам. Экземпляров может быть несколько: комнаты
+    делятся между ними через аренды в Redis, так что таймер комнаты срабатывает
+    в одном экземпляре.
+    Уведомления участникам уходят через Redis pub/sub в WebSocket-шлюз.
+    Здесь же перестановки очереди из Redis переносятся в Postgres (QueueWriteBehind).
+    """
+    container = get_container()
+    redis_client = await container.get(Redis)
+    await manager.start(redis_client, subscribe=False)
+    await container.get(QueueWriteBehind)
+    scheduler = SchedulerService(container, await container.get(PlaybackClockService), redis_client)
+    await scheduler.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await scheduler.stop()
+        await manager.stop()
+        await container.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
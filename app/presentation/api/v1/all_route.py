@@ -15,4 +15,7 @@ from app.presentation.api.v1.room_member_api import room_member
 from app.presentation.api.v1.room_playback_api import room_playback
 from app.presentation.api.v1.room_queue_api import room_queue
 
-V1_ROUTERS = [auth,user,room,spotify,spotify_public,track,chat_ws,chat,ft,friendship,ban,notification,ws,room_member,room_playback,room_queue]
\ No newline at end of file
+V1_ROUTERS = [auth,user,room,spotify,spotify_public,track,chat,ft,friendship,ban,notification,room_member,room_playback,room_queue]
+
+# обслуживаются отдельным процессом app.ws_gateway
+WS_ROUTERS = [ws,chat_ws]
\ No newline at end of file
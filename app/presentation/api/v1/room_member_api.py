@@ -13,7 +13,8 @@ from app.presentation.schemas.room_schemas import (
 from app.presentation.schemas.user_schemas import UserResponse
 from app.application.services.room_member_service import RoomMemberService
 
-from app.application.services.redis_service import RedisService
+from app.infrastructure.redis.redis_service import RedisService
+from app.infrastructure.ws.presence_service import PresenceService
 from app.presentation.dependencies import get_current_user
 from dishka.integrations.fastapi import DishkaRoute,FromDishka,inject
 
@@ -22,6 +23,7 @@ room_member = APIRouter(tags=["Room"], prefix="/rooms",route_class=DishkaRoute)
 user_dependencies = Annotated[UserEntity,Depends(get_current_user)]
 room_member_service = FromDishka[RoomMemberService]
 redis_service = FromDishka[RedisService]
+presence_service = FromDishka[PresenceService]
 
 
 @room_member.post(
@@ -85,6 +87,24 @@ async def get_room_members(
     return await redis_client.get_or_set(key,fetch,300)
 
 
+@room_member.get(
+    "/{room_id}/members/online",
+    response_model=list[uuid.UUID],
+)
+@inject
+async def get_online_room_members(
+    room_id: Annotated[
+        uuid.UUID, Path(..., description="ID комнаты для получения участников онлайн")
+    ],
+    presence: presence_service,
+) -> list[uuid.UUID]:
+    """
+    Возвращает ID участников, которые сейчас подключены к комнате по WebSocket.
+    Данные берутся из Redis, без обращения к базе.
+    """
+    return await presence.who_is_online(room_id)
+
+
 @room_member.post(
     "/{room_id}/members/{user_id}/ban",
     response_model=BanResponse,
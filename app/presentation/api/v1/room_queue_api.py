@@ -1,15 +1,20 @@
 import uuid
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Path,status
+from fastapi import APIRouter, Depends, Path, Query,status
+
+from app.config.settings import settings
 
 from app.domain.entity import UserEntity
 from app.presentation.schemas.room_schemas import (
     AddTrackToQueueRequest,
+    ImportPlaylistRequest,
+    QueuePageResponse,
+    QueueSnapshotResponse,
+    QueueWindowResponse,
     TrackInQueueResponse,
 )
 from app.application.services.room_queue_service import RoomQueueService
-from app.application.services.redis_service import RedisService
 
 from dishka.integrations.fastapi import DishkaRoute,FromDishka,inject
 from app.presentation.dependencies import get_current_user
@@ -18,7 +23,6 @@ room_queue = APIRouter(tags=["Room"], prefix="/rooms",route_class=DishkaRoute)
 
 
 user_dependencies = Annotated[UserEntity,Depends(get_current_user)]
-redis_service = FromDishka[RedisService]
 room_queue_service = FromDishka[RoomQueueService]
 
 @room_queue.post(
@@ -42,6 +46,78 @@ async def add_track_to_queue(
     return association
 
 
+@room_queue.post(
+    "/{room_id}/queue/import",
+    response_model=list[TrackInQueueResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+@inject
+async def import_playlist_to_queue(
+    current_user: user_dependencies,
+    request: ImportPlaylistRequest,
+    room_id: Annotated[uuid.UUID, Path(..., description="Уникальный ID комнаты")],
+    room_queue_service: room_queue_service,
+) -> list[TrackInQueueResponse]:
+    """
+    Добавляет в конец очереди все треки плейлиста Spotify одной операцией.
+    Треки, которые уже есть в очереди, пропускаются.
+    """
+    return await room_queue_service.import_playlist(
+        room_id=room_id, playlist_id=request.playlist_id, current_user=current_user
+    )
+
+
+@room_queue.get(
+    "/{room_id}/queue/snapshot",
+    response_model=QueueSnapshotResponse,
+)
+@inject
+async def get_room_queue_snapshot(
+    room_id: Annotated[uuid.UUID, Path(..., description="Уникальный ID комнаты")],
+    room_queue_service: room_queue_service,
+) -> QueueSnapshotResponse:
+    """
+    Возвращает снимок очереди вместе с версией событий комнаты.
+    Клиент запрашивает его при старте и при обнаружении разрыва в версиях дельт очереди.
+    """
+    return await room_queue_service.get_queue_snapshot(room_id)
+
+
+@room_queue.get(
+    "/{room_id}/queue",
+    response_model=QueuePageResponse,
+)
+@inject
+async def get_room_queue_page(
+    room_id: Annotated[uuid.UUID, Path(..., description="Уникальный ID комнаты")],
+    room_queue_service: room_queue_service,
+    after: Annotated[float | None, Query(description="Ранг, после которого начинается страница (next_after предыдущей)")] = None,
+    after_id: Annotated[uuid.UUID | None, Query(description="ID записи, после которой начинается страница (next_after_id предыдущей)")] = None,
+    limit: Annotated[int, Query(ge=1, le=settings.queue.PAGE_MAX_SIZE, description="Размер страницы")] = settings.queue.PAGE_DEFAULT_SIZE,
+) -> QueuePageResponse:
+    """
+    Возвращает очередь комнаты постранично по рангу (keyset-пагинация).
+    Для следующей страницы передайте next_after и next_after_id из ответа в after и after_id.
+    """
+    return await room_queue_service.get_queue_page(room_id, after, limit, after_id)
+
+
+@room_queue.get(
+    "/{room_id}/queue/window",
+    response_model=QueueWindowResponse,
+)
+@inject
+async def get_room_queue_window(
+    room_id: Annotated[uuid.UUID, Path(..., description="Уникальный ID комнаты")],
+    room_queue_service: room_queue_service,
+    next_count: Annotated[int, Query(alias="next", ge=0, le=settings.queue.WINDOW_MAX_NEXT, description="Сколько следующих треков вернуть")] = settings.queue.WINDOW_DEFAULT_NEXT,
+) -> QueueWindowResponse:
+    """
+    Возвращает трек, который сейчас играет, и несколько следующих за ним.
+    """
+    return await room_queue_service.get_queue_window(room_id, next_count)
+
+
 @room_queue.get(
     "/{room_id}/queue/{association_id}",
     response_model=list[TrackInQueueResponse],
@@ -50,15 +126,11 @@ async def add_track_to_queue(
 async def get_room_queue(
     room_id: Annotated[uuid.UUID, Path(..., description="Уникальный ID комнаты")],
     room_queue_service: room_queue_service,
-    redis_client: redis_service,
 ) -> list[TrackInQueueResponse]:
     """
-    Получает текущую очередь треков для комнаты.
+    Получает текущую очередь треков для комнаты (из Redis, база — только при первом обращении).
     """
-    key = f'rooms_queue:get_room_queue:{room_id}'
-    async def fetch():
-        return room_queue_service.get_room_queue(room_id)
-    return await redis_client.get_or_set(key,fetch,300)
+    return await room_queue_service.get_room_queue(room_id)
 
 
 @room_queue.delete(
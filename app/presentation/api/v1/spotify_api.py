@@ -28,6 +28,6 @@ async def search_spotify_tracks(
     Ищет треки на Spotify по заданному запросу.
     Требует аутентификации пользователя в вашем приложении и наличия привязанного аккаунта Spotify.
     """
-    spotify_service.set_user = current_user
+    spotify_service.set_user(current_user)
 
     return await spotify_service.search_track(query,limit)
\ No newline at end of file
@@ -1,29 +1,65 @@
+import json
+import time
 import uuid
+from typing import Annotated
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Query, WebSocket
 
+from app.infrastructure.ws.codec import decode_frame
 from app.infrastructure.ws.connection_manager import manager
+from app.infrastructure.ws.presence_service import PresenceService
+from app.infrastructure.ws.room_event_service import RoomEventService
+
+from dishka.integrations.fastapi import DishkaRoute,FromDishka,inject
 
 ws = APIRouter(
     tags=['WebSockets'],
-    prefix='/ws'
+    prefix='/ws',
+    route_class=DishkaRoute
 )
 
+room_event_service = FromDishka[RoomEventService]
+presence_service = FromDishka[PresenceService]
+
 
 @ws.websocket("/room/{room_id}/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, room_id: uuid.UUID,user_id: uuid.UUID):
-    await manager.connect(manager.GLOBAL_ROOM_ID,websocket)
-    await manager.connect(room_id,user_id, websocket)
-    if room_id != manager.GLOBAL_ROOM_ID: 
-        await manager.connect(room_id, user_id, websocket)
+@inject
+async def websocket_endpoint(
+    websocket: WebSocket,
+    room_id: uuid.UUID,
+    user_id: uuid.UUID,
+    room_events: room_event_service,
+    presence: presence_service,
+    last_event_id: Annotated[int | None, Query(description='Версия последнего полученного события комнаты')] = None,
+):
+    connection = await manager.connect(room_id, user_id, websocket, start_writer=False)
+    if last_event_id is not None and room_id != manager.GLOBAL_ROOM_ID:
+        missed = await room_events.replay(room_id, last_event_id)
+        if missed is None:
+            missed = [{
+                'action': 'snapshot_required',
+                'room_id': str(room_id),
+                'version': await room_events.current_version(room_id),
+            }]
+        connection.put_front([json.dumps(event, default=str, ensure_ascii=False) for event in missed])
+    connection.start()
+
+    presence_room_id = room_id if room_id != manager.GLOBAL_ROOM_ID else None
+    await presence.heartbeat(user_id, presence_room_id)
     try:
         while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.disconnect(manager.GLOBAL_ROOM_ID, user_id, websocket)
-        if room_id != manager.GLOBAL_ROOM_ID:
-            manager.disconnect(room_id, user_id, websocket)
-    except Exception:
-        manager.disconnect(manager.GLOBAL_ROOM_ID, user_id, websocket)
-        if room_id != manager.GLOBAL_ROOM_ID:
-            manager.disconnect(room_id, user_id, websocket)
\ No newline at end of file
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            received_ms = time.time_ns() // 1_000_000
+            frame = decode_frame(message.get('text'), message.get('bytes'))
+            if not isinstance(frame, dict):
+                continue
+            if frame.get('action') == 'heartbeat':
+                await presence.heartbeat(user_id, presence_room_id)
+            elif frame.get('action') == 'time_sync':
+                connection.put_time_sync(frame.get('client_sent_ms'), received_ms)
+    finally:
+        await manager.disconnect(room_id, user_id, websocket)
+        if presence_room_id is not None and not manager.has_connection(user_id, presence_room_id):
+            await presence.leave_room(user_id, presence_room_id)
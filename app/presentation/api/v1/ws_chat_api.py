@@ -1,5 +1,6 @@
 import json
 import uuid
+from datetime import datetime, timezone
 from typing import Annotated
 
 from fastapi import (
@@ -8,18 +9,24 @@ from fastapi import (
     Path,
     WebSocket,
     WebSocketDisconnect,
+    status,
 )
+from pydantic import ValidationError
 
-from app.domain.entity import UserEntity
-from app.application.services.chat_service import ChatService
+from app.domain.entity import MessageEntity, UserEntity
+from app.domain.exceptions.room_exception import RoomNotFoundError, UserNotInRoomError
+from app.application.chat.create_message import ChatService
+from app.infrastructure.db.chat_write_buffer import ChatWriteBuffer
 from app.infrastructure.ws.connection_manager import manager
+from app.presentation.schemas.message_schemas import MessageCreate
 
+from dishka import AsyncContainer
 from dishka.integrations.fastapi import DishkaRoute,FromDishka,inject
 from app.presentation.dependencies import get_current_user
 
 chat_ws = APIRouter(tags=["Chat WS"], prefix="/ws/chat",route_class=DishkaRoute)
 user_dependencies = Annotated[UserEntity,Depends(get_current_user)]
-chat_service = FromDishka[ChatService]
+chat_write_buffer = FromDishka[ChatWriteBuffer]
 
 
 @chat_ws.websocket("/{room_id}")
@@ -28,31 +35,55 @@ async def send_message(
     websocket: WebSocket,
     room_id: Annotated[uuid.UUID, Path(..., description="Уникальный ID комнаты")],
     user: user_dependencies,
-    #chat_serv: chat_service,
+    container: FromDishka[AsyncContainer],
+    chat_buffer: chat_write_buffer,
 ):
     """
     Эндпоинт WebSocket для чата в комнате.
+    Сообщение сразу рассылается участникам, а в базу пишется пачками через ChatWriteBuffer.
     """
-    await manager.connect(room_id, websocket)
+    async with container() as request_container:
+        chat_service = await request_container.get(ChatService)
+        try:
+            chat_service.ensure_can_post(room_id, user.id)
+        except (RoomNotFoundError, UserNotInRoomError):
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+    await manager.connect(room_id, user.id, websocket)
 
     try:
         while True:
             data = await websocket.receive_text()
 
             try:
-                message_data = json.loads(data)
-                message_data["text"]
-            except (json.JSONDecodeError, KeyError):
+                message_data = MessageCreate(**json.loads(data))
+            except (json.JSONDecodeError, TypeError, ValidationError):
                 continue
 
-            #new_message = chat_serv.create_message(
-            #    room_id, user.id, MessageCreate(text=text)
-            #)
-
-            #new_message_json = new_message.model_dump_json()
-
-            #await manager.broadcast(room_id, new_message_json)
+            new_message = MessageEntity(
+                id=uuid.uuid4(),
+                text=message_data.text,
+                user_id=user.id,
+                room_id=room_id,
+                created_at=datetime.now(timezone.utc),
+            )
+            await manager.broadcast(
+                room_id,
+                json.dumps({
+                    'action': 'chat_message',
+                    'id': new_message.id,
+                    'room_id': room_id,
+                    'user_id': user.id,
+                    'username': user.username,
+                    'text': new_message.text,
+                    'created_at': new_message.created_at,
+                }, default=str, ensure_ascii=False),
+                'chat_message',
+            )
+            chat_buffer.put(new_message)
 
     except WebSocketDisconnect:
-        manager.disconnect(room_id, websocket)
-        await manager.broadcast(room_id, f"Пользователь {user.username} ушел")
+        pass
+    finally:
+        await manager.disconnect(room_id, user.id, websocket)
@@ -7,17 +7,37 @@ from app.presentation.schemas.track_schemas import TrackResponse
 
 class TrackInQueueResponse(BaseModel):
     track: TrackResponse = Field(..., description="Информация о треке")
-    order_in_queue: int = Field(..., description="Позиция трека в очереди")
+    order_in_queue: float = Field(..., description="Ранг трека в очереди: очередь упорядочена по возрастанию")
     association_id: uuid.UUID = Field(..., description="ID ассоциации трека с комнатой", alias="id")
     added_at: datetime = Field(...,description='Время создания трека в очереди')
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class QueueSnapshotResponse(BaseModel):
+    version: int = Field(..., description="Версия событий комнаты, прочитанная до снимка очереди; дельты с большей версией применяются идемпотентно по ID записи")
+    queue: list[TrackInQueueResponse] = Field([], description="Очередь треков в комнате")
+
+
+class QueuePageResponse(BaseModel):
+    items: list[TrackInQueueResponse] = Field([], description="Треки страницы по порядку очереди")
+    next_after: float | None = Field(None, description="Ранг последнего трека страницы для параметра after; None, если страница последняя")
+    next_after_id: uuid.UUID | None = Field(None, description="ID записи последнего трека страницы для параметра after_id; None, если страница последняя")
+
+
+class QueueWindowResponse(BaseModel):
+    now_playing: TrackInQueueResponse | None = Field(None, description="Трек очереди, который сейчас играет")
+    up_next: list[TrackInQueueResponse] = Field([], description="Следующие треки очереди")
+
+
 class AddTrackToQueueRequest(BaseModel):
     spotify_id: str = Field(..., description="Spotify ID трека для добавления в очередь")
 
 
+class ImportPlaylistRequest(BaseModel):
+    playlist_id: str = Field(..., description="Spotify ID плейлиста, треки которого добавляются в конец очереди")
+
+
 class RemoveTrackFromQueueRequest(BaseModel):
     association_id: uuid.UUID = Field(..., description="ID ассоциации трека с комнатой для удаления")
 
@@ -64,7 +84,7 @@ class RoomResponse(RoomBase):
     current_track_position_ms: int | None = Field(None, description="Позиция воспроизведения текущего трека в мс")
     is_playing: bool = Field(..., description="Воспроизводится ли музыка в данный момент")
     current_members_count: int = Field(..., description="Текущее количество участников в комнате")
-    queue: list[TrackInQueueResponse] = Field([], description="Очередь треков в комнате")
+    queue: list[TrackInQueueResponse] | None = Field(None, description="Очередь треков в комнате; по умолчанию не передаётся, см. /rooms/{room_id}/queue")
     owner: UserResponse | None = Field(None, description="Информация о владельце комнаты")
     members: list[UserResponse] = Field([], description="Список участников комнаты")
 
@@ -0,0 +1,54 @@
+from contextlib import asynccontextmanager
+
+from dishka.integrations.fastapi import setup_dishka
+from fastapi import FastAPI
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app.config.di.container import get_container
+from app.config.log_config import configure_logging
+from app.infrastructure.redis.redis import async_redis_client
+from app.infrastructure.redis.redis_service import RedisService
+from app.infrastructure.ws.connection_manager import manager
+from app.infrastructure.ws.presence_service import PresenceService
+from app.presentation.api.v1.all_route import WS_ROUTERS
+import uvicorn
+import multiprocessing
+
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await manager.start(async_redis_client)
+    presence = PresenceService(RedisService(async_redis_client))
+    presence.start()
+    yield
+    await presence.stop()
+    await manager.stop()
+    await app.state.dishka_container.close()
+
+
+def create_app() -> FastAPI:
+    """
+    Отдельный ASGI-процесс, который обслуживает только WebSocket-соединения.
+
+    События приходят от API-воркеров через Redis pub/sub, поэтому шлюз и REST API
+    масштабируются и перезапускаются независимо: деплой API не рвёт сокеты.
+    nginx направляет сюда всё, что начинается с /ws/.
+    """
+    app = FastAPI(title="TuneWave WebSocket gateway", lifespan=lifespan)
+    app.add_middleware(ProxyHeadersMiddleware)
+
+    @app.get('/ping')
+    async def ping():
+        return 'WebSocket gateway is running'
+
+    for route in WS_ROUTERS:
+        app.include_router(route)
+
+    setup_dishka(get_container(), app)
+    return app
+
+
+if __name__ == "__main__":
+    uvicorn.run("app.ws_gateway:create_app",workers=multiprocessing.cpu_count(),host='0.0.0.0',port=8001,factory=True)
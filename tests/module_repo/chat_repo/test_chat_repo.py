@@ -1,3 +1,9 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.domain.entity import MessageEntity
+from app.infrastructure.db.gateway.chat_gateway import SAChatGateway
+
 #from app.infrastructure.db.models import Message,Room,User
 #from app.presentation.schemas.user_schemas import UserCreate
 
@@ -40,4 +46,32 @@
 #
 #    message_list: list[Message] = chat_repo.get_message_for_room(room.id)
 #    assert message_list is not None
-#    assert len(message_list) > 0
\ No newline at end of file
+#    assert len(message_list) > 0
+
+def test_create_messages_saves_batch(chat_repo: SAChatGateway):
+    room_id = uuid.uuid4()
+    user_id = uuid.uuid4()
+    created_at = datetime(2025, 1, 1, 12, 0, 0)
+    messages = [
+        MessageEntity(
+            id=uuid.uuid4(),
+            text=f'message {i}',
+            user_id=user_id,
+            room_id=room_id,
+            created_at=created_at + timedelta(seconds=i),
+        )
+        for i in range(3)
+    ]
+
+    chat_repo.create_messages(messages)
+
+    saved = chat_repo.get_message_for_room(room_id)
+    assert [message.id for message in saved] == [message.id for message in reversed(messages)]
+    assert saved[0].text == 'message 2'
+    assert saved[0].created_at == messages[2].created_at
+
+
+def test_create_messages_empty_batch(chat_repo: SAChatGateway):
+    chat_repo.create_messages([])
+
+    assert chat_repo.get_message_for_room(uuid.uuid4()) == []
@@ -1,5 +1,8 @@
 import uuid
 
+from app.infrastructure.db.models.room import Room
+from app.infrastructure.db.models.track import Track
+
 def test_add_track_and_get_last_order(room_track_repo):
     room_id = uuid.uuid4()
     track_id1 = uuid.uuid4()
@@ -91,4 +94,179 @@ def test_remove_nonexistent_track(room_track_repo):
     track_id = uuid.uuid4()
 
     result = room_track_repo.remove_track_from_queue(room_id, track_id)
-    assert result is False
\ No newline at end of file
+    assert result is False
+
+def test_get_spotify_index(room_track_repo, db_session):
+    room_id = uuid.uuid4()
+    user_id = uuid.uuid4()
+    tracks = [
+        Track(
+            spotify_id=f'spotify{i}',
+            spotify_uri=f'spotify:track:spotify{i}',
+            title=f'track{i}',
+            artist_names=['artist'],
+            album_name='album',
+            duration_ms=1000,
+        )
+        for i in range(2)
+    ]
+    db_session.add_all(tracks)
+    db_session.flush()
+
+    first = room_track_repo.add_track_to_queue(room_id, tracks[0].id, 0, user_id)
+    second = room_track_repo.add_track_to_queue(room_id, tracks[1].id, 1, user_id)
+    room_track_repo.add_track_to_queue(uuid.uuid4(), tracks[1].id, 0, user_id)
+
+    index = room_track_repo.get_spotify_index(room_id)
+    assert index == {'spotify0': first.id, 'spotify1': second.id}
+
+def test_move_track_in_queue_changes_only_moved_rank(room_track_repo):
+    room_id = uuid.uuid4()
+    user_id = uuid.uuid4()
+    assocs = [
+        room_track_repo.add_track_to_queue(room_id, uuid.uuid4(), index, user_id)
+        for index in range(4)
+    ]
+
+    moved = room_track_repo.move_track_in_queue(assocs[3].id, 1)
+    assert moved.order_in_queue == 0.5
+
+    queue = room_track_repo.get_queue_for_room(room_id)
+    assert [a.id for a in queue] == [assocs[0].id, assocs[3].id, assocs[1].id, assocs[2].id]
+    assert [a.order_in_queue for a in queue] == [0, 0.5, 1, 2]
+
+    room_track_repo.move_track_in_queue(assocs[0].id, 3)
+    room_track_repo.move_track_in_queue(assocs[2].id, 0)
+    queue = room_track_repo.get_queue_for_room(room_id)
+    assert [a.id for a in queue] == [assocs[2].id, assocs[3].id, assocs[1].id, assocs[0].id]
+    assert room_track_repo.get_queue_length(room_id) == 4
+
+def test_move_track_in_queue_rebalances_exhausted_gap(room_track_repo):
+    room_id = uuid.uuid4()
+    user_id = uuid.uuid4()
+    first = room_track_repo.add_track_to_queue(room_id, uuid.uuid4(), 0, user_id)
+    second = room_track_repo.add_track_to_queue(room_id, uuid.uuid4(), 1e-7, user_id)
+    third = room_track_repo.add_track_to_queue(room_id, uuid.uuid4(), 1, user_id)
+
+    room_track_repo.move_track_in_queue(third.id, 1)
+
+    queue = room_track_repo.get_queue_for_room(room_id)
+    assert [a.id for a in queue] == [first.id, third.id, second.id]
+    assert [a.order_in_queue for a in queue] == [0, 0.5, 1]
+
+def test_set_ranks(room_track_repo):
+    room_id = uuid.uuid4()
+    user_id = uuid.uuid4()
+    first = room_track_repo.add_track_to_queue(room_id, uuid.uuid4(), 0, user_id)
+    second = room_track_repo.add_track_to_queue(room_id, uuid.uuid4(), 1, user_id)
+
+    room_track_repo.set_ranks({first.id: 1.5, uuid.uuid4(): 0.5})
+
+    queue = room_track_repo.get_queue_for_room(room_id)
+    assert [a.id for a in queue] == [second.id, first.id]
+    assert [a.order_in_queue for a in queue] == [1, 1.5]
+
+def test_append_track_to_queue(room_track_repo, db_session):
+    room = Room(name='room', max_members=10, owner_id=uuid.uuid4())
+    db_session.add(room)
+    db_session.flush()
+    user_id = uuid.uuid4()
+    track_ids = [uuid.uuid4() for _ in range(2)]
+
+    first = room_track_repo.append_track_to_queue(room.id, track_ids[0], user_id)
+    second = room_track_repo.append_track_to_queue(room.id, track_ids[1], user_id)
+    assert [first.order_in_queue, second.order_in_queue] == [0, 1]
+
+    assert room_track_repo.append_track_to_queue(room.id, track_ids[0], user_id) is None
+    assert room_track_repo.append_track_to_queue(uuid.uuid4(), track_ids[0], user_id) is None
+    queue = room_track_repo.get_queue_for_room(room.id)
+    assert [a.id for a in queue] == [first.id, second.id]
+
+def test_append_after_tail_moves_gets_unique_rank(room_track_repo, db_session):
+    room = Room(name='room', max_members=10, owner_id=uuid.uuid4())
+    db_session.add(room)
+    db_session.flush()
+    user_id = uuid.uuid4()
+    a0, a1, a2 = room_track_repo.add_tracks_to_queue(room.id, [uuid.uuid4() for _ in range(3)], user_id)
+
+    room_track_repo.move_track_in_queue(a0.id, 2)
+    room_track_repo.move_track_in_queue(a1.id, 2)
+    new = room_track_repo.append_track_to_queue(room.id, uuid.uuid4(), user_id)
+
+    queue = room_track_repo.get_queue_for_room(room.id)
+    assert [a.id for a in queue] == [a2.id, a0.id, a1.id, new.id]
+    assert [a.order_in_queue for a in queue] == [2, 3, 4, 5]
+
+def test_add_tracks_to_queue(room_track_repo, db_session):
+    room = Room(name='room', max_members=10, owner_id=uuid.uuid4())
+    db_session.add(room)
+    db_session.flush()
+    user_id = uuid.uuid4()
+    existing = room_track_repo.append_track_to_queue(room.id, uuid.uuid4(), user_id)
+    track_ids = [uuid.uuid4() for _ in range(3)]
+
+    added = room_track_repo.add_tracks_to_queue(room.id, [*track_ids, existing.track_id], user_id)
+
+    assert [a.track_id for a in added] == track_ids
+    assert [a.order_in_queue for a in added] == [1, 2, 3]
+    queue = room_track_repo.get_queue_for_room(room.id)
+    assert [a.id for a in queue] == [existing.id, *[a.id for a in added]]
+    assert room_track_repo.add_tracks_to_queue(room.id, [], user_id) == []
+
+def test_get_queue_page(room_track_repo, db_session):
+    room_id = uuid.uuid4()
+    user_id = uuid.uuid4()
+    tracks = [
+        Track(
+            spotify_id=f'spotify{i}',
+            spotify_uri=f'spotify:track:spotify{i}',
+            title=f'track{i}',
+            artist_names=['artist'],
+            album_name='album',
+            duration_ms=1000,
+        )
+        for i in range(5)
+    ]
+    db_session.add_all(tracks)
+    db_session.flush()
+    assocs = [
+        room_track_repo.add_track_to_queue(room_id, track.id, index, user_id)
+        for index, track in enumerate(tracks)
+    ]
+    room_track_repo.add_track_to_queue(uuid.uuid4(), tracks[0].id, 0, user_id)
+
+    first_page = room_track_repo.get_queue_page(room_id, None, 2)
+    assert [a.id for a, _ in first_page] == [assocs[0].id, assocs[1].id]
+    assert [t.spotify_id for _, t in first_page] == ['spotify0', 'spotify1']
+
+    next_page = room_track_repo.get_queue_page(room_id, first_page[-1][0].order_in_queue, 2)
+    assert [a.id for a, _ in next_page] == [assocs[2].id, assocs[3].id]
+    assert [a.id for a, _ in room_track_repo.get_queue_page(room_id, 3, 2)] == [assocs[4].id]
+    assert [a.id for a, _ in room_track_repo.get_queue_page(room_id, None, None)] == [a.id for a in assocs]
+
+def test_get_queue_page_keeps_tied_ranks(room_track_repo, db_session):
+    room_id = uuid.uuid4()
+    user_id = uuid.uuid4()
+    tracks = [
+        Track(
+            spotify_id=f'spotify{i}',
+            spotify_uri=f'spotify:track:spotify{i}',
+            title=f'track{i}',
+            artist_names=['artist'],
+            album_name='album',
+            duration_ms=1000,
+        )
+        for i in range(4)
+    ]
+    db_session.add_all(tracks)
+    db_session.flush()
+    for index, track in enumerate(tracks):
+        room_track_repo.add_track_to_queue(room_id, track.id, min(index, 1), user_id)
+    expected = [a.id for a, _ in room_track_repo.get_queue_page(room_id, None, None)]
+
+    first_page = room_track_repo.get_queue_page(room_id, None, 2)
+    last, _ = first_page[-1]
+    next_page = room_track_repo.get_queue_page(room_id, last.order_in_queue, 2, last.id)
+
+    assert [a.id for a, _ in first_page + next_page] == expected
+    assert [a.order_in_queue for a, _ in next_page] == [1, 1]
@@ -48,4 +48,24 @@ def test_delete_track(track_repo,track_data):
 def test_delete_track_not_exists(track_repo):
     deleted: bool = track_repo.delete_track(uuid.UUID('12345678-1234-5678-1234-567812345678'))
 
-    assert deleted is False
\ No newline at end of file
+    assert deleted is False
+def test_upsert_tracks(track_repo,track_data):
+    existing: Track = track_repo.create_track(track_data)
+    new_data = {
+        'spotify_id': 'new',
+        'spotify_uri': 'spotify:track:new',
+        'title': 'new',
+        'artist_names': ['artist'],
+        'album_name': 'album',
+        'album_cover_url': None,
+        'duration_ms': 1000,
+        'is_playable': True,
+    }
+    updated_data = {**new_data, 'spotify_id': track_data['spotify_id'], 'spotify_uri': track_data['spotify_uri'], 'title': 'renamed'}
+
+    tracks = track_repo.upsert_tracks([new_data, updated_data, new_data])
+
+    assert [track.spotify_id for track in tracks] == ['new', track_data['spotify_id']]
+    assert tracks[1].id == existing.id
+    assert tracks[1].title == 'renamed'
+    assert track_repo.get_track_by_spotify_id('new').id == tracks[0].id
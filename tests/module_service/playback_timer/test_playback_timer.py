@@ -0,0 +1,58 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.application.services.playback_timer import PlaybackTimer
+from app.config.settings import settings
+
+
+@pytest.mark.asyncio
+async def test_rearm_during_handler_waits_for_it():
+    room_id = uuid.uuid4()
+    calls = []
+    release = asyncio.Event()
+
+    async def on_due(due_room_id: uuid.UUID) -> None:
+        calls.append(due_room_id)
+        # обработчик сам меняет часы, и уведомление взводит срок, который уже прошёл
+        timer.arm(due_room_id, timer.now_ms() - 1)
+        await release.wait()
+
+    timer = PlaybackTimer(on_due, max_concurrent=4)
+    timer.start()
+    try:
+        timer.arm(room_id, timer.now_ms())
+        await asyncio.sleep(0.05)
+        assert calls == [room_id]
+        assert timer.rooms() == [room_id]
+
+        release.set()
+        await asyncio.sleep(0.05)
+        assert calls == [room_id]
+        assert timer.deadline(room_id) > timer.now_ms() + settings.playback.TIMER_RETRY_MS - 1000
+    finally:
+        await timer.stop()
+
+
+@pytest.mark.asyncio
+async def test_disarm_during_handler_drops_deferred_deadline():
+    room_id = uuid.uuid4()
+    release = asyncio.Event()
+
+    async def on_due(due_room_id: uuid.UUID) -> None:
+        timer.arm(due_room_id, timer.now_ms() + 60_000)
+        timer.disarm(due_room_id)
+        await release.wait()
+
+    timer = PlaybackTimer(on_due, max_concurrent=4)
+    timer.start()
+    try:
+        timer.arm(room_id, timer.now_ms())
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.sleep(0.05)
+        assert timer.deadline(room_id) is None
+        assert len(timer) == 0
+    finally:
+        await timer.stop()
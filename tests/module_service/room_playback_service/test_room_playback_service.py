@@ -0,0 +1,158 @@
+import pytest
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+from app.application.services.room_playback_service import RoomPlaybackService, _PlayerCommandContext
+from app.domain.entity import MemberRoomEntity, PlayerCommand, RoomEntity
+from app.domain.enum import ControlAction, Role
+from app.domain.exceptions.exception import ServerError
+from app.domain.exceptions.room_exception import RoomPermissionDeniedError
+from app.infrastructure.external.spotify import SpotifyService
+
+
+def room_with_host(device_id: str | None = 'old-device') -> RoomEntity:
+    return RoomEntity(
+        id=uuid.uuid4(), name='room', max_members=2, owner_id=uuid.uuid4(), is_private=False,
+        password_hash=None, current_track_id=None, current_track_position_ms=None, is_playing=True,
+        created_at=None, playback_host_id=uuid.uuid4(), active_spotify_device_id=device_id,
+        current_playing_track_association_id=None,
+    )
+
+
+def playback_service(role: str | None) -> RoomPlaybackService:
+    member_room_repo = MagicMock()
+    member_room_repo.get_member_room_association.return_value = MemberRoomEntity(
+        user_id=uuid.uuid4(), room_id=uuid.uuid4(), role=role, joined_at=None,
+    ) if role else None
+    dependencies = {
+        name: MagicMock() for name in (
+            'user_repo', 'room_track_repo', 'room_repo', 'track_repo', 'notify_service',
+            'playback_clock', 'track_mapper', 'room_events', 'player_state', 'queue_cache',
+            'redis_service', 'http_service', 'room_mapper',
+        )
+    }
+    return RoomPlaybackService(
+        member_room_repo=member_room_repo,
+        command_executor=AsyncMock(),
+        **dependencies,
+    )
+
+
+@pytest.mark.asyncio
+async def test_member_command_is_rejected_before_queuing():
+    service = playback_service(Role.MEMBER.value)
+
+    with pytest.raises(RoomPermissionDeniedError):
+        await service.dispatch_player_command(uuid.uuid4(), MagicMock(), PlayerCommand(ControlAction.SKIP))
+    service.command_executor.submit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_moderator_command_is_queued():
+    service = playback_service(Role.MODERATOR.value)
+    room_id = uuid.uuid4()
+
+    await service.dispatch_player_command(room_id, MagicMock(), PlayerCommand(ControlAction.PAUSE))
+    assert service.command_executor.submit.await_args.args[:2] == (room_id, PlayerCommand(ControlAction.PAUSE))
+
+
+@pytest.mark.asyncio
+async def test_rediscover_device_persists_new_device():
+    service = playback_service(Role.OWNER.value)
+    spotify_service = AsyncMock()
+    spotify_service.get_active_device_id.return_value = 'new-device'
+    room = room_with_host()
+
+    rediscovered = await service._rediscover_device(room, spotify_service)
+
+    assert rediscovered.active_spotify_device_id == 'new-device'
+    assert room.active_spotify_device_id == 'old-device'
+    service.room_repo.update_room.assert_called_once_with(room, {"active_spotify_device_id": "new-device"})
+
+    spotify_service.get_active_device_id.return_value = 'old-device'
+    assert await service._rediscover_device(room, spotify_service) is None
+
+
+@pytest.mark.asyncio
+async def test_command_context_builds_spotify_client_for_host():
+    service = playback_service(Role.OWNER.value)
+    room = room_with_host()
+    host_user = MagicMock(id=room.playback_host_id)
+    service.room_repo.get_room_by_id.return_value = room
+    service.user_repo.get_user_by_id.return_value = host_user
+
+    context = await service._load_command_context(room.id, 'play')
+
+    assert isinstance(context.spotify_service, SpotifyService)
+    assert context.spotify_service.user is host_user
+    assert context.spotify_service.redis_service is service.redis_service
+    assert context.spotify_service.http_service is service.http_service
+
+
+@pytest.mark.asyncio
+async def test_set_playback_host_persists_host():
+    service = playback_service(Role.OWNER.value)
+    service.player_state = AsyncMock()
+    service.notify_service = AsyncMock()
+    room = room_with_host(device_id=None)
+    host_id = uuid.uuid4()
+    service.room_repo.get_room_by_id.return_value = room
+    service.user_repo.get_user_by_id.return_value = MagicMock(id=host_id, username='host')
+    spotify_service = AsyncMock()
+    spotify_service.get_active_device_id.return_value = 'device'
+    service._spotify_for = MagicMock(return_value=spotify_service)
+
+    await service.set_playback_host(room.id, host_id, MagicMock())
+
+    service.room_repo.update_room.assert_called_once_with(
+        room, {"playback_host_id": host_id, "active_spotify_device_id": "device", "is_playing": False}
+    )
+    service.player_state.save_host.assert_awaited_once_with(room.id, host_id, 'host')
+    saved = service.room_mapper.to_response.call_args.args[0]
+    assert saved.playback_host_id == host_id
+    assert saved.active_spotify_device_id == 'device'
+
+
+@pytest.mark.asyncio
+async def test_clear_playback_host_keeps_clock_when_save_fails():
+    service = playback_service(Role.OWNER.value)
+    service.playback_clock = AsyncMock()
+    service.player_state = AsyncMock()
+    service.notify_service = AsyncMock()
+    room = room_with_host()
+    service.room_repo.get_room_by_id.return_value = room
+    service.room_repo.update_room.side_effect = ServerError()
+
+    with pytest.raises(ServerError):
+        await service.clear_playback_host(room.id)
+    service.playback_clock.clear.assert_not_awaited()
+
+    service.room_repo.update_room.side_effect = None
+    await service.clear_playback_host(room.id)
+
+    service.playback_clock.clear.assert_awaited_once_with(room.id)
+    saved = service.room_mapper.to_response.call_args.args[0]
+    assert saved.playback_host_id is None
+    assert saved.is_playing is False
+
+
+@pytest.mark.asyncio
+async def test_single_skip_removes_skipped_entry():
+    service = playback_service(Role.OWNER.value)
+    service.playback_clock = AsyncMock()
+    service.queue_cache = AsyncMock()
+    service.room_events = AsyncMock()
+    room = room_with_host()
+    queue = [MagicMock(id=uuid.uuid4()) for _ in range(3)]
+    service.room_track_repo.get_queue_for_room.return_value = queue
+    service.track_repo.get_track_by_id.return_value = MagicMock(spotify_uri='spotify:track:next', duration_ms=1000)
+    context = _PlayerCommandContext(room=room, host_user=MagicMock(), spotify_service=AsyncMock())
+
+    await service._apply_player_command(
+        context, PlayerCommand(ControlAction.SKIP), MagicMock(track_association_id=queue[0].id)
+    )
+
+    context.spotify_service.play.assert_awaited_once_with(device_id=room.active_spotify_device_id, track_uri='spotify:track:next')
+    context.spotify_service.skip_next.assert_not_awaited()
+    service.room_track_repo.remove_track_from_queue_by_association_id.assert_called_once_with(queue[0].id)
+    assert service.playback_clock.start.await_args.kwargs['track_association_id'] == queue[1].id
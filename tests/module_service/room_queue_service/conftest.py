@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Generator
+from unittest.mock import AsyncMock, MagicMock
+import uuid
+
+from app.application.mappers.track_mapper import TrackMapper
+from app.application.services.room_queue_service import RoomQueueService
+from app.domain.enum import Role
+from app.infrastructure.db.gateway.member_room_association_gateway import SAMemberRoomAssociationGateway
+from app.infrastructure.db.gateway.room_gateway import SARoomGateway
+from app.infrastructure.db.gateway.room_track_association_gateway import SARoomTrackAssociationGateway
+from app.infrastructure.db.gateway.track_gateway import SATrackGateway
+from app.infrastructure.db.models import Base, Member_room_association, Room
+
+db_url = "sqlite:///:memory:"
+
+engine = create_engine(url=db_url, echo=False)
+
+TestSession = sessionmaker(
+    bind=engine,
+    autocommit=False,
+    autoflush=False,
+)
+
+
+@pytest.fixture(scope="function", autouse=True)
+def create_table() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session() -> Generator[Session,None,None]:
+    """
+    Предоставляет сессию БД. Выполняет commit при успехе и rollback при ошибке.
+    """
+    db = TestSession()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def owner_id() -> uuid.UUID:
+    return uuid.UUID('5f4a3141-7160-454d-a9c0-1442887d4a7c')
+
+
+@pytest.fixture(scope="function")
+def room_id(db_session: Session, owner_id: uuid.UUID) -> uuid.UUID:
+    """
+    Комната, в которой owner_id — владелец.
+    """
+    room = Room(name='aspirin', max_members=2, owner_id=owner_id)
+    db_session.add(room)
+    db_session.flush()
+    db_session.add(Member_room_association(user_id=owner_id, room_id=room.id, role=Role.OWNER.value))
+    db_session.flush()
+    return room.id
+
+
+@pytest.fixture(scope="function")
+def room_queue_service(db_session: Session) -> RoomQueueService:
+    """
+    RoomQueueService на SQLite; Redis, WebSocket-события и часы плеера заменены заглушками.
+    """
+    return RoomQueueService(
+        room_repo=SARoomGateway(db_session),
+        room_track_repo=SARoomTrackAssociationGateway(db_session),
+        track_repo=SATrackGateway(db_session),
+        member_room_repo=SAMemberRoomAssociationGateway(db_session),
+        room_events=AsyncMock(),
+        queue_cache=AsyncMock(),
+        playback_clock=AsyncMock(),
+        track_mapper=TrackMapper(),
+        redis_service=MagicMock(),
+        http_service=MagicMock(),
+    )
@@ -0,0 +1,86 @@
+import pytest
+
+from app.application.services import room_queue_service as room_queue_module
+from app.domain.entity import UserEntity
+from app.presentation.schemas.spotify_schemas import SpotifyTrackDetails
+
+
+def spotify_track(spotify_id: str) -> SpotifyTrackDetails:
+    return SpotifyTrackDetails(
+        id=spotify_id,
+        name=f'track {spotify_id}',
+        artists=[{'id': 'artist', 'name': 'artist', 'uri': 'spotify:artist:artist', 'external_urls': {}}],
+        album={'id': 'album', 'name': 'album', 'images': [], 'uri': 'spotify:album:album'},
+        duration_ms=1000,
+        uri=f'spotify:track:{spotify_id}',
+    )
+
+
+class FakeSpotifyService:
+    """
+    Подменяет класс SpotifyService: вызов запоминает аргументы конструктора и возвращает сам объект.
+    """
+
+    def __init__(self):
+        self.calls: list[dict] = []
+
+    def __call__(self, redis_service, http_service, user=None):
+        self.calls.append({'redis_service': redis_service, 'http_service': http_service, 'user': user})
+        return self
+
+    async def get_playlist_tracks(self, playlist_id: str) -> list[SpotifyTrackDetails]:
+        return [spotify_track('spotify0'), spotify_track('spotify1'), spotify_track('spotify0')]
+
+
+@pytest.mark.asyncio
+async def test_import_playlist(room_queue_service, room_id, owner_id, monkeypatch):
+    spotify_service = FakeSpotifyService()
+    monkeypatch.setattr(room_queue_module, 'SpotifyService', spotify_service)
+    owner = UserEntity(
+        id=owner_id,
+        username='aspirin',
+        email='example@gmail.com',
+        is_email_verified=True,
+        avatar_url=None,
+        bio=None,
+        google_id=None,
+        google_image_url=None,
+        spotify_id='spotify_user',
+        spotify_profile_url=None,
+        spotify_image_url=None,
+    )
+
+    imported = await room_queue_service.import_playlist(room_id, 'playlist', owner)
+
+    assert [item.track.spotify_id for item in imported] == ['spotify0', 'spotify1']
+    assert [item.order_in_queue for item in imported] == [0, 1]
+    assert spotify_service.calls == [{
+        'redis_service': room_queue_service.redis_service,
+        'http_service': room_queue_service.http_service,
+        'user': owner,
+    }]
+    room_queue_service.queue_cache.add_many.assert_awaited_once()
+    room_queue_service.room_events.publish.assert_awaited_once()
+    assert room_queue_service.room_events.publish.await_args.args[1]['op'] == 'add_many'
+
+    assert await room_queue_service.import_playlist(room_id, 'playlist', owner) == []
+    queue = room_queue_service.room_track_repo.get_queue_for_room(room_id)
+    assert [assoc.id for assoc in queue] == [item.association_id for item in imported]
+
+
+@pytest.mark.asyncio
+async def test_get_room_queue_fills_cache_on_miss(room_queue_service, room_id, owner_id, db_session):
+    track_repo = room_queue_service.track_repo
+    tracks = track_repo.upsert_tracks([
+        room_queue_module.RoomQueueService._track_data(spotify_track(f'spotify{i}')) for i in range(2)
+    ])
+    added = room_queue_service.room_track_repo.add_tracks_to_queue(room_id, [track.id for track in tracks], owner_id)
+    room_queue_service.queue_cache.get.return_value = None
+
+    queue = await room_queue_service.get_room_queue(room_id)
+
+    assert [item.association_id for item in queue] == [assoc.id for assoc in added]
+    assert [item.track.spotify_id for item in queue] == ['spotify0', 'spotify1']
+    filled_room_id, filled = room_queue_service.queue_cache.fill.await_args.args
+    assert filled_room_id == room_id
+    assert [item['id'] for item in filled] == [str(assoc.id) for assoc in added]